@@ -0,0 +1,102 @@
+"""
+Content-addressed bank logos.
+
+An uploaded image is stored once under the SHA-256 of its bytes, and resized
+PNG variants are generated at upload time. Since a key always maps to the same
+bytes, logo URLs can be cached forever (see BankLogoView).
+"""
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError
+from django.urls import reverse
+from PIL import Image, UnidentifiedImageError
+
+from .models import LogoAsset
+
+LOGO_SIZES = (32, 64, 128)  # px, cạnh dài nhất
+DEFAULT_LOGO_SIZE = 64
+MAX_LOGO_BYTES = 2 * 1024 * 1024
+MAX_LOGO_PIXELS = 4096 * 4096  # ảnh nén nhỏ nhưng giải nén ra rất lớn
+KEY_LENGTH = 16  # hex chars of the digest used in URLs
+
+
+class LogoError(ValueError):
+    pass
+
+
+def variant_path(key, size):
+    return f"logos/{key[:2]}/{key}/{size}.png"
+
+
+def logo_url(asset, size=DEFAULT_LOGO_SIZE, request=None):
+    url = reverse("bank-logo", kwargs={"key": asset.key, "size": size})
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def logo_url_builder(request=None, size=DEFAULT_LOGO_SIZE):
+    """Return fn(key) -> URL, resolving the route once instead of once per row."""
+    placeholder = "0" * KEY_LENGTH
+    template = logo_url(LogoAsset(key=placeholder), size, request)
+    head, tail = template.split(placeholder, 1)
+    return lambda key: f"{head}{key}{tail}"
+
+
+def bank_icon_url(bank, request=None):
+    """Hashed logo URL when the bank has an uploaded logo, else the legacy key_icon."""
+    if bank.logo_id:
+        return logo_url(bank.logo, request=request)
+    return bank.key_icon
+
+
+def _render_variant(image, size):
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.LANCZOS)
+    out = io.BytesIO()
+    variant.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+def store_logo(data):
+    """Store `data` (image bytes) once and return its LogoAsset."""
+    if len(data) > MAX_LOGO_BYTES:
+        raise LogoError(f"logo must be at most {MAX_LOGO_BYTES // 1024} KB")
+    digest = hashlib.sha256(data).hexdigest()
+    existing = LogoAsset.objects.filter(digest=digest).first()
+    if existing:
+        return existing
+
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            if probe.width * probe.height > MAX_LOGO_PIXELS:
+                raise LogoError(f"logo must be at most {MAX_LOGO_PIXELS} pixels")
+            probe.verify()
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Image.DecompressionBombError:
+        raise LogoError(f"logo must be at most {MAX_LOGO_PIXELS} pixels")
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise LogoError("file is not a valid image")
+    source_format = (image.format or "").lower()
+    image = image.convert("RGBA")
+
+    key = digest[:KEY_LENGTH]
+    for size in LOGO_SIZES:
+        path = variant_path(key, size)
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(_render_variant(image, size)))
+
+    try:
+        return LogoAsset.objects.create(
+            key=key,
+            digest=digest,
+            source_format=source_format,
+            width=image.width,
+            height=image.height,
+            byte_size=len(data),
+        )
+    except IntegrityError:
+        # upload song song cùng một file
+        return LogoAsset.objects.get(digest=digest)
@@ -0,0 +1,36 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Banks.service import CatalogError, parse_catalog, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Upsert bank catalogs (banks + loan options) from a CSV or JSON file in one transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--prune", action="store_true", help="delete options of the imported banks that are not in the file")
+        parser.add_argument("--dry-run", action="store_true", help="report counts and roll back")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        fmt = "csv" if path.suffix.lower() == ".csv" else "json"
+
+        started = time.monotonic()
+        try:
+            report = import_catalog(
+                parse_catalog(path.read_bytes(), fmt),
+                prune=options["prune"],
+                dry_run=options["dry_run"],
+            )
+        except (CatalogError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for kind, counts in report.items():
+            self.stdout.write(f"{kind}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+        suffix = " (dry run, rolled back)" if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.monotonic() - started:.2f}s{suffix}"))
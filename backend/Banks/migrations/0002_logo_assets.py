@@ -0,0 +1,32 @@
+# Generated by Django 4.2.24 on 2026-10-19 11:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Banks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogoAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=16, unique=True)),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('source_format', models.CharField(blank=True, max_length=20)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('byte_size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='bank',
+            name='logo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='banks', to='Banks.logoasset'),
+        ),
+    ]
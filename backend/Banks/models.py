@@ -1,3 +1,25 @@
 from django.db import models
 
-# Create your models here.
+# Logo lưu theo hash nội dung, xem Banks/logos.py
+class LogoAsset(models.Model):
+    key = models.CharField(max_length=16, unique=True)  # prefix of digest, used in URLs
+    digest = models.CharField(max_length=64, unique=True)  # sha256 of the uploaded bytes
+    source_format = models.CharField(max_length=20, blank=True)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    byte_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.key
+
+class Bank(models.Model):
+    code = models.SlugField(max_length=50, unique=True)  # e.g. "vietcombank", dùng làm khoá khi import catalog
+    name = models.CharField(max_length=200)
+    key_icon = models.CharField(max_length=255, null=True, blank=True)  # url to bank icon
+    logo = models.ForeignKey(LogoAsset, null=True, blank=True, on_delete=models.SET_NULL, related_name="banks")
+    # khi có logo upload thì API trả URL hash thay cho key_icon
+    updated_at = models.DateTimeField(auto_now=True)  # LoanPackages/catalog.py version()
+
+    def __str__(self):
+        return self.name
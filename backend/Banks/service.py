@@ -0,0 +1,189 @@
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_slug
+from django.db import connections, router, transaction
+
+from LoanPackages import catalog
+from LoanPackages.models import LoanOption, LoanType
+from .models import Bank
+
+BANK_FIELDS = ("name", "key_icon")
+OPTION_FIELDS = (
+    "exclusive_interest_rate", "estimated_term", "key_requirement", "average_processing_time",
+)
+# (bank, loan_type, title) là khoá tự nhiên, xem LoanOption.Meta.constraints
+REQUIRED_OPTION_FIELDS = ("loan_type", "title") + OPTION_FIELDS
+
+
+class CatalogError(ValueError):
+    pass
+
+
+def parse_catalog(content, fmt):
+    """
+    Turn an uploaded catalog into a list of bank dicts:
+    [{"code", "name", "key_icon", "options": [{loan_type, title, ...}]}]
+
+    JSON: that list as-is (or {"banks": [...]}).
+    CSV: one row per option with bank_code, bank_name, bank_key_icon plus the option columns.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    if fmt == "json":
+        data = json.loads(content) if isinstance(content, str) else content
+        if isinstance(data, dict):
+            data = data.get("banks", [])
+        if not isinstance(data, list):
+            raise CatalogError("JSON catalog must be a list of banks or {\"banks\": [...]}")
+        return data
+    if fmt == "csv":
+        banks = {}
+        for line_no, row in enumerate(csv.DictReader(io.StringIO(content)), start=2):
+            code = (row.get("bank_code") or "").strip()
+            if not code:
+                raise CatalogError(f"line {line_no}: bank_code is required")
+            bank = banks.setdefault(code, {
+                "code": code,
+                "name": (row.get("bank_name") or "").strip(),
+                "key_icon": (row.get("bank_key_icon") or "").strip() or None,
+                "options": [],
+            })
+            bank["options"].append({field: (row.get(field) or "").strip() for field in REQUIRED_OPTION_FIELDS})
+        return list(banks.values())
+    raise CatalogError(f"unsupported catalog format: {fmt}")
+
+
+def _conflict_target(model, fields):
+    # MySQL (ON DUPLICATE KEY UPDATE) không nhận unique_fields: tự tìm conflict theo các unique constraint
+    features = connections[router.db_for_write(model)].features
+    return fields if features.supports_update_conflicts_with_target else None
+
+
+def _text(value, where, model, field):
+    """Stripped catalog value ("" if missing); CatalogError if it is not text or too long for the column."""
+    if value is None:
+        return ""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise CatalogError(f"{where}: {field} must be a string")
+    value = str(value).strip()
+    max_length = model._meta.get_field(field).max_length
+    if len(value) > max_length:
+        raise CatalogError(f"{where}: {field} is longer than {max_length} characters")
+    return value
+
+
+def _clean(banks):
+    """Validate and normalise untrusted catalog data; later duplicates of the same bank/option win."""
+    if not isinstance(banks, list):
+        raise CatalogError("catalog must be a list of banks")
+    clean_banks = {}
+    clean_options = {}
+    for i, bank in enumerate(banks):
+        if not isinstance(bank, dict):
+            raise CatalogError(f"bank #{i + 1}: must be an object")
+        code = _text(bank.get("code"), f"bank #{i + 1}", Bank, "code")
+        name = _text(bank.get("name"), f"bank #{i + 1}", Bank, "name")
+        if not code or not name:
+            raise CatalogError(f"bank #{i + 1}: code and name are required")
+        try:
+            validate_slug(code)
+        except ValidationError:
+            raise CatalogError(f"bank #{i + 1}: code must be a slug (letters, numbers, - and _)")
+        key_icon = _text(bank.get("key_icon"), f"bank {code}", Bank, "key_icon")
+        clean_banks[code] = {"name": name, "key_icon": key_icon or None}
+        options = bank.get("options") or []
+        if not isinstance(options, list):
+            raise CatalogError(f"bank {code}: options must be a list")
+        for j, option in enumerate(options):
+            where = f"bank {code} option #{j + 1}"
+            if not isinstance(option, dict):
+                raise CatalogError(f"{where}: must be an object")
+            values = {field: _text(option.get(field), where, LoanOption, field) for field in REQUIRED_OPTION_FIELDS}
+            missing = [field for field in REQUIRED_OPTION_FIELDS if not values[field]]
+            if missing:
+                raise CatalogError(f"{where}: missing {', '.join(missing)}")
+            if values["loan_type"] not in LoanType.values:
+                raise CatalogError(f"{where}: loan_type must be one of {LoanType.values}")
+            key = (code, values["loan_type"], values["title"])
+            clean_options[key] = {field: values[field] for field in OPTION_FIELDS}
+    return clean_banks, clean_options
+
+
+def import_catalog(banks, prune=False, dry_run=False):
+    """
+    Upsert whole bank catalogs in one transaction with bulk_create(update_conflicts=True).
+    Only new or changed rows are written. With prune=True, options of the imported
+    banks that are missing from the catalog are deleted.
+
+    Returns {"banks": {...counts}, "options": {...counts}}.
+    """
+    clean_banks, clean_options = _clean(banks)
+    report = {
+        "banks": {"inserted": 0, "updated": 0, "unchanged": 0},
+        "options": {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0},
+    }
+
+    with transaction.atomic():
+        existing_banks = {
+            bank.code: bank for bank in Bank.objects.filter(code__in=clean_banks).select_for_update()
+        }
+        bank_rows = []
+        for code, values in clean_banks.items():
+            current = existing_banks.get(code)
+            if current is None:
+                report["banks"]["inserted"] += 1
+            elif any(getattr(current, field) != values[field] for field in BANK_FIELDS):
+                report["banks"]["updated"] += 1
+            else:
+                report["banks"]["unchanged"] += 1
+                continue
+            bank_rows.append(Bank(code=code, **values))
+        Bank.objects.bulk_create(
+            bank_rows, update_conflicts=True, unique_fields=_conflict_target(Bank, ["code"]),
+            update_fields=[*BANK_FIELDS, "updated_at"],
+        )
+        # MySQL không trả id khi upsert => đọc lại
+        bank_ids = dict(Bank.objects.filter(code__in=clean_banks).values_list("code", "id"))
+
+        existing_options = {
+            (row["bank_id"], row["loan_type"], row["title"]): row
+            for row in LoanOption.objects.filter(bank_id__in=bank_ids.values())
+            .values("id", "bank_id", "loan_type", "title", *OPTION_FIELDS)
+            .iterator(chunk_size=2000)
+        }
+        option_rows = []
+        seen = set()
+        for (code, loan_type, title), values in clean_options.items():
+            key = (bank_ids[code], loan_type, title)
+            seen.add(key)
+            current = existing_options.get(key)
+            if current is None:
+                report["options"]["inserted"] += 1
+            elif any(current[field] != values[field] for field in OPTION_FIELDS):
+                report["options"]["updated"] += 1
+            else:
+                report["options"]["unchanged"] += 1
+                continue
+            option_rows.append(LoanOption(bank_id=key[0], loan_type=loan_type, title=title, **values))
+        LoanOption.objects.bulk_create(
+            option_rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=_conflict_target(LoanOption, ["bank", "loan_type", "title"]),
+            update_fields=[*OPTION_FIELDS, "updated_at"],
+        )
+
+        if prune:
+            stale = [row["id"] for key, row in existing_options.items() if key not in seen]
+            for i in range(0, len(stale), 1000):
+                LoanOption.objects.filter(id__in=stale[i:i + 1000]).delete()
+            report["options"]["deleted"] = len(stale)
+
+        if dry_run:
+            transaction.set_rollback(True)
+        else:
+            catalog.bump()  # bulk_create không gửi post_save
+    return report
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import CatalogImportView, BankLogoUploadView, bank_logo
+
+urlpatterns = [
+    path('catalog/import/', CatalogImportView.as_view(), name='bank-catalog-import'),
+    path('<slug:code>/logo/', BankLogoUploadView.as_view(), name='bank-logo-upload'),
+    path('logos/<str:key>-<int:size>.png', bank_logo, name='bank-logo'),
+]
@@ -1,3 +1,76 @@
-from django.shortcuts import render
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from .models import Bank, LogoAsset
+from .service import CatalogError, parse_catalog, import_catalog
+from . import logos
 
-# Create your views here.
+class CatalogImportView(APIView):
+    """
+    Upsert bank catalogs in bulk.
+    POST JSON body (list of banks), or multipart with `file` (.json / .csv).
+    ?prune=1 xoá các option không còn trong catalog, ?dry_run=1 chỉ báo cáo.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        try:
+            if upload:
+                fmt = "csv" if upload.name.lower().endswith(".csv") else "json"
+                banks = parse_catalog(upload.read(), fmt)
+            else:
+                banks = parse_catalog(request.data, "json")
+            report = import_catalog(
+                banks,
+                prune=request.query_params.get("prune") == "1",
+                dry_run=request.query_params.get("dry_run") == "1",
+            )
+        except (CatalogError, ValueError) as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+class BankLogoUploadView(APIView):
+    """POST multipart `file` => lưu logo theo hash và gắn vào bank."""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, code):
+        bank = get_object_or_404(Bank, code=code)
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"error": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if upload.size > logos.MAX_LOGO_BYTES:
+            return Response({"error": "file too large"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            asset = logos.store_logo(upload.read())
+        except logos.LogoError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        bank.logo = asset
+        bank.save(update_fields=["logo", "updated_at"])
+        return Response({
+            "bank": bank.code,
+            "key": asset.key,
+            "urls": {size: logos.logo_url(asset, size, request) for size in logos.LOGO_SIZES},
+        }, status=status.HTTP_201_CREATED)
+
+@require_GET
+def bank_logo(request, key, size):
+    """Serve a logo variant. The URL is content-addressed, so it never changes meaning."""
+    if size not in logos.LOGO_SIZES:
+        raise Http404
+    etag = f'"{key}-{size}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        path = logos.variant_path(key, size)
+        if not LogoAsset.objects.filter(key=key).exists() or not default_storage.exists(path):
+            raise Http404
+        response = FileResponse(default_storage.open(path), content_type="image/png")
+    response["ETag"] = etag
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
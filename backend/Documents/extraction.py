@@ -0,0 +1,254 @@
+"""
+Background extraction of uploaded documents into compact facts for the analysis.
+
+finalize() schedules a document once its upload commits. Parsing (PDF / DOCX /
+text, see Documents/extractors.py) is CPU-bound, so it runs in a process pool,
+never on the request thread. Results are stored once per StoredFile
+(DocumentExtraction, i.e. cached by SHA-256 and extractor version) and folded
+into ApplicationFacts: a short summary the prompt gets instead of raw content.
+
+    upload complete -> on_commit: schedule(document_id)
+        cached?  -> refresh_application()
+        else     -> pool: extractors.extract(path) -> apply_result() -> refresh_application()
+
+Extractions left pending by a crashed worker, failed ones and those from an
+older EXTRACTOR_VERSION are redone by `manage.py extract_documents`.
+"""
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+
+from backend import metrics
+
+from . import extractors
+from .models import ApplicationFacts, Document, DocumentExtraction, DocumentKind
+
+logger = logging.getLogger(__name__)
+
+EXTRACTIONS = metrics.counter("documents_extractions_total", "Document extractions finished", ("status",))
+CACHE_HITS = metrics.counter("documents_extraction_cache_hits_total", "Documents whose content was already extracted")
+DURATION = metrics.histogram("documents_extraction_seconds", "Time from submit to stored extraction result")
+
+# tài liệu ưu tiên cho từng con số, theo thứ tự
+_APPRAISAL_KINDS = (DocumentKind.APPRAISAL, DocumentKind.OTHER)
+_INCOME_KINDS = (DocumentKind.INCOME_PROOF, DocumentKind.BANK_STATEMENT, DocumentKind.EMPLOYMENT_CONTRACT)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def conf(name):
+    return settings.DOCUMENT_EXTRACTION[name]
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: server process có nhiều thread, fork giữa chừng không an toàn
+                _pool = ProcessPoolExecutor(
+                    max_workers=conf("workers"), mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def _local_copy(stored):
+    """(path, is_temp): the stored file on local disk, downloaded first for remote storage."""
+    try:
+        return default_storage.path(stored.path), False
+    except NotImplementedError:
+        pass
+    temp = os.path.join(settings.DOCUMENT_UPLOAD_TEMP_DIR, f"extract-{stored.sha256}")
+    os.makedirs(os.path.dirname(temp), exist_ok=True)
+    with default_storage.open(stored.path, "rb") as src, open(temp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    return temp, True
+
+
+def _claim(document):
+    """The DocumentExtraction to run for this document, or None when cached / already running."""
+    extraction, created = DocumentExtraction.objects.get_or_create(
+        stored_file=document.stored_file, defaults={"extractor_version": extractors.EXTRACTOR_VERSION},
+    )
+    if created:
+        return extraction
+    if extraction.extractor_version == extractors.EXTRACTOR_VERSION:
+        if extraction.status != DocumentExtraction.Status.PENDING:
+            CACHE_HITS.inc()
+        return None  # đã có kết quả, hoặc worker khác đang xử lý
+    # kết quả từ logic cũ: chạy lại, chỉ một request thắng
+    claimed = DocumentExtraction.objects.filter(
+        pk=extraction.pk, extractor_version=extraction.extractor_version,
+    ).update(
+        extractor_version=extractors.EXTRACTOR_VERSION, status=DocumentExtraction.Status.PENDING,
+        updated_at=timezone.now(),
+    )
+    return extraction if claimed else None
+
+
+def job_args(extraction, filename=""):
+    """Arguments for extractors.extract, or None when the file is too large to parse."""
+    stored = extraction.stored_file
+    if stored.size > conf("max_bytes"):
+        return None
+    path, is_temp = _local_copy(stored)
+    return path, is_temp, (path, stored.content_type, filename, conf("max_text_chars"))
+
+
+def schedule(document_id):
+    """Called on commit of a finished upload; never raises into the request."""
+    try:
+        document = Document.objects.select_related("stored_file").get(pk=document_id)
+        extraction = _claim(document)
+        if extraction is None:
+            refresh_application(document.application_id)
+            return
+        job = job_args(extraction, document.filename)
+        if job is None:
+            apply_result(extraction.pk, error=f"larger than {conf('max_bytes')} bytes, not parsed")
+            return
+        path, is_temp, args = job
+        started = time.monotonic()
+        future = get_pool().submit(extractors.extract, *args)
+        refresh_application(document.application_id)  # ghi nhận "đang xử lý" ngay
+    except Exception:
+        logger.exception("Could not schedule extraction of document %s", document_id)
+        return
+
+    def done(fut):
+        # chạy trên thread quản lý của pool, không phải request thread
+        try:
+            try:
+                result = fut.result()
+            except Exception as exc:
+                apply_result(extraction.pk, error=f"{type(exc).__name__}: {exc}")
+            else:
+                apply_result(extraction.pk, result=result)
+            DURATION.observe(time.monotonic() - started)
+        except Exception:
+            logger.exception("Could not store extraction %s", extraction.pk)
+        finally:
+            if is_temp:
+                os.remove(path)
+            connections.close_all()
+
+    future.add_done_callback(done)
+
+
+def apply_result(extraction_id, result=None, error=None):
+    """Store one extraction outcome and refresh every application that holds the file."""
+    if error is not None:
+        status, fields = DocumentExtraction.Status.FAILED, {"error": error[:255], "text": "", "facts": {}}
+    elif result["method"] is None:
+        status, fields = DocumentExtraction.Status.UNSUPPORTED, {"error": "", "text": "", "facts": {}, "method": ""}
+    else:
+        status, fields = DocumentExtraction.Status.DONE, {
+            "error": "", "text": result["text"], "facts": result["facts"], "method": result["method"],
+        }
+    DocumentExtraction.objects.filter(pk=extraction_id).update(status=status, updated_at=timezone.now(), **fields)
+    EXTRACTIONS.inc(status=status)
+    stored_file_id = DocumentExtraction.objects.values_list("stored_file_id", flat=True).get(pk=extraction_id)
+    application_ids = (
+        Document.objects.filter(stored_file_id=stored_file_id).values_list("application_id", flat=True).distinct()
+    )
+    for application_id in application_ids:
+        refresh_application(application_id)
+
+
+def _pick(documents, key, kinds):
+    """(value, document) from the preferred document kinds first, then any document."""
+    ranked = sorted(documents, key=lambda d: kinds.index(d.kind) if d.kind in kinds else len(kinds))
+    for document in ranked:
+        value = document.extracted.get(key)
+        if value is not None:
+            return value, document
+    return None, None
+
+
+def _vnd(amount):
+    return f"{amount:,.0f} VND"
+
+
+def _compare(facts, key, extracted, declared):
+    if extracted and declared:
+        declared = float(declared)
+        if declared > 0:
+            facts[key] = round((extracted - declared) / declared * 100, 1)
+
+
+def refresh_application(application_id):
+    """Rebuild ApplicationFacts (facts + prompt summary) from the application's documents."""
+    documents = list(
+        Document.objects.filter(application_id=application_id)
+        .select_related("stored_file__extraction", "application")
+        .order_by("created_at")
+    )
+    if not documents:
+        ApplicationFacts.objects.filter(application_id=application_id).delete()
+        return None
+    application = documents[0].application
+
+    pending, unreadable = [], []
+    for document in documents:
+        extraction = getattr(document.stored_file, "extraction", None)
+        document.extracted = extraction.facts if extraction and extraction.status == DocumentExtraction.Status.DONE else {}
+        if extraction is None or extraction.status == DocumentExtraction.Status.PENDING:
+            pending.append(document)
+        elif extraction.status != DocumentExtraction.Status.DONE:
+            unreadable.append(document)
+
+    facts = {"documents": len(documents), "kinds": sorted({d.kind for d in documents})}
+    parts = [f"{len(documents)} document(s): {', '.join(facts['kinds'])}"]
+
+    appraised, source = _pick(documents, "appraised_value", _APPRAISAL_KINDS)
+    if appraised is not None:
+        facts["appraised_value"] = appraised
+        collateral = application.property_value if application.loan_type == "real_estate" else application.vehicle_value
+        _compare(facts, "appraised_vs_declared_pct", appraised, collateral)
+        text = f"appraised value {_vnd(appraised)} ({source.filename})"
+        if "appraised_vs_declared_pct" in facts:
+            text += f", {facts['appraised_vs_declared_pct']:+.1f}% vs declared collateral value"
+        parts.append(text)
+
+    income, source = _pick(documents, "monthly_income", _INCOME_KINDS)
+    if income is not None:
+        facts["monthly_income"] = income
+        _compare(facts, "income_vs_declared_pct", income, application.monthly_income)
+        lines = len(source.extracted.get("income_lines", []))
+        text = f"documented income ~{_vnd(income)}/month from {lines} income line(s) ({source.filename})"
+        if "income_vs_declared_pct" in facts:
+            text += f", {facts['income_vs_declared_pct']:+.1f}% vs declared"
+        parts.append(text)
+
+    if pending:
+        parts.append(f"{len(pending)} still being processed")
+    if unreadable:
+        parts.append(f"no readable text in: {', '.join(d.filename for d in unreadable)}")
+
+    summary = "; ".join(parts) + "."
+    limit = conf("summary_chars")
+    if len(summary) > limit:
+        summary = summary[: limit - 3] + "..."
+    result, _ = ApplicationFacts.objects.update_or_create(
+        application_id=application_id,
+        defaults={"facts": facts, "summary": summary, "pending": len(pending)},
+    )
+    return result
+
+
+def prompt_summary(application_id, user):
+    """Document summary for the analysis prompt, only for the owner's application."""
+    facts = ApplicationFacts.objects.filter(
+        application_id=application_id, application__user=user,
+    ).only("summary").first()
+    return facts.summary if facts else None
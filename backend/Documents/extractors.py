@@ -0,0 +1,183 @@
+"""
+Text and key-figure extraction from uploaded documents.
+
+Pure functions of (path, content_type, filename) => {"text", "facts", "method"}:
+no Django imports, so they run unchanged in the extraction process pool (see
+Documents/extraction.py). Supported: plain text / CSV, DOCX (stdlib zip + XML)
+and PDF (pypdf when installed, otherwise the text operators of simple
+uncompressed / Flate streams). Scanned images have no text layer and yield
+empty facts; there is no OCR here.
+"""
+import html
+import re
+import statistics
+import zipfile
+import zlib
+
+# tăng khi đổi logic trích xuất => kết quả cũ trong cache bị bỏ qua
+EXTRACTOR_VERSION = "1"
+
+TEXT_TYPES = ("text/plain", "text/csv")
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+APPRAISAL_KEYWORDS = (
+    "giá trị thẩm định", "gia tri tham dinh", "giá trị định giá", "giá trị tài sản",
+    "appraised value", "appraisal value", "market value", "valuation",
+)
+INCOME_KEYWORDS = (
+    "lương", "luong", "thu nhập", "thu nhap", "thực lĩnh", "thuc linh",
+    "salary", "net pay", "income", "payroll",
+)
+
+# 1.500.000.000 | 1,500,000,000 | 1500000000 | 1,5 tỷ | 15 triệu | 2.5 billion
+_AMOUNT = re.compile(
+    r"(?<![\d.,])(\d{1,3}(?:[.,]\d{3})+|\d+(?:[.,]\d+)?)\s*"
+    r"(?:(tỷ|ty|billion|bn|triệu|trieu|million|tr|m)(?!\w))?",
+    re.IGNORECASE,
+)
+_UNITS = {
+    "tỷ": 10 ** 9, "ty": 10 ** 9, "billion": 10 ** 9, "bn": 10 ** 9,
+    "triệu": 10 ** 6, "trieu": 10 ** 6, "million": 10 ** 6, "tr": 10 ** 6, "m": 10 ** 6,
+}
+# số nhỏ hơn ngưỡng này (ngày, tháng, số thứ tự...) không phải số tiền
+MIN_AMOUNT = 100_000
+
+
+def parse_amount(text):
+    """First plausible VND amount in `text`, or None."""
+    for match in _AMOUNT.finditer(text):
+        digits, unit = match.groups()
+        if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", digits):
+            value = float(re.sub(r"[.,]", "", digits))  # dấu phân cách hàng nghìn
+        else:
+            value = float(digits.replace(",", "."))
+        if unit:
+            value *= _UNITS[unit.lower()]
+        if value >= MIN_AMOUNT:
+            return round(value)
+    return None
+
+
+def _keyword_amounts(lines, keywords):
+    found = []
+    for i, line in enumerate(lines):
+        lowered = line.lower()
+        if not any(k in lowered for k in keywords):
+            continue
+        # số tiền có thể nằm ở dòng kế tiếp (bảng biểu tách cột)
+        amount = parse_amount(line)
+        if amount is None and i + 1 < len(lines):
+            amount = parse_amount(lines[i + 1])
+        if amount is not None:
+            found.append({"amount": amount, "line": line.strip()[:120]})
+    return found
+
+
+def find_facts(text):
+    """Appraised value and income lines found in the text."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    facts = {}
+    appraisals = _keyword_amounts(lines, APPRAISAL_KEYWORDS)
+    if appraisals:
+        # biên bản thẩm định thường chốt giá trị ở cuối
+        facts["appraised_value"] = appraisals[-1]["amount"]
+        facts["appraisal_lines"] = appraisals[:5]
+    incomes = _keyword_amounts(lines, INCOME_KEYWORDS)
+    if incomes:
+        facts["income_lines"] = incomes[:12]
+        # sao kê nhiều tháng: trung vị ổn định hơn trung bình khi có thưởng
+        facts["monthly_income"] = round(statistics.median(i["amount"] for i in incomes))
+    return facts
+
+
+def _read_text(path):
+    with open(path, "rb") as fh:
+        data = fh.read()
+    for encoding in ("utf-8-sig", "cp1258", "latin-1"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return ""
+
+
+def _read_docx(path):
+    with zipfile.ZipFile(path) as archive:
+        xml = archive.read("word/document.xml").decode("utf-8")
+    xml = re.sub(r"</w:p>|<w:br/>|<w:tab/>", "\n", xml)
+    return html.unescape(re.sub(r"<[^>]+>", "", xml))
+
+
+_PDF_STREAM = re.compile(rb"<<(.*?)>>\s*stream\r?\n(.*?)\r?\nendstream", re.DOTALL)
+_PDF_TEXT = re.compile(rb"\((?:\\.|[^\\)])*\)\s*Tj|\[(?:[^\]]*)\]\s*TJ|T\*|Td|TD|ET")
+_PDF_STRING = re.compile(rb"\(((?:\\.|[^\\)])*)\)")
+_PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"(": b"(", b")": b")", b"\\": b"\\"}
+
+
+def _pdf_string(raw):
+    out = re.sub(rb"\\([nrt()\\])", lambda m: _PDF_ESCAPES[m.group(1)], raw)
+    out = re.sub(rb"\\([0-7]{1,3})", lambda m: bytes([int(m.group(1), 8) & 0xFF]), out)
+    return out.decode("latin-1")
+
+
+def _read_pdf_streams(path):
+    """Text operators of Flate / uncompressed content streams; enough for generated PDFs."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    chunks = []
+    for header, body in _PDF_STREAM.findall(data):
+        if b"/FlateDecode" in header:
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                continue
+        elif b"/Filter" in header:
+            continue  # ảnh, font... nén kiểu khác
+        line = []
+        for op in _PDF_TEXT.finditer(body):
+            token = op.group(0)
+            if token.endswith((b"Tj", b"TJ")):
+                line.extend(_pdf_string(s) for s in _PDF_STRING.findall(token))
+            elif line:
+                chunks.append("".join(line))
+                line = []
+        if line:
+            chunks.append("".join(line))
+    return "\n".join(chunks)
+
+
+def _read_pdf(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return _read_pdf_streams(path), "pdf-streams"
+    reader = PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages), "pypdf"
+
+
+def detect(path, content_type, filename):
+    name = filename.lower()
+    with open(path, "rb") as fh:
+        head = fh.read(8)
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if head.startswith(b"PK") and (name.endswith(".docx") or content_type == DOCX_TYPE):
+        return "docx"
+    if content_type in TEXT_TYPES or name.endswith((".txt", ".csv")):
+        return "text"
+    return None
+
+
+def extract(path, content_type="", filename="", max_text_chars=20000):
+    """Run in a worker process: text (truncated) + facts, or method=None when unsupported."""
+    kind = detect(path, content_type, filename)
+    if kind == "pdf":
+        text, method = _read_pdf(path)
+    elif kind == "docx":
+        text, method = _read_docx(path), "docx"
+    elif kind == "text":
+        text, method = _read_text(path), "text"
+    else:
+        return {"text": "", "facts": {}, "method": None}
+    text = re.sub(r"[ \t]+", " ", text).strip()
+    return {"text": text[:max_text_chars], "facts": find_facts(text), "method": method}
@@ -0,0 +1,142 @@
+import gc
+import json
+import os
+import random
+import resource
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from Documents import uploads
+from Documents.models import Document, StoredFile, UploadSession
+from user_profile.models import LoanApplication
+
+
+def _max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload a generated file through the chunked upload API (full Django stack, "
+        "test client) and report throughput and peak RSS growth for three cases: "
+        "hashed in-process, duplicate content (dedupe), and chunks that crossed "
+        "workers (digest recomputed from disk)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size-mb", type=int, default=200)
+        parser.add_argument("--chunk-mb", type=int, default=8)
+        parser.add_argument("--application", type=int, default=None, help="LoanApplication id (default: latest)")
+        parser.add_argument("--keep", action="store_true", help="keep the uploaded documents and files")
+        parser.add_argument(
+            "--output",
+            default=str(settings.BASE_DIR / "benchmarks" / "uploads.jsonl"),
+            help="append results as one JSON line ('-' to skip)",
+        )
+
+    def handle(self, *args, **options):
+        application = (
+            LoanApplication.objects.filter(pk=options["application"]).first()
+            if options["application"]
+            else LoanApplication.objects.order_by("-id").first()
+        )
+        if application is None:
+            raise CommandError("no LoanApplication to attach documents to")
+        size = options["size_mb"] * 1024 * 1024
+        chunk = options["chunk_mb"] * 1024 * 1024
+        if chunk > settings.DOCUMENT_MAX_CHUNK_BYTES:
+            raise CommandError(f"--chunk-mb must be at most {settings.DOCUMENT_MAX_CHUNK_BYTES // (1024 * 1024)}")
+
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(application.user)
+        seed = random.randrange(1 << 30)  # nội dung mới mỗi lần chạy, lặp lại được trong một lần chạy
+
+        results = {}
+        created = []
+        for case in ("fresh", "duplicate", "cross_worker"):
+            # cross_worker: nội dung khác để không bị dedupe, hasher bị bỏ giữa chừng
+            case_seed = seed + 1 if case == "cross_worker" else seed
+            results[case], session_id = self._upload(client, application, size, chunk, case_seed, case == "cross_worker")
+            created.append(session_id)
+            self.stdout.write(
+                f"{case:>12}: {results[case]['mb_per_s']:.0f} MB/s, "
+                f"{results[case]['seconds']:.2f}s, max RSS +{results[case]['rss_growth_mb']:.1f} MB, "
+                f"deduplicated={results[case]['deduplicated']}"
+            )
+
+        if not options["keep"]:
+            self._cleanup(created)
+
+        record = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "size_mb": options["size_mb"],
+            "chunk_mb": options["chunk_mb"],
+            "read_block_kb": uploads.READ_BLOCK // 1024,
+            "results": results,
+        }
+        if options["output"] != "-":
+            os.makedirs(os.path.dirname(options["output"]), exist_ok=True)
+            with open(options["output"], "a") as fh:
+                fh.write(json.dumps(record) + "\n")
+            self.stdout.write(f"Appended to {options['output']}")
+
+    def _upload(self, client, application, size, chunk, seed, drop_hasher):
+        response = client.post(
+            "/api/documents/uploads/",
+            {"application_id": application.pk, "kind": "other", "filename": "bench.bin", "size": size},
+            content_type="application/json",
+        )
+        if response.status_code != 201:
+            raise CommandError(f"create upload failed: {response.status_code} {response.content[:200]}")
+        upload_id = response.json()["upload_id"]
+        url = f"/api/documents/uploads/{upload_id}/"
+
+        rng = random.Random(seed)
+        rss_before = _max_rss_mb()
+        elapsed = 0.0
+        offset = 0
+        while offset < size:
+            n = min(chunk, size - offset)
+            body = rng.randbytes(n)
+            if drop_hasher and offset >= size // 2:
+                uploads._hashers.pop(uuid.UUID(upload_id), None)  # như chunk sau rơi vào worker khác
+            started = time.perf_counter()
+            response = client.put(
+                url, body, content_type="application/octet-stream",
+                HTTP_CONTENT_RANGE=f"bytes {offset}-{offset + n - 1}/{size}",
+            )
+            elapsed += time.perf_counter() - started
+            if response.status_code not in (200, 201):
+                raise CommandError(f"chunk at {offset} failed: {response.status_code} {response.content[:200]}")
+            offset += n
+            # test client giữ request (kèm body) trong vòng tham chiếu tới lần gc sau;
+            # dọn ngoài phần đo để RSS phản ánh đường upload chứ không phải client
+            del body
+            gc.collect()
+        data = response.json()
+        return {
+            "seconds": round(elapsed, 3),
+            "mb_per_s": round(size / (1024 * 1024) / elapsed, 1),
+            "rss_growth_mb": round(_max_rss_mb() - rss_before, 1),
+            "deduplicated": data.get("deduplicated", False),
+            "sha256": data["document"]["sha256"],
+        }, upload_id
+
+    def _cleanup(self, session_ids):
+        sessions = UploadSession.objects.filter(pk__in=session_ids).select_related("document")
+        documents = [s.document for s in sessions if s.document_id]
+        stored_ids = {d.stored_file_id for d in documents}
+        sessions.delete()
+        Document.objects.filter(pk__in=[d.pk for d in documents]).delete()
+        for stored in StoredFile.objects.filter(pk__in=stored_ids, documents__isnull=True):
+            default_storage.delete(stored.path)
+            stored.delete()
@@ -0,0 +1,79 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from Documents import extraction, extractors
+from Documents.models import Document, DocumentExtraction, StoredFile
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract text and key figures from stored documents that have no current "
+        "extraction: never extracted, failed, left pending by a crashed worker, or "
+        "extracted by an older EXTRACTOR_VERSION."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="extraction processes (1 = inline)")
+        parser.add_argument("--limit", type=int, default=None)
+
+    def handle(self, *args, **options):
+        stale = timezone.now() - timedelta(seconds=extraction.conf("stale_after_s"))
+        todo = (
+            StoredFile.objects.filter(documents__isnull=False)
+            .filter(
+                Q(extraction__isnull=True)
+                | Q(extraction__status=DocumentExtraction.Status.FAILED)
+                | ~Q(extraction__extractor_version=extractors.EXTRACTOR_VERSION)
+                | Q(extraction__status=DocumentExtraction.Status.PENDING, extraction__updated_at__lt=stale)
+            )
+            .distinct()
+            .order_by("id")
+        )
+        if options["limit"]:
+            todo = todo[: options["limit"]]
+
+        jobs = []
+        for stored in todo:
+            record, _ = DocumentExtraction.objects.update_or_create(
+                stored_file=stored,
+                defaults={"status": DocumentExtraction.Status.PENDING, "extractor_version": extractors.EXTRACTOR_VERSION},
+            )
+            record.stored_file = stored
+            document = Document.objects.filter(stored_file=stored).order_by("id").first()
+            job = extraction.job_args(record, document.filename)
+            if job is None:
+                extraction.apply_result(record.pk, error=f"larger than {extraction.conf('max_bytes')} bytes, not parsed")
+                continue
+            jobs.append((record.pk, job))
+
+        workers = max(1, options["workers"])
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(jobs) > 1 else None
+        counts = {}
+        try:
+            futures = [(pk, job, pool.submit(extractors.extract, *job[2]) if pool else None) for pk, job in jobs]
+            for pk, (path, is_temp, args), future in futures:
+                try:
+                    result = future.result() if future else extractors.extract(*args)
+                except Exception as exc:
+                    extraction.apply_result(pk, error=f"{type(exc).__name__}: {exc}")
+                    counts["failed"] = counts.get("failed", 0) + 1
+                else:
+                    extraction.apply_result(pk, result=result)
+                    key = "done" if result["method"] else "unsupported"
+                    counts[key] = counts.get(key, 0) + 1
+                finally:
+                    if is_temp:
+                        os.remove(path)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Extracted {len(jobs)} stored files: "
+            + (", ".join(f"{n} {status}" for status, n in sorted(counts.items())) or "nothing to do")
+        ))
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Documents import uploads
+from Documents.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete upload sessions that stopped receiving chunks, and their temp files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-hours", type=int, default=24)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["older_than_hours"])
+        stale = UploadSession.objects.filter(status=UploadSession.Status.UPLOADING, updated_at__lt=cutoff)
+        freed = 0
+        count = 0
+        for session in stale.iterator():
+            path = uploads.temp_path(session)
+            if path.exists():
+                freed += path.stat().st_size
+                if not options["dry_run"]:
+                    path.unlink()
+            if not options["dry_run"]:
+                session.delete()
+            count += 1
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} stale uploads ({freed / (1024 * 1024):.1f} MB of temp files)."
+        ))
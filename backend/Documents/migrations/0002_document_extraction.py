@@ -0,0 +1,42 @@
+# Generated by Django 4.2.24 on 2026-10-19 11:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0006_score_sketch'),
+        ('Documents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentExtraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('unsupported', 'Unsupported format'), ('failed', 'Failed')], default='pending', max_length=12)),
+                ('extractor_version', models.CharField(max_length=10)),
+                ('method', models.CharField(blank=True, default='', max_length=20)),
+                ('text', models.TextField(blank=True, default='')),
+                ('facts', models.JSONField(default=dict)),
+                ('error', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stored_file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='extraction', to='Documents.storedfile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ApplicationFacts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facts', models.JSONField(default=dict)),
+                ('summary', models.TextField(blank=True, default='')),
+                ('pending', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='document_facts', to='user_profile.loanapplication')),
+            ],
+        ),
+    ]
@@ -0,0 +1,100 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class DocumentKind(models.TextChoices):
+    ID_CARD = "id_card", "ID card"
+    INCOME_PROOF = "income_proof", "Income proof"
+    BANK_STATEMENT = "bank_statement", "Bank statement"
+    EMPLOYMENT_CONTRACT = "employment_contract", "Employment contract"
+    APPRAISAL = "appraisal", "Appraisal document"
+    OTHER = "other", "Other"
+
+
+# Một file lưu đúng một lần theo SHA-256, dùng chung giữa các hồ sơ
+class StoredFile(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True, default="")
+    path = models.CharField(max_length=255)  # tên file trong default_storage
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
+
+# Phiên upload theo từng chunk (Content-Range), có thể resume
+class UploadSession(models.Model):
+    class Status(models.TextChoices):
+        UPLOADING = "uploading", "Uploading"
+        COMPLETE = "complete", "Complete"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions")
+    application = models.ForeignKey("user_profile.LoanApplication", on_delete=models.CASCADE, related_name="upload_sessions")
+    kind = models.CharField(max_length=30, choices=DocumentKind.choices)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True, default="")
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)  # số byte liên tục đã ghi, cũng là offset của chunk tiếp theo
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.UPLOADING)
+    document = models.ForeignKey("Document", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id} {self.received}/{self.size}"
+
+
+class Document(models.Model):
+    application = models.ForeignKey("user_profile.LoanApplication", on_delete=models.CASCADE, related_name="documents")
+    stored_file = models.ForeignKey(StoredFile, on_delete=models.PROTECT, related_name="documents")
+    kind = models.CharField(max_length=30, choices=DocumentKind.choices)
+    filename = models.CharField(max_length=255)
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["application", "stored_file", "kind"], name="uniq_document_per_application"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.filename} for App {self.application_id}"
+
+
+# Kết quả trích xuất theo nội dung file (SHA-256): file trùng không phải xử lý lại
+class DocumentExtraction(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        DONE = "done", "Done"
+        UNSUPPORTED = "unsupported", "Unsupported format"
+        FAILED = "failed", "Failed"
+
+    stored_file = models.OneToOneField(StoredFile, on_delete=models.CASCADE, related_name="extraction")
+    status = models.CharField(max_length=12, choices=Status.choices, default=Status.PENDING)
+    extractor_version = models.CharField(max_length=10)
+    method = models.CharField(max_length=20, blank=True, default="")  # pypdf, pdf-streams, docx, text
+    text = models.TextField(blank=True, default="")  # đã cắt theo DOCUMENT_EXTRACTION["max_text_chars"]
+    facts = models.JSONField(default=dict)  # appraised_value, monthly_income, *_lines
+    error = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Extraction of {self.stored_file_id} ({self.status})"
+
+
+# Tóm tắt các tài liệu của một hồ sơ, là phần đưa vào prompt thay cho nội dung thô
+class ApplicationFacts(models.Model):
+    application = models.OneToOneField("user_profile.LoanApplication", on_delete=models.CASCADE, related_name="document_facts")
+    facts = models.JSONField(default=dict)
+    summary = models.TextField(blank=True, default="")
+    pending = models.IntegerField(default=0)  # số tài liệu chưa trích xuất xong
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Document facts for App {self.application_id}"
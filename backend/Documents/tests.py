@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from user_profile.models import LoanApplication
+from .models import Document, StoredFile, UploadSession
+
+UPLOADS_URL = "/api/documents/uploads/"
+
+
+def make_application(email):
+    user = get_user_model().objects.create_user(email, "pw", full_name=email.split("@")[0])
+    application = LoanApplication.objects.create(
+        user=user, loan_type="car", monthly_income=30_000_000, cic_group=1, loan_amount=500_000_000,
+    )
+    return user, application
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media, DOCUMENT_UPLOAD_TEMP_DIR=os.path.join(self.media, "uploads"))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user, self.application = make_application("applicant@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.body = os.urandom(3000)
+
+    def start(self, client=None, application=None):
+        response = (client or self.client).post(UPLOADS_URL, {
+            "application_id": (application or self.application).pk,
+            "kind": "other",
+            "filename": "contract.pdf",
+            "size": len(self.body),
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        return f"{UPLOADS_URL}{response.json()['upload_id']}/"
+
+    def put(self, url, start, end, client=None):
+        return (client or self.client).put(
+            url, self.body[start:end + 1], content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{len(self.body)}",
+        )
+
+    def test_chunks_are_assembled_and_stored_by_digest(self):
+        url = self.start()
+        first = self.put(url, 0, 999)
+        last = self.put(url, 1000, 2999)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["offset"], 1000)
+        self.assertEqual(last.status_code, 201)
+        document = last.json()["document"]
+        self.assertEqual(document["sha256"], hashlib.sha256(self.body).hexdigest())
+        self.assertEqual(document["size"], len(self.body))
+        stored = StoredFile.objects.get()
+        with open(os.path.join(self.media, stored.path), "rb") as fh:
+            self.assertEqual(fh.read(), self.body)
+        self.assertEqual(os.listdir(os.path.join(self.media, "uploads")), [])
+
+    def test_resume_from_reported_offset(self):
+        url = self.start()
+        self.put(url, 0, 999)
+
+        status = self.client.put(url, b"", content_type="application/octet-stream",
+                                 HTTP_CONTENT_RANGE=f"bytes */{len(self.body)}")
+        self.assertEqual(status.json()["offset"], 1000)
+        # chunk lệch offset (client tưởng đã gửi xong 2000 byte): 409 kèm offset thật
+        mismatch = self.put(url, 2000, 2999)
+        self.assertEqual(mismatch.status_code, 409)
+        self.assertEqual(mismatch.json()["offset"], 1000)
+
+        self.assertEqual(self.put(url, 1000, 2999).status_code, 201)
+        self.assertEqual(UploadSession.objects.get().status, UploadSession.Status.COMPLETE)
+
+    def test_short_chunk_is_rejected(self):
+        url = self.start()
+        response = self.client.put(
+            url, self.body[:500], content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes 0-999/{len(self.body)}",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get().received, 0)
+
+    def test_same_content_is_stored_once(self):
+        self.put(self.start(), 0, 2999)
+        other_user, other_application = make_application("other@example.com")
+        other = APIClient()
+        other.force_authenticate(other_user)
+        response = self.put(self.start(other, other_application), 0, 2999, client=other)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(StoredFile.objects.count(), 1)
+        self.assertEqual(Document.objects.count(), 2)
+        # dedupe dùng chung mọi user: không cho người upload biết
+        self.assertNotIn("deduplicated", response.json())
+
+    def test_staff_see_deduplication(self):
+        self.put(self.start(), 0, 2999)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.put(self.start(), 0, 2999)
+        self.assertTrue(response.json()["deduplicated"])
+
+    def test_other_users_cannot_write_to_the_upload(self):
+        url = self.start()
+        other_user, _ = make_application("other@example.com")
+        other = APIClient()
+        other.force_authenticate(other_user)
+        self.assertEqual(self.put(url, 0, 999, client=other).status_code, 404)
@@ -0,0 +1,276 @@
+"""
+Chunked, resumable document uploads streamed straight to disk.
+
+    POST /api/documents/uploads/        {application_id, kind, filename, size, content_type}
+                                        => {upload_id, offset: 0, ...}
+    PUT  /api/documents/uploads/<id>/   Content-Range: bytes <start>-<end>/<size>, raw chunk body
+                                        => {offset} (201 + document once the last byte is in)
+    PUT  ... Content-Range: bytes */<size>, empty body => current offset (finalizes if complete)
+    GET  /api/documents/uploads/<id>/   => {offset, size, status}
+
+A chunk is read from the request in READ_BLOCK pieces into its own temp file,
+so memory stays at one block whatever the file size, and no DB lock is held
+while a slow client sends it. Only then is the UploadSession row locked, the
+offset checked again and the chunk copied into the upload's temp file (a local
+disk copy). The SHA-256 is updated block by block in the worker that received the chunk;
+if the next chunk lands on another worker (or after a restart) the digest is
+recomputed from the temp file at the end. Completed files are stored once per
+digest (StoredFile), linked to the application through a Document and queued
+for text extraction (Documents/extraction.py).
+"""
+import hashlib
+import os
+import re
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from backend import metrics
+
+from . import extraction
+from .models import Document, StoredFile, UploadSession
+
+READ_BLOCK = 1024 * 1024
+
+UPLOAD_BYTES = metrics.counter("documents_upload_bytes_total", "Document bytes written to disk")
+DEDUPLICATED = metrics.counter("documents_deduplicated_total", "Completed uploads whose content was already stored")
+REHASHED = metrics.counter("documents_rehashed_total", "Uploads hashed from disk because chunks crossed workers")
+
+_CONTENT_RANGE = re.compile(r"^bytes (?:(\d+)-(\d+)|\*)/(\d+)$")
+
+
+class UploadError(ValueError):
+    status_code = 400
+
+
+class OffsetMismatch(UploadError):
+    status_code = 409
+
+    def __init__(self, offset):
+        super().__init__(f"chunk must start at offset {offset}")
+        self.offset = offset
+
+
+# upload id -> (offset the digest covers, hashlib object); chỉ trong process này
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def temp_path(session):
+    return Path(settings.DOCUMENT_UPLOAD_TEMP_DIR) / f"{session.id}.part"
+
+
+def stored_path(digest):
+    return f"documents/{digest[:2]}/{digest}"
+
+
+def parse_content_range(header, size):
+    """(start, end) inclusive, or None for a `bytes */size` status query."""
+    match = _CONTENT_RANGE.match((header or "").strip())
+    if not match:
+        raise UploadError("Content-Range must be 'bytes <start>-<end>/<size>' or 'bytes */<size>'")
+    start, end, total = match.groups()
+    if int(total) != size:
+        raise UploadError(f"Content-Range size {total} does not match upload size {size}")
+    if start is None:
+        return None
+    start, end = int(start), int(end)
+    if start > end or end >= size:
+        raise UploadError("Content-Range is outside the upload")
+    if end - start + 1 > settings.DOCUMENT_MAX_CHUNK_BYTES:
+        raise UploadError(f"chunks must be at most {settings.DOCUMENT_MAX_CHUNK_BYTES} bytes")
+    return start, end
+
+
+def create_session(user, application, kind, filename, size, content_type=""):
+    if size <= 0:
+        raise UploadError("size must be > 0")
+    if size > settings.DOCUMENT_MAX_BYTES:
+        raise UploadError(f"files must be at most {settings.DOCUMENT_MAX_BYTES} bytes")
+    session = UploadSession.objects.create(
+        user=user,
+        application=application,
+        kind=kind,
+        filename=os.path.basename(filename)[:255],
+        content_type=content_type[:100],
+        size=size,
+    )
+    path = temp_path(session)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    with _hashers_lock:
+        _hashers[session.id] = (0, hashlib.sha256())
+    return session
+
+
+def _peek_hasher(session_id, offset):
+    # bản sao: chunk có thể hỏng / thua chunk khác, hasher gốc chỉ thay khi chunk được ghi
+    with _hashers_lock:
+        state = _hashers.get(session_id)
+    if state and state[0] == offset:
+        return state[1].copy()
+    return None
+
+
+def _take_hasher(session_id, offset):
+    with _hashers_lock:
+        state = _hashers.pop(session_id, None)
+    if state and state[0] == offset:
+        return state[1]
+    return None
+
+
+def write_chunk(session_id, stream, start, end):
+    """
+    Append bytes start..end (inclusive) read from `stream` to the upload.
+    The body is received without any lock; the row lock then serializes the
+    commit of chunks of one upload. A chunk that does not start at the current
+    offset raises OffsetMismatch so the client can resume.
+    """
+    length = end - start + 1
+    session = UploadSession.objects.get(pk=session_id)
+    if session.status == UploadSession.Status.COMPLETE:
+        return session
+    if start != session.received:
+        raise OffsetMismatch(session.received)
+
+    hasher = _peek_hasher(session.id, start)
+    chunk = _receive(session, stream, start, length, hasher)
+    try:
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session_id)
+            if session.status == UploadSession.Status.COMPLETE:
+                return session
+            if start != session.received:
+                raise OffsetMismatch(session.received)  # một request khác đã ghi chunk này trước
+
+            with open(temp_path(session), "r+b") as out, open(chunk, "rb") as src:
+                out.seek(start)
+                out.truncate()  # bỏ phần thừa của lần ghi trước bị ngắt giữa chừng
+                shutil.copyfileobj(src, out, READ_BLOCK)
+            session.received = end + 1
+            session.save(update_fields=["received", "updated_at"])
+            with _hashers_lock:
+                if hasher is not None:
+                    _hashers[session.id] = (session.received, hasher)
+                else:
+                    _hashers.pop(session.id, None)
+            if session.received == session.size:
+                return finalize(session)  # vẫn giữ row lock: không finalize hai lần
+    finally:
+        os.remove(chunk)
+    return session
+
+
+def _receive(session, stream, start, length, hasher):
+    """Stream one chunk from the client into its own temp file; returns its path."""
+    path = temp_path(session).with_name(f"{session.id}.{start}.{uuid.uuid4().hex}.chunk")
+    written = 0
+    try:
+        with open(path, "wb") as out:
+            while written < length:
+                block = stream.read(min(READ_BLOCK, length - written))
+                if not block:
+                    break
+                out.write(block)
+                if hasher is not None:
+                    hasher.update(block)
+                written += len(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    UPLOAD_BYTES.inc(written)
+    if written != length:
+        os.remove(path)
+        raise UploadError(f"chunk body has {written} bytes, Content-Range says {length}")
+    return path
+
+
+def _hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(READ_BLOCK), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _move_into_storage(src, name):
+    try:
+        dest = default_storage.path(name)
+    except NotImplementedError:
+        dest = None
+    if dest is None:
+        # storage không phải filesystem (S3...): stream file lên
+        with open(src, "rb") as fh:
+            default_storage.save(name, File(fh, name=os.path.basename(name)))
+        os.remove(src)
+        return
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    if os.path.exists(dest):
+        os.remove(src)
+    else:
+        os.replace(src, dest)  # cùng filesystem với MEDIA_ROOT => chỉ rename, không copy
+
+
+def finalize(session):
+    """
+    Store the completed temp file under its digest (once) and link it to the
+    application. Called with the UploadSession row locked.
+    """
+    path = temp_path(session)
+    hasher = _take_hasher(session.id, session.size)
+    if hasher is not None:
+        digest = hasher.hexdigest()
+    else:
+        REHASHED.inc()
+        digest = _hash_file(path)
+
+    stored = StoredFile.objects.filter(sha256=digest).first()
+    session.deduplicated = stored is not None
+    if stored is not None:
+        DEDUPLICATED.inc()
+        os.remove(path)
+    else:
+        _move_into_storage(path, stored_path(digest))
+        try:
+            with transaction.atomic():
+                stored = StoredFile.objects.create(
+                    sha256=digest, size=session.size, content_type=session.content_type, path=stored_path(digest),
+                )
+        except IntegrityError:
+            # hai upload cùng nội dung hoàn tất cùng lúc. Đọc có khoá = đọc bản commit mới nhất:
+            # get() thường trong transaction ngoài (REPEATABLE READ của MySQL) chỉ thấy snapshot cũ
+            stored = StoredFile.objects.select_for_update().get(sha256=digest)
+            session.deduplicated = True
+            DEDUPLICATED.inc()
+
+    with transaction.atomic():
+        document, _ = Document.objects.get_or_create(
+            application_id=session.application_id,
+            stored_file=stored,
+            kind=session.kind,
+            defaults={"filename": session.filename, "uploaded_by_id": session.user_id},
+        )
+        session.status = UploadSession.Status.COMPLETE
+        session.document = document
+        session.save(update_fields=["status", "document", "updated_at"])
+    # trích xuất nội dung chạy nền, sau khi upload đã commit (xem extraction.py)
+    transaction.on_commit(lambda: extraction.schedule(document.pk))
+    return session
+
+
+def resume_status(session_id):
+    """`bytes */size` query: current state, finalizing an upload whose last chunk was written but not stored."""
+    session = UploadSession.objects.get(pk=session_id)
+    if session.status == UploadSession.Status.UPLOADING and session.received == session.size:
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session_id)
+            if session.status == UploadSession.Status.UPLOADING:
+                return finalize(session)
+    return session
@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import DocumentFactsView, DocumentListView, UploadChunkView, UploadSessionView
+
+urlpatterns = [
+    path('', DocumentListView.as_view(), name='documents'),
+    path('facts/', DocumentFactsView.as_view(), name='document-facts'),
+    path('uploads/', UploadSessionView.as_view(), name='document-upload'),
+    path('uploads/<uuid:upload_id>/', UploadChunkView.as_view(), name='document-upload-chunk'),
+]
@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from user_profile.models import LoanApplication
+from .models import ApplicationFacts, Document, DocumentKind, UploadSession
+from . import uploads
+
+
+def _extraction_status(document):
+    extraction = getattr(document.stored_file, "extraction", None)
+    return extraction.status if extraction else None
+
+
+def _document_data(document):
+    return {
+        "id": document.pk,
+        "application_id": document.application_id,
+        "kind": document.kind,
+        "filename": document.filename,
+        "size": document.stored_file.size,
+        "sha256": document.stored_file.sha256,
+        "content_type": document.stored_file.content_type,
+        "extraction": _extraction_status(document),
+        "created_at": document.created_at,
+    }
+
+
+def _session_data(session, request):
+    data = {
+        "upload_id": str(session.id),
+        "offset": session.received,
+        "size": session.size,
+        "status": session.status,
+    }
+    if session.document_id:
+        data["document"] = _document_data(session.document)
+        if request.user.is_staff:
+            # dedupe dùng chung mọi user: không cho người upload dò file của người khác
+            data["deduplicated"] = getattr(session, "deduplicated", False)
+    return data
+
+
+class UploadSessionView(APIView):
+    """POST {application_id, kind, filename, size, content_type} => mở phiên upload."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        application = get_object_or_404(LoanApplication, pk=request.data.get("application_id"), user=request.user)
+        kind = request.data.get("kind", DocumentKind.OTHER)
+        if kind not in DocumentKind.values:
+            return Response({"error": f"kind must be one of {DocumentKind.values}"}, status=status.HTTP_400_BAD_REQUEST)
+        filename = request.data.get("filename")
+        try:
+            size = int(request.data.get("size"))
+        except (TypeError, ValueError):
+            return Response({"error": "size (bytes) is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not filename:
+            return Response({"error": "filename is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = uploads.create_session(
+                request.user, application, kind, filename, size, request.data.get("content_type") or "",
+            )
+        except uploads.UploadError as exc:
+            return Response({"error": str(exc)}, status=exc.status_code)
+        data = _session_data(session, request)
+        data["chunk_size"] = settings.DOCUMENT_CHUNK_BYTES  # kích thước chunk gợi ý cho client
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class UploadChunkView(APIView):
+    """
+    PUT raw bytes with Content-Range (xem Documents/uploads.py).
+    Body không đi qua parser của DRF: đọc thẳng từ request stream từng block.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def _session(self, request, upload_id):
+        return get_object_or_404(UploadSession.objects.select_related("document__stored_file__extraction"), pk=upload_id, user=request.user)
+
+    def get(self, request, upload_id):
+        return Response(_session_data(self._session(request, upload_id), request), status=status.HTTP_200_OK)
+
+    def put(self, request, upload_id):
+        session = self._session(request, upload_id)
+        try:
+            byte_range = uploads.parse_content_range(request.headers.get("Content-Range"), session.size)
+            if byte_range is None:
+                session = uploads.resume_status(session.id)
+            else:
+                start, end = byte_range
+                length = int(request.headers.get("Content-Length") or 0)
+                if length != end - start + 1:
+                    raise uploads.UploadError("Content-Length must match Content-Range")
+                session = uploads.write_chunk(session.id, request.stream, start, end)
+        except uploads.OffsetMismatch as exc:
+            return Response({"error": str(exc), "offset": exc.offset}, status=exc.status_code)
+        except uploads.UploadError as exc:
+            return Response({"error": str(exc)}, status=exc.status_code)
+
+        data = _session_data(session, request)
+        code = status.HTTP_201_CREATED if session.status == UploadSession.Status.COMPLETE else status.HTTP_200_OK
+        return Response(data, status=code)
+
+
+class DocumentListView(APIView):
+    """GET ?application_id= => tài liệu đã upload của hồ sơ."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        application = get_object_or_404(LoanApplication, pk=request.query_params.get("application_id"), user=request.user)
+        documents = (
+            Document.objects.filter(application=application)
+            .select_related("stored_file__extraction")
+            .order_by("created_at")
+        )
+        return Response([_document_data(d) for d in documents], status=status.HTTP_200_OK)
+
+
+class DocumentFactsView(APIView):
+    """GET ?application_id= => facts trích xuất từ tài liệu và tóm tắt đưa vào prompt."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        application = get_object_or_404(LoanApplication, pk=request.query_params.get("application_id"), user=request.user)
+        facts = ApplicationFacts.objects.filter(application=application).first()
+        documents = (
+            Document.objects.filter(application=application)
+            .select_related("stored_file__extraction")
+            .order_by("created_at")
+        )
+        return Response(
+            {
+                "application_id": application.pk,
+                "summary": facts.summary if facts else "",
+                "facts": facts.facts if facts else {},
+                "pending": facts.pending if facts else 0,
+                "documents": [
+                    {
+                        "id": d.pk,
+                        "filename": d.filename,
+                        "kind": d.kind,
+                        "extraction": _extraction_status(d),
+                        "facts": d.stored_file.extraction.facts if _extraction_status(d) else {},
+                    }
+                    for d in documents
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
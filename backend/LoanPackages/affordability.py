@@ -0,0 +1,138 @@
+"""
+Repayment and post-loan DTI for one applicant across every LoanOption.
+
+LoanOption keeps rate and term as display text ("As low as 7.5%/year",
+"Up to 7 years"), so each option is first parsed into the rates it quotes
+(one, or the low / high ends of a range) and its longest term. The options
+are then expanded into one flat grid of (option, term) rows, terms stepping by
+LOAN_AFFORDABILITY["term_step_months"] up to the option's maximum, with a low
+and a high rate column, and the annuity formula runs over the whole grid in
+one NumPy pass:
+
+    installment = P * r / (1 - (1 + r) ** -n)      r = annual rate / 12
+    post-loan DTI = (current monthly debt + installment) / monthly income
+
+Per option the shortest term that keeps the DTI within the loan type's knockout
+(base_line_scoring) at the option's *highest* quoted rate is chosen, since the
+"as low as" rate is rarely what the applicant gets. Options are ranked:
+affordable first, then lowest total interest, then lowest DTI. Options whose
+text cannot be parsed are listed last with affordability None.
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+from user_profile.base_line_scoring import CAR_CONFIG, REAL_ESTATE_LOAN_CONFIG
+
+DTI_LIMITS = {
+    "car": float(CAR_CONFIG["dti_knockout"]),
+    "real_estate": float(REAL_ESTATE_LOAN_CONFIG["dti_knockout"]),
+}
+
+_PERCENT = re.compile(r"(\d+(?:[.,]\d+)?)\s*%")
+_PER_MONTH = re.compile(r"month|tháng|/\s*th\b", re.IGNORECASE)
+_TERM = re.compile(r"(\d+(?:[.,]\d+)?)\s*(years?|yrs?|năm|months?|tháng)", re.IGNORECASE)
+
+
+def conf(name):
+    return settings.LOAN_AFFORDABILITY[name]
+
+
+def _number(text):
+    return float(text.replace(",", "."))
+
+
+@lru_cache(maxsize=1024)
+def parse_rates(text):
+    """Annual rates (fractions) quoted in the text: (low,) or (low, high); () if none."""
+    rates = [_number(value) / 100 for value in _PERCENT.findall(text or "")]
+    if not rates:
+        return ()
+    if _PER_MONTH.search(text):
+        rates = [rate * 12 for rate in rates]
+    low, high = min(rates), max(rates)
+    return (low,) if low == high else (low, high)
+
+
+@lru_cache(maxsize=1024)
+def parse_term_months(text):
+    """Longest term in the text, in months; None if no term is given."""
+    months = [
+        _number(value) * (1 if unit.lower().startswith(("month", "tháng")) else 12)
+        for value, unit in _TERM.findall(text or "")
+    ]
+    return int(max(months)) if months else None
+
+
+def _round(value, digits=0):
+    return round(float(value), digits) if digits else int(round(float(value)))
+
+
+def installments(principal, annual_rates, months):
+    """Monthly annuity payment, vectorized over rates / months (zero rate = straight line)."""
+    principal = np.asarray(principal, dtype=float)
+    rate = np.asarray(annual_rates, dtype=float) / 12
+    months = np.asarray(months, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = principal * rate / -np.expm1(-months * np.log1p(rate))
+    return np.where(rate > 0, annuity, principal / months)
+
+
+def project(options, loan_type, monthly_income, monthly_debt_payments, loan_amount):
+    """
+    {option id: affordability dict or None} for option rows with "id",
+    "exclusive_interest_rate" and "estimated_term".
+    """
+    result, parsed = {}, []
+    for option in options:
+        quoted = parse_rates(option["exclusive_interest_rate"])
+        max_months = parse_term_months(option["estimated_term"])
+        result[option["id"]] = None
+        if quoted and max_months:
+            parsed.append((option["id"], quoted[0], quoted[-1], max_months))
+    income = float(monthly_income or 0)
+    if not parsed or income <= 0:
+        return result
+
+    ids, low_rates, high_rates, max_months = (np.array(column) for column in zip(*parsed))
+    step = conf("term_step_months")
+    # lưới phẳng: mỗi option có ceil(max / step) kỳ hạn step, 2*step, ..., max (tăng dần)
+    counts = -(-max_months // step)
+    first = np.cumsum(counts) - counts
+    owner = np.repeat(np.arange(len(parsed)), counts)
+    terms = np.minimum((np.arange(counts.sum()) - first[owner] + 1) * step, max_months[owner])
+    # cột 0 = lãi thấp nhất, cột 1 = lãi cao nhất được quảng cáo
+    rates = np.stack((low_rates[owner], high_rates[owner]), axis=1)
+
+    principal = float(loan_amount)
+    installment = installments(principal, rates, terms[:, None])
+    total_interest = installment * terms[:, None] - principal
+    dti = (float(monthly_debt_payments or 0) + installment) / income
+    limit = DTI_LIMITS.get(loan_type, max(DTI_LIMITS.values()))
+    affordable = dti[:, 1] <= limit
+
+    # mỗi option: kỳ hạn ngắn nhất vừa sức ở mức lãi cao, không có thì kỳ hạn dài nhất
+    candidates = np.where(affordable, np.arange(len(terms)), len(terms))
+    first_fit = np.minimum.reduceat(candidates, first)
+    picks = np.where(first_fit < len(terms), first_fit, first + counts - 1)
+
+    for option, row in enumerate(picks):
+        result[ids[option].item()] = {
+            "term_months": int(terms[row]),
+            "annual_rate_pct": [_round(rate * 100, 3) for rate in rates[row]],
+            "installment": [_round(value) for value in installment[row]],
+            "total_interest": [_round(value) for value in total_interest[row]],
+            "post_loan_dti": [_round(value, 4) for value in dti[row]],
+            "dti_limit": limit,
+            "affordable": bool(affordable[row]),
+        }
+    return result
+
+
+def rank_key(row):
+    facts = row["affordability"]
+    if facts is None:
+        return (2, 0, 0)
+    return (0 if facts["affordable"] else 1, facts["total_interest"][1], facts["post_loan_dti"][1])
@@ -0,0 +1,79 @@
+"""
+In-memory snapshot of the loan option catalog for LoanOptionView and
+LoanOptionMatchView, which used to read every option from the DB per request.
+
+The snapshot holds the raw loan_option_reader rows (LoanOption + bank + logo
+key) in id order; the views turn them into LoanOptionSerializer output with
+loan_option_reader.build_all(), so key_icon is still built for the request.
+It is registered with backend/preload.py: built once in the gunicorn master
+and shared by the workers.
+
+Version: read from the DB so every worker sees writes made by any process,
+whatever the cache backend: LoanOption count, max id and max updated_at (inserts,
+deletes, edits) and Bank max updated_at (name, key_icon, logo). Catalog writes
+in this process also invalidate the snapshot right away (bump()).
+"""
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+
+from Banks.models import Bank, LogoAsset
+from backend import preload
+
+from . import affordability
+from .models import LoanOption
+from .serializer import loan_option_reader
+
+class Snapshot:
+    __slots__ = ("rows", "by_id", "by_type")
+
+    def __init__(self, rows):
+        self.rows = tuple(rows)
+        self.by_id = {row["id"]: row for row in self.rows}
+        by_type = {}
+        for row in self.rows:
+            by_type.setdefault(row["loan_type"], []).append(row)
+        self.by_type = {loan_type: tuple(group) for loan_type, group in by_type.items()}
+
+
+def _load():
+    snapshot = Snapshot(loan_option_reader.values(LoanOption.objects.order_by("id")))
+    for row in snapshot.rows:
+        # lru_cache của affordability cũng được dựng trước khi fork
+        affordability.parse_rates(row["exclusive_interest_rate"])
+        affordability.parse_term_months(row["estimated_term"])
+    return snapshot
+
+
+def version():
+    options = LoanOption.objects.aggregate(n=Count("id"), last=Max("id"), updated=Max("updated_at"))
+    banks = Bank.objects.aggregate(updated=Max("updated_at"))
+    return options["n"], options["last"], options["updated"], banks["updated"]
+
+
+preload.register("loan_catalog", _load, version=version)
+
+
+def snapshot():
+    return preload.get("loan_catalog")
+
+
+def _invalidate():
+    preload.invalidate("loan_catalog")
+
+
+def bump():
+    """
+    Call after writing the catalog without model signals (bulk_create). Other
+    workers pick the change up from version(); update() must set updated_at.
+    """
+    transaction.on_commit(_invalidate)
+
+
+def _changed(sender, **kwargs):
+    bump()
+
+
+for _model in (LoanOption, Bank, LogoAsset):
+    post_save.connect(_changed, sender=_model, dispatch_uid=f"loan_catalog:{_model.__name__}:save")
+    post_delete.connect(_changed, sender=_model, dispatch_uid=f"loan_catalog:{_model.__name__}:delete")
@@ -0,0 +1,241 @@
+"""
+Follow-up chat on a stored LoanAnalysis.
+
+Every turn sends the same prefix (system instruction + applicant profile, loan
+option and the analysis result), then a rolling summary of older turns, the
+recent turns and the new question. The prefix is put in an explicit Gemini
+context cache per analysis when it is large enough; otherwise it goes in the
+system instruction unchanged every turn so Gemini's implicit prefix caching
+applies. Once the recent turns exceed `history_tokens` they are folded into the
+summary after the reply, so input per turn stays about the same size however
+long the conversation gets.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import resilience, routing
+from .models import ChatMessage
+from .service import _profile_and_scoring_rules, call_gemini_resilient, get_client, usage_of
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_INSTRUCTION = """
+You are FinCare's loan assistant. The applicant has already received the loan analysis below and is asking follow-up questions about it.
+Answer in the language of the question, concisely (under 200 words unless asked for more), using the applicant's actual numbers.
+Do not invent data that is not in the profile or the analysis; say what is missing instead. Do not output JSON.
+""".strip()
+
+SUMMARY_PROMPT = """
+Update the running summary of a conversation between a loan applicant and an assistant about their loan analysis.
+Keep every number, decision and open question; drop greetings and repetition. At most 200 words, plain text.
+
+Current summary:
+{summary}
+
+New turns to fold in:
+{turns}
+""".strip()
+
+
+UNAVAILABLE = "The assistant is temporarily unavailable, please try again."
+
+
+def conf(name):
+    return settings.GEMINI_CHAT[name]
+
+
+def estimate_tokens(text):
+    # ~4 ký tự / token cho tiếng Anh, tiếng Việt có dấu thường nhiều hơn => ước lượng dư
+    return len(text) // 3 + 1
+
+
+def anchor_text(analysis):
+    return (
+        f"{_profile_and_scoring_rules(analysis.loan_application, analysis.loan_option)}\n\n"
+        f"Analysis result given to the applicant (JSON):\n"
+        f"{json.dumps(analysis.result, ensure_ascii=False, sort_keys=True)}"
+    )
+
+
+def context_cache(analysis, model):
+    """
+    Name of a live Gemini cachedContents entry for the analysis prefix, creating
+    it if needed; None when the prefix is too small to cache or creation fails.
+    """
+    from google.genai import types
+
+    now = timezone.now()
+    if (
+        analysis.context_cache
+        and analysis.context_cache_model == model
+        and analysis.context_cache_expires_at
+        and analysis.context_cache_expires_at > now + timedelta(minutes=2)
+    ):
+        return analysis.context_cache
+
+    anchor = anchor_text(analysis)
+    if estimate_tokens(SYSTEM_INSTRUCTION + anchor) < conf("min_cache_tokens"):
+        return None
+    ttl = conf("context_cache_ttl_s")
+    try:
+        cache = get_client().caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=SYSTEM_INSTRUCTION,
+                contents=[anchor],
+                ttl=f"{ttl}s",
+                display_name=f"fincare-analysis-{analysis.pk}",
+            ),
+        )
+    except Exception as exc:
+        logger.info("Gemini context cache for analysis %s not created: %s", analysis.pk, exc)
+        return None
+    analysis.context_cache = cache.name
+    analysis.context_cache_model = model
+    analysis.context_cache_expires_at = now + timedelta(seconds=ttl)
+    analysis.save(update_fields=["context_cache", "context_cache_model", "context_cache_expires_at"])
+    return cache.name
+
+
+def recent_messages(session):
+    return list(session.messages.filter(id__gt=session.summarized_through).order_by("id"))
+
+
+def build_contents(session, question, history):
+    """Summary + recent turns (newest kept first if over budget) + the question."""
+    from google.genai import types
+
+    budget = conf("history_tokens")
+    kept = []
+    for message in reversed(history):
+        budget -= estimate_tokens(message.content)
+        if budget < 0:
+            break  # summary chưa kịp cập nhật: cắt bớt lượt cũ cho prompt lần này
+        kept.append(message)
+    kept.reverse()
+
+    contents = []
+    if session.summary:
+        contents.append(types.Content(role="user", parts=[types.Part(text=f"Summary of our earlier conversation:\n{session.summary}")]))
+        contents.append(types.Content(role="model", parts=[types.Part(text="Understood.")]))
+    for message in kept:
+        role = "user" if message.role == ChatMessage.Role.USER else "model"
+        contents.append(types.Content(role=role, parts=[types.Part(text=message.content)]))
+    contents.append(types.Content(role="user", parts=[types.Part(text=question)]))
+    return contents
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_reply(session, question):
+    """
+    Server-sent events for one turn: `delta` chunks, then `done` with the stored
+    message id and token usage (or `error`). ChatMessageView answers 503 while the
+    breaker rejects calls; the breaker slot itself is taken here, inside the
+    generator, so it is only held while the stream actually runs and is given
+    back however the stream ends (error, client disconnect). The question is
+    stored together with the reply, so a failed turn leaves no trace in the
+    history.
+    """
+    from google.genai import types
+
+    model = conf("model")
+    breaker = resilience.breaker_for(model)
+    try:
+        probe = breaker.before_call()
+    except resilience.CircuitOpen:
+        yield _sse("error", {"error": UNAVAILABLE})
+        return
+    settled = False
+    try:
+        history = recent_messages(session)
+        cache_name = context_cache(session.analysis, model)
+        config = types.GenerateContentConfig(
+            max_output_tokens=conf("max_output_tokens"),
+            http_options=types.HttpOptions(timeout=conf("timeout_ms")),
+        )
+        if cache_name:
+            config.cached_content = cache_name
+        else:
+            config.system_instruction = f"{SYSTEM_INSTRUCTION}\n\n{anchor_text(session.analysis)}"
+
+        parts = []
+        last = None
+        try:
+            for chunk in get_client().models.generate_content_stream(
+                model=model, contents=build_contents(session, question, history), config=config,
+            ):
+                last = chunk
+                text = chunk.text or ""
+                if text:
+                    parts.append(text)
+                    yield _sse("delta", {"text": text})
+        except Exception as exc:
+            if resilience.is_retryable(exc):
+                breaker.record_failure()
+                settled = True
+            logger.warning("Chat session %s: Gemini stream failed: %s", session.pk, exc)
+            yield _sse("error", {"error": UNAVAILABLE})
+            return
+        breaker.record_success()
+        settled = True
+    finally:
+        if probe and not settled:
+            # lỗi trước khi gọi, lỗi không retry được, client ngắt giữa stream
+            breaker.release()
+
+    usage = usage_of(last)
+    routing.record_usage(model, "chat", usage)
+    ChatMessage.objects.create(session=session, role=ChatMessage.Role.USER, content=question)
+    reply = ChatMessage.objects.create(
+        session=session,
+        role=ChatMessage.Role.ASSISTANT,
+        content="".join(parts),
+        input_tokens=usage["input_tokens"],
+        cached_tokens=usage["cached_tokens"],
+        output_tokens=usage["output_tokens"],
+    )
+    yield _sse("done", {"message_id": reply.pk, "usage": usage})
+
+    # client đã nhận "done"; gộp lịch sử cũ vào summary cho lượt sau
+    try:
+        summarize(session)
+    except Exception as exc:
+        logger.warning("Chat session %s: summary not updated: %s", session.pk, exc)
+
+
+def summarize(session):
+    """Fold the oldest unsummarized turns into session.summary once they exceed the budget."""
+    history = recent_messages(session)
+    total = sum(estimate_tokens(m.content) for m in history)
+    if total <= conf("history_tokens"):
+        return False
+    # giữ lại khoảng nửa ngân sách gần nhất nguyên văn, phần còn lại vào summary
+    keep = conf("history_tokens") // 2
+    folded = []
+    for message in history:
+        if total <= keep:
+            break
+        folded.append(message)
+        total -= estimate_tokens(message.content)
+    turns = "\n".join(f"{m.role}: {m.content}" for m in folded)
+    result = call_gemini_resilient(
+        SUMMARY_PROMPT.format(summary=session.summary or "(none)", turns=turns),
+        max_tokens=conf("summary_max_tokens"),
+        model=conf("summary_model"),
+        timeout_ms=conf("timeout_ms"),
+        deadline_ms=conf("timeout_ms"),
+    )
+    routing.record_usage(result["model"], "chat_summary", result["usage"])
+    if not result["raw_text"]:
+        return False
+    session.summary = result["raw_text"]
+    session.summarized_through = folded[-1].pk
+    session.save(update_fields=["summary", "summarized_through", "updated_at"])
+    return True
@@ -0,0 +1,132 @@
+"""
+Answers for geminiView when Gemini cannot be reached: the last good result
+for the same input (from the cache), otherwise a local computation of the
+numeric part of the prompt (DTI, LTV and breakdown scores, same formulas as
+_profile_and_scoring_rules in service.py) without the model's narrative.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from backend import metrics
+
+CACHE_TTL = 24 * 60 * 60
+FALLBACKS = metrics.counter(
+    "gemini_fallbacks_total", "Analyses served without Gemini", ("request_class", "source"),
+)
+
+# loan_application / loan_option keys the prompt actually reads
+_APPLICATION_KEYS = (
+    "userType", "loan_type", "monthly_income", "monthly_debt_payments", "cic_group",
+    "credit_history_months", "credit_utilization_pct", "num_late_payments_24m",
+    "num_new_inquiries_6m", "credit_mix_types", "loan_amount", "down_payment",
+    "vehicle_value", "property_value", "employment_type", "employment_duration_months",
+    "salary_payment_method", "additional_info", "documents_summary",
+)
+_OPTION_KEYS = (
+    "bank_name", "title", "loan_type", "exclusive_interest_rate", "estimated_term",
+    "key_requirement", "average_processing_time",
+)
+
+_ADVICE = {
+    "credit_score": "Keep all accounts current and avoid opening new credit lines to move towards a better CIC group.",
+    "income_stability": "Receive salary by bank transfer and document all income sources to show stable income.",
+    "debt_to_income": "Pay down or consolidate existing debts to bring monthly repayments below 36% of income.",
+    "employment_history": "Stay with the current employer longer; lenders prefer more than 24 months in a permanent role.",
+    "credit_utilization": "Reduce card balances to below 30% of the total credit limit.",
+    "payment_history": "Set up automatic payments so no instalment is late from now on.",
+}
+
+
+def cache_key(application, loan_option, request_class):
+    payload = json.dumps(
+        [
+            request_class,
+            [application.get(k) for k in _APPLICATION_KEYS],
+            [loan_option.get(k) for k in _OPTION_KEYS],
+        ],
+        default=str,
+    )
+    return "gemini:last:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+def remember(application, loan_option, request_class, parsed_result):
+    cache.set(cache_key(application, loan_option, request_class), parsed_result, CACHE_TTL)
+
+
+def cached(application, loan_option, request_class):
+    return cache.get(cache_key(application, loan_option, request_class))
+
+
+def _num(value):
+    try:
+        return float(value) if value not in (None, "") else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _clamp(value):
+    return max(0.0, min(100.0, round(value, 2)))
+
+
+def local_analysis(application, loan_option):
+    income = _num(application.get("monthly_income"))
+    debt = _num(application.get("monthly_debt_payments"))
+    dti = round(debt / income * 100, 2) if income else None
+
+    collateral = _num(application.get("vehicle_value")) or _num(application.get("property_value"))
+    ltv = round(_num(application.get("loan_amount")) / collateral * 100, 2) if collateral else None
+
+    cic = int(_num(application.get("cic_group")) or 5)
+    credit = (5 - min(max(cic, 1), 5)) * 25
+    credit -= _num(application.get("num_late_payments_24m")) * 5
+    credit -= _num(application.get("num_new_inquiries_6m")) * 5
+    if _num(application.get("credit_mix_types")) >= 2:
+        credit += 5
+
+    income_stability = 70.0 if income else 0.0
+    if application.get("salary_payment_method") == "bank_transfer":
+        income_stability += 30
+
+    months = _num(application.get("employment_duration_months"))
+    employment = min(max((months - 6) / 18 * 100, 0), 100)
+    if "part" in str(application.get("employment_type") or "").lower():
+        employment *= 0.5
+
+    utilization = _num(application.get("credit_utilization_pct"))
+    breakdown = {
+        "credit_score": _clamp(credit),
+        "income_stability": _clamp(income_stability),
+        "debt_to_income": _clamp(100 - dti * 2) if dti is not None and dti < 50 else 0.0,
+        "employment_history": _clamp(employment),
+        "credit_utilization": 100.0 if utilization < 30 else (50.0 if utilization <= 50 else 0.0),
+        "payment_history": _clamp(100 - _num(application.get("num_late_payments_24m")) * 20),
+    }
+    score = _clamp(sum(breakdown.values()) / len(breakdown))
+    weakest = sorted(breakdown, key=breakdown.get)[:4]
+    return {
+        "loan_readiness_score": score,
+        "dti": dti,
+        "ltv": ltv,
+        "breakdown_scores": breakdown,
+        "reasoning": (
+            "AI analysis is temporarily unavailable. These scores were computed locally "
+            "from the standard DTI, LTV and credit rules and do not include a match "
+            f"assessment for {loan_option.get('title') or 'the selected loan option'}."
+        ),
+        "improvement_advice": [_ADVICE[key] for key in weakest],
+    }
+
+
+def fallback_result(application, loan_option, request_class):
+    """Result dict shaped like call_gemini's, with "source" set to "cache" or "local"."""
+    parsed = cached(application, loan_option, request_class)
+    source = "cache"
+    if parsed is None:
+        parsed = local_analysis(application, loan_option)
+        if request_class == "numeric":
+            parsed = {k: parsed[k] for k in ("loan_readiness_score", "dti", "ltv", "breakdown_scores")}
+        source = "local"
+    FALLBACKS.inc(request_class=request_class, source=source)
+    return {"parsed_result": parsed, "raw_text": None, "model": None, "source": source}
@@ -0,0 +1,158 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Một "master" kiểu gunicorn trong process con: lazy = mỗi worker tự load app sau
+# fork (preload_app=False), preload = master load app + backend/preload.py rồi fork.
+# Worker chạy các request đầu tiên, chờ tất cả cùng xong rồi mới đọc smaps_rollup
+# để PSS phản ánh các trang thật sự dùng chung giữa các worker còn sống.
+PREFORK_SCRIPT = """
+import json, os, statistics, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+workers, urls, mode = int(sys.argv[1]), sys.argv[2:], os.environ["BENCH_MODE"]
+
+def memory():
+    try:
+        with open("/proc/self/smaps_rollup") as fh:
+            fields = dict(line.split(":", 1) for line in fh if ":" in line)
+    except OSError:
+        return {}
+    kb = {name: int(value.split()[0]) for name, value in fields.items() if value.strip().endswith("kB")}
+    return {
+        "rss_mb": kb.get("Rss", 0) / 1024,
+        "pss_mb": kb.get("Pss", 0) / 1024,
+        "uss_mb": (kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024,
+    }
+
+def boot():
+    from django.core.wsgi import get_wsgi_application
+    get_wsgi_application()
+    from backend.startup import warm_up
+    warm_up()
+
+master_boot_ms = 0.0
+if mode == "preload":
+    os.environ["SERVER_PRELOAD_APP"] = "1"
+    started = time.perf_counter()
+    boot()
+    master_boot_ms = (time.perf_counter() - started) * 1000
+
+go_read, go_write = os.pipe()
+children = []
+for _ in range(workers):
+    result_read, result_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(result_read)
+        started = time.perf_counter()
+        if mode == "preload":
+            from backend.startup import worker_init
+            worker_init()
+        else:
+            boot()
+        boot_ms = (time.perf_counter() - started) * 1000
+        from django.test import Client
+        client = Client(HTTP_HOST="localhost")
+        latencies, statuses = [], []
+        for url in urls:
+            started = time.perf_counter()
+            statuses.append(client.get(url).status_code)
+            latencies.append((time.perf_counter() - started) * 1000)
+        os.read(go_read, 1)
+        record = {"boot_ms": boot_ms, "first_request_ms": latencies, "status": statuses, **memory()}
+        os.write(result_write, json.dumps(record).encode())
+        os._exit(0)
+    os.close(result_write)
+    children.append((pid, result_read))
+
+os.write(go_write, b"x" * workers)
+results = []
+for pid, result_read in children:
+    chunks = []
+    while chunk := os.read(result_read, 65536):
+        chunks.append(chunk)
+    results.append(json.loads(b"".join(chunks)))
+master = memory()
+for pid, _ in children:
+    os.waitpid(pid, 0)
+
+median = statistics.median
+print(json.dumps({
+    "mode": mode,
+    "workers": workers,
+    "master_boot_ms": master_boot_ms,
+    "master_rss_mb": master.get("rss_mb"),
+    "master_pss_mb": master.get("pss_mb"),
+    "worker_boot_ms": median(r["boot_ms"] for r in results),
+    "first_request_ms": [median(r["first_request_ms"][i] for r in results) for i in range(len(urls))],
+    "status": results[0]["status"],
+    "worker_rss_mb": median(r.get("rss_mb", 0) for r in results),
+    "worker_pss_mb": median(r.get("pss_mb", 0) for r in results),
+    "worker_uss_mb": median(r.get("uss_mb", 0) for r in results),
+    "total_pss_mb": (master.get("pss_mb") or 0) + sum(r.get("pss_mb", 0) for r in results),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Fork N workers from one master, with and without backend/preload.py, and "
+        "report per-worker RSS / PSS / USS (Linux smaps_rollup), worker boot time "
+        "and the latency of each worker's first requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--url",
+            action="append",
+            dest="urls",
+            help="first requests of every worker, in order (repeatable)",
+        )
+        parser.add_argument(
+            "--record",
+            default=str(settings.BASE_DIR / "benchmarks" / "preload.jsonl"),
+            help="JSONL file to append results to ('' to skip)",
+        )
+
+    def handle(self, *args, **options):
+        urls = options["urls"] or [
+            "/api/loan_options/create/",
+            "/api/loan_options/match/?loan_type=car&monthly_income=30000000"
+            "&monthly_debt_payments=5000000&loan_amount=500000000",
+        ]
+        results = {mode: self._run(mode, options["workers"], urls) for mode in ("lazy", "preload")}
+
+        self.stdout.write(f"{options['workers']} workers; first requests: {', '.join(urls)}")
+        self.stdout.write(
+            f"{'mode':8s} {'master':>9s} {'boot':>9s} {'first req':>20s} "
+            f"{'RSS':>8s} {'PSS':>8s} {'USS':>8s} {'total PSS':>10s}"
+        )
+        for mode, r in results.items():
+            first = " / ".join(f"{ms:.1f}" for ms in r["first_request_ms"])
+            self.stdout.write(
+                f"{mode:8s} {r['master_boot_ms']:7.0f}ms {r['worker_boot_ms']:7.0f}ms {first:>18s}ms "
+                f"{r['worker_rss_mb']:6.1f}MB {r['worker_pss_mb']:6.1f}MB {r['worker_uss_mb']:6.1f}MB "
+                f"{r['total_pss_mb']:8.1f}MB  (HTTP {', '.join(map(str, r['status']))})"
+            )
+        self.stdout.write("RSS/PSS/USS are medians per worker; total PSS includes the master.")
+
+        if options["record"]:
+            record = {"at": datetime.now(timezone.utc).isoformat(), "urls": urls, **results}
+            os.makedirs(os.path.dirname(options["record"]), exist_ok=True)
+            with open(options["record"], "a") as fh:
+                fh.write(json.dumps(record) + "\n")
+            self.stdout.write(f"appended to {options['record']}")
+
+    def _run(self, mode, workers, urls):
+        env = dict(os.environ, BENCH_MODE=mode, PRELOAD="1" if mode == "preload" else "0")
+        proc = subprocess.run(
+            [sys.executable, "-c", PREFORK_SCRIPT, str(workers), *urls],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        return json.loads(proc.stdout.strip().splitlines()[-1])
@@ -0,0 +1,108 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from backend.fast_serializers import FastJSONRenderer
+from Banks.models import Bank
+from LoanPackages.models import LoanOption
+from LoanPackages.serializer import LoanOptionSerializer, loan_option_reader
+from Users.models import User
+from user_profile.models import LoanApplication, LoanEvaluation
+from user_profile.serializer import LoanEvaluationSerializer, loan_evaluation_reader
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ModelSerializer + JSONRenderer against the .values() fast path "
+        "(ValuesReader + FastJSONRenderer) on N-row list responses. Rows are created "
+        "inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5, help="best of N runs")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        try:
+            with transaction.atomic():
+                self._seed(rows)
+                request = RequestFactory().get("/api/loan_options/create/")
+                context = {"request": request}
+                self._compare(
+                    "LoanOption",
+                    rows,
+                    options["repeat"],
+                    lambda: JSONRenderer().render(LoanOptionSerializer(
+                        LoanOption.objects.select_related("bank__logo").order_by("pk"), many=True, context=context
+                    ).data),
+                    lambda: FastJSONRenderer().render(
+                        loan_option_reader.many(LoanOption.objects.order_by("pk"), context)
+                    ),
+                )
+                self._compare(
+                    "LoanEvaluation",
+                    rows,
+                    options["repeat"],
+                    lambda: JSONRenderer().render(LoanEvaluationSerializer(
+                        LoanEvaluation.objects.order_by("pk"), many=True
+                    ).data),
+                    lambda: FastJSONRenderer().render(
+                        loan_evaluation_reader.many(LoanEvaluation.objects.order_by("pk"))
+                    ),
+                )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, rows):
+        bank = Bank.objects.create(code="bench-bank", name="Bench Bank", key_icon="https://example.com/icon.png")
+        LoanOption.objects.bulk_create([
+            LoanOption(
+                bank=bank, loan_type="car" if i % 2 else "real_estate", title=f"Bench product {i}",
+                exclusive_interest_rate="As low as 7.5%/year", estimated_term="Up to 7 years",
+                key_requirement="Min. Income: 15M VND", average_processing_time="Avg. 7-10 working days",
+            )
+            for i in range(rows)
+        ], batch_size=2000)
+        user = User.objects.create(email="bench-serialization@example.com", full_name="Bench")
+        app = LoanApplication.objects.create(
+            user=user, loan_type="car", monthly_income=30000000, cic_group=1, loan_amount=500000000,
+        )
+        LoanEvaluation.objects.bulk_create([
+            LoanEvaluation(
+                application=app, baseline_score=75.0, eligible=True, knockout_reasons=[],
+                score_breakdown={"history": 35, "dti": 20, "history_length": 10, "credit_mix": 5, "new_credit": 5},
+                config_version="bench",
+            )
+            for _ in range(rows)
+        ], batch_size=2000)
+
+    def _compare(self, label, rows, repeat, before, after):
+        before_body, before_time = self._best(before, repeat)
+        after_body, after_time = self._best(after, repeat)
+        if json.loads(before_body) != json.loads(after_body):
+            raise CommandError(f"{label}: fast path output differs from the ModelSerializer")
+        self.stdout.write(
+            f"{label} x{rows}: serializer {before_time * 1000:.1f} ms ({rows / before_time:,.0f} rows/s), "
+            f"fast path {after_time * 1000:.1f} ms ({rows / after_time:,.0f} rows/s), "
+            f"{before_time / after_time:.1f}x faster, identical output"
+        )
+
+    def _best(self, fn, repeat):
+        best = None
+        body = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return body, best
@@ -0,0 +1,132 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Chạy trong process con để đo từ lúc process bắt đầu (không có module nào đã import sẵn)
+FIRST_REQUEST_SCRIPT = """
+import os, sys, time, json
+started = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+if os.environ.get("BENCH_PREWARM") == "1":
+    from LoanPackages.service import prewarm
+    prewarm()
+ready = time.perf_counter()
+from django.test import Client
+response = Client(HTTP_HOST="localhost").get(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({"status": response.status_code, "ready_ms": (ready - started) * 1000, "first_request_ms": (done - started) * 1000}))
+"""
+
+IMPORT_SCRIPT = """
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+import backend.urls
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold start: `python -X importtime` of settings + URLconf, the cost of "
+        "the AI layer, and time to first request with and without prewarming. "
+        "Each run can be appended to a JSONL file to track startup over time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="/api/loan_options/create/", help="URL for the first request")
+        parser.add_argument("--runs", type=int, default=3, help="median of N subprocess runs")
+        parser.add_argument("--top", type=int, default=10, help="show the N slowest imports")
+        parser.add_argument(
+            "--record",
+            default=str(settings.BASE_DIR / "benchmarks" / "startup.jsonl"),
+            help="JSONL file to append results to ('' to skip)",
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        imports = self._importtime(IMPORT_SCRIPT, env)
+        total_ms = sum(row["self_us"] for row in imports) / 1000
+        genai_ms = sum(row["cumulative_us"] for row in imports if row["module"] == "google.genai") / 1000
+        ai_layer_ms = sum(
+            row["self_us"] for row in self._importtime("import google.genai", env)
+        ) / 1000
+
+        self.stdout.write(f"settings + URLconf imports: {total_ms:.1f} ms (google.genai during startup: {genai_ms:.1f} ms)")
+        self.stdout.write(f"google.genai import on its own (paid lazily / on prewarm): {ai_layer_ms:.1f} ms")
+        self.stdout.write(f"slowest {options['top']} imports (cumulative):")
+        top_level = sorted(imports, key=lambda row: row["cumulative_us"], reverse=True)[: options["top"]]
+        for row in top_level:
+            self.stdout.write(f"  {row['cumulative_us'] / 1000:8.1f} ms  {row['module']}")
+
+        cold = self._first_request(options["url"], options["runs"], env, prewarm=False)
+        warm = self._first_request(options["url"], options["runs"], env, prewarm=True)
+        for label, result in (("lazy", cold), ("prewarm", warm)):
+            self.stdout.write(
+                f"{label:8s} ready {result['ready_ms']:.1f} ms, first request {result['first_request_ms']:.1f} ms "
+                f"(HTTP {result['status']})"
+            )
+
+        if options["record"]:
+            record = {
+                "at": datetime.now(timezone.utc).isoformat(),
+                "revision": self._revision(),
+                "python": sys.version.split()[0],
+                "import_ms": round(total_ms, 1),
+                "genai_at_startup_ms": round(genai_ms, 1),
+                "genai_import_ms": round(ai_layer_ms, 1),
+                "first_request_ms": round(cold["first_request_ms"], 1),
+                "first_request_prewarm_ms": round(warm["first_request_ms"], 1),
+                "ready_prewarm_ms": round(warm["ready_ms"], 1),
+            }
+            os.makedirs(os.path.dirname(options["record"]), exist_ok=True)
+            with open(options["record"], "a") as fh:
+                fh.write(json.dumps(record) + "\n")
+            self.stdout.write(f"appended to {options['record']}")
+
+    def _importtime(self, script, env):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        rows = []
+        for line in proc.stderr.splitlines():
+            # "import time:       self [us] |  cumulative | imported package"
+            if not line.startswith("import time:") or "imported package" in line:
+                continue
+            self_us, cumulative_us, module = line[len("import time:"):].split("|")
+            rows.append({
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "module": module.strip(),
+            })
+        return rows
+
+    def _first_request(self, url, runs, env, prewarm):
+        env = dict(env, BENCH_PREWARM="1" if prewarm else "0")
+        results = []
+        for _ in range(runs):
+            proc = subprocess.run(
+                [sys.executable, "-c", FIRST_REQUEST_SCRIPT, url],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+            )
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        results.sort(key=lambda r: r["first_request_ms"])
+        return results[len(results) // 2]
+
+    def _revision(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
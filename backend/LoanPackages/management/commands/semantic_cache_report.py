@@ -0,0 +1,64 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from LoanPackages import semantic_cache
+from LoanPackages.models import LoanAnalysis
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay stored Gemini analyses (oldest first) through the semantic cache bands: "
+        "how many would have been hits, and how far the adjusted cached score is from "
+        "the score Gemini actually returned for them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="only the newest N analyses")
+
+    def handle(self, *args, **options):
+        analyses = LoanAnalysis.objects.filter(source="gemini").order_by("-id")
+        if options["limit"]:
+            analyses = analyses[: options["limit"]]
+        rows = sorted(
+            analyses.values_list("id", "request_class", "loan_application", "loan_option", "result"),
+            key=lambda row: row[0],
+        )
+
+        seen = {}  # feature tuple -> entry như semantic_cache.store lưu
+        stats = {}
+        for _, request_class, application, loan_option, result in rows:
+            counts = stats.setdefault(request_class, {"total": 0, "bypass": 0, "hits": 0, "drift": []})
+            counts["total"] += 1
+            feature_tuple = semantic_cache.features(application, loan_option, request_class)
+            if feature_tuple is None:
+                counts["bypass"] += 1
+                continue
+            local = semantic_cache._local(application, loan_option)
+            entry = seen.get(feature_tuple)
+            if entry is not None:
+                counts["hits"] += 1
+                cached = semantic_cache._adjust(entry, application, loan_option).get("loan_readiness_score")
+                fresh = (result or {}).get("loan_readiness_score")
+                if isinstance(cached, (int, float)) and isinstance(fresh, (int, float)):
+                    counts["drift"].append(abs(cached - fresh))
+            seen[feature_tuple] = {
+                "parsed": result,
+                "local": {"score": local["loan_readiness_score"], "breakdown": local["breakdown_scores"]},
+            }
+
+        if not stats:
+            self.stdout.write("No Gemini analyses stored yet.")
+            return
+        for request_class, counts in sorted(stats.items()):
+            line = (
+                f"{request_class:>10}: {counts['total']} analyses, {counts['bypass']} bypass, "
+                f"hit rate {counts['hits'] / counts['total']:.1%}"
+            )
+            drift = sorted(counts["drift"])
+            if drift:
+                line += (
+                    f", score drift p50 {statistics.median(drift):.1f} / "
+                    f"p95 {drift[max(0, int(len(drift) * 0.95) - 1)]:.1f} / max {drift[-1]:.1f} points"
+                )
+            self.stdout.write(line)
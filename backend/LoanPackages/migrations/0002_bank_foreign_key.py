@@ -0,0 +1,100 @@
+import unicodedata
+
+from django.db import migrations, models
+from django.utils.text import slugify
+import django.db.models.deletion
+
+
+def _bank_code(name, taken):
+    # slugify bỏ "Đ"/"đ" (không tách dấu được) => đổi sang "D"/"d" trước
+    base = slugify(name.replace("Đ", "D").replace("đ", "d"))[:44] or "bank"
+    code, n = base, 1
+    while code in taken:  # hai tên khác nhau ra cùng slug: thêm hậu tố, không gộp ngân hàng
+        n += 1
+        code = f"{base}-{n}"
+    return code
+
+
+def link_banks(apps, schema_editor):
+    """Create one Bank per distinct bank_name and point the options at it."""
+    Bank = apps.get_model("Banks", "Bank")
+    LoanOption = apps.get_model("LoanPackages", "LoanOption")
+    banks = {}
+    taken = set(Bank.objects.values_list("code", flat=True))
+    for option in LoanOption.objects.order_by("id"):
+        bank = banks.get(option.bank_name)
+        if bank is None:
+            code = _bank_code(option.bank_name, taken)
+            taken.add(code)
+            bank = Bank.objects.create(code=code, name=option.bank_name, key_icon=option.key_icon)
+            banks[option.bank_name] = bank
+        option.bank = bank
+        option.save(update_fields=["bank"])
+
+
+def _option_key(option, vendor):
+    title = option.title
+    if vendor == "mysql":
+        # collation mặc định (*_ai_ci) coi hoa/thường, dấu, khoảng trắng cuối là trùng
+        title = "".join(c for c in unicodedata.normalize("NFKD", title) if not unicodedata.combining(c))
+        title = title.casefold().rstrip()
+    return option.bank_id, option.loan_type, title
+
+
+def drop_duplicate_options(apps, schema_editor):
+    """Keep the newest option (highest id) per (bank, loan_type, title) so the unique constraint can be added."""
+    LoanOption = apps.get_model("LoanPackages", "LoanOption")
+    vendor = schema_editor.connection.vendor
+    seen = set()
+    stale = []
+    for option in LoanOption.objects.order_by("-id").only("id", "bank_id", "loan_type", "title"):
+        key = _option_key(option, vendor)
+        if key in seen:
+            stale.append(option.id)
+        else:
+            seen.add(key)
+    for i in range(0, len(stale), 1000):
+        LoanOption.objects.filter(id__in=stale[i:i + 1000]).delete()
+
+
+def unlink_banks(apps, schema_editor):
+    LoanOption = apps.get_model("LoanPackages", "LoanOption")
+    for option in LoanOption.objects.select_related("bank"):
+        option.bank_name = option.bank.name
+        option.key_icon = option.bank.key_icon
+        option.save(update_fields=["bank_name", "key_icon"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Banks', '0001_initial'),
+        ('LoanPackages', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanoption',
+            name='bank',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='loan_options', to='Banks.bank'),
+        ),
+        migrations.RunPython(link_banks, unlink_banks),
+        migrations.RemoveField(
+            model_name='loanoption',
+            name='bank_name',
+        ),
+        migrations.RemoveField(
+            model_name='loanoption',
+            name='key_icon',
+        ),
+        migrations.AlterField(
+            model_name='loanoption',
+            name='bank',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loan_options', to='Banks.bank'),
+        ),
+        migrations.RunPython(drop_duplicate_options, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='loanoption',
+            constraint=models.UniqueConstraint(fields=('bank', 'loan_type', 'title'), name='uniq_loan_option_per_bank'),
+        ),
+    ]
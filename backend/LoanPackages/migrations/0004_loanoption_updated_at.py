@@ -0,0 +1,20 @@
+# Generated by Django 4.2.24 on 2026-10-19 16:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LoanPackages', '0003_chat_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanoption',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
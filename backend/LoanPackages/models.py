@@ -1,18 +1,75 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 class LoanType(models.TextChoices):
     CAR = "car", "Car Loan"
     REAL_ESTATE = "real_estate", "Real Estate Loan"
 
 class LoanOption(models.Model):
-    bank_name = models.CharField(max_length=200)
+    bank = models.ForeignKey("Banks.Bank", on_delete=models.CASCADE, related_name="loan_options")
     loan_type = models.CharField(max_length=20, choices=LoanType.choices) 
     title = models.CharField(max_length=255)  # e.g., "Car Loan - Silver"
     exclusive_interest_rate = models.CharField(max_length=80)  # "As low as X%/year"
     estimated_term = models.CharField(max_length=80)  # "Up to Y years"
     key_requirement = models.CharField(max_length=255)  # short text e.g., "Min. Income: 15M VND"
-    key_icon = models.CharField(max_length=255, null=True, blank=True)  # url to bank icon
     average_processing_time = models.CharField(max_length=80)  # "Avg. 7-10 working days"
+    updated_at = models.DateTimeField(auto_now=True)  # catalog.version(); bulk upsert phải ghi kèm
+
+    class Meta:
+        constraints = [
+            # khoá tự nhiên để upsert catalog theo ngân hàng
+            models.UniqueConstraint(fields=["bank", "loan_type", "title"], name="uniq_loan_option_per_bank"),
+        ]
+
+    def __str__(self):
+        return f"{self.bank.name} - {self.title}"
+
+# Kết quả phân tích của geminiView, làm "neo" cho chat hỏi tiếp (LoanPackages/chat.py)
+class LoanAnalysis(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="loan_analyses")
+    request_class = models.CharField(max_length=20)  # numeric | narrative
+    loan_application = models.JSONField()  # dữ liệu gửi lên geminiView
+    loan_option = models.JSONField()
+    result = models.JSONField()
+    source = models.CharField(max_length=10)  # gemini | semantic | cache | local
+    model = models.CharField(max_length=50, null=True, blank=True)
+    # Gemini cachedContents chứa system instruction + hồ sơ + kết quả, dùng chung cho mọi phiên chat
+    context_cache = models.CharField(max_length=255, blank=True, default="")
+    context_cache_model = models.CharField(max_length=50, blank=True, default="")
+    context_cache_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Analysis {self.pk} ({self.request_class}, {self.source})"
+
+class ChatSession(models.Model):
+    analysis = models.ForeignKey(LoanAnalysis, on_delete=models.CASCADE, related_name="chat_sessions")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name="chat_sessions")
+    summary = models.TextField(blank=True, default="")  # tóm tắt các lượt cũ
+    summarized_through = models.BigIntegerField(default=0)  # id ChatMessage cuối đã gộp vào summary
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"ChatSession {self.pk} on analysis {self.analysis_id}"
+
+class ChatMessage(models.Model):
+    class Role(models.TextChoices):
+        USER = "user", "User"
+        ASSISTANT = "assistant", "Assistant"
+
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name="messages")
+    role = models.CharField(max_length=10, choices=Role.choices)
+    content = models.TextField()
+    # token thực tế của lượt trả lời (assistant), cached = phần đọc từ context cache
+    input_tokens = models.IntegerField(default=0)
+    cached_tokens = models.IntegerField(default=0)
+    output_tokens = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["id"]
 
     def __str__(self):
-        return f"{self.bank_name} - {self.title}"
+        return f"{self.role} #{self.pk} in session {self.session_id}"
@@ -0,0 +1,210 @@
+"""
+Failure isolation for the Gemini upstream: bounded jittered retries for
+transient errors and a per-model circuit breaker.
+
+Breaker state is per worker process; each worker trips on its own failures,
+which is enough to stop it queueing requests behind a dead upstream.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from tenacity import (
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    stop_before_delay,
+    wait_random_exponential,
+)
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = metrics.gauge(
+    "gemini_breaker_state", "Circuit breaker state (0=closed, 1=half_open, 2=open)", ("model",),
+)
+BREAKER_TRANSITIONS = metrics.counter(
+    "gemini_breaker_transitions_total", "Circuit breaker state changes", ("model", "state"),
+)
+BREAKER_REJECTED = metrics.counter(
+    "gemini_breaker_rejected_total", "Calls failed fast by an open breaker", ("model",),
+)
+RETRIES = metrics.counter(
+    "gemini_retries_total", "Gemini calls retried after a transient error", ("model", "reason"),
+)
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+def error_reason(exc):
+    """Short label for a retryable upstream error, None if it should not be retried."""
+    import httpx
+    from google.genai import errors
+
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.TransportError):
+        return "transport"
+    if isinstance(exc, errors.ServerError):
+        return f"http_{exc.code}"
+    if isinstance(exc, errors.ClientError) and exc.code in (408, 429):
+        return f"http_{exc.code}"
+    return None
+
+
+def is_retryable(exc):
+    return error_reason(exc) is not None
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` failures within `window_s`, rejects calls for
+    `cooldown_s`, then lets one probe through (half-open): success closes it,
+    failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, window_s=60, cooldown_s=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window_s = window_s
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = []  # monotonic timestamps
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        BREAKER_STATE.set(0, model=name)
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _set_state(self, state):
+        if state == self._state:
+            return
+        logger.warning("Gemini breaker %s: %s -> %s", self.name, self._state, state)
+        self._state = state
+        BREAKER_STATE.set(_STATE_VALUE[state], model=self.name)
+        BREAKER_TRANSITIONS.inc(model=self.name, state=state)
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_s:
+            self._set_state(HALF_OPEN)
+            self._probe_in_flight = False
+
+    def rejecting(self):
+        """True if before_call() would raise right now; takes no probe slot."""
+        with self._lock:
+            self._maybe_half_open()
+            return self._state == OPEN or (self._state == HALF_OPEN and self._probe_in_flight)
+
+    def before_call(self):
+        """
+        Raise CircuitOpen if the call must not go upstream. Returns True when the
+        call is the half-open probe: it must end in record_success(),
+        record_failure() or release().
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return False
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+        BREAKER_REJECTED.inc(model=self.name)
+        raise CircuitOpen(f"Gemini {self.name} circuit is open")
+
+    def release(self):
+        """Give the probe slot back without a verdict (call abandoned before upstream answered)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures.clear()
+            self._probe_in_flight = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN:
+                self._opened_at = now
+                self._set_state(OPEN)
+                return
+            self._failures = [t for t in self._failures if now - t < self.window_s]
+            self._failures.append(now)
+            if len(self._failures) >= self.failure_threshold:
+                self._failures.clear()
+                self._opened_at = now
+                self._set_state(OPEN)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(model):
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            conf = settings.GEMINI_RESILIENCE
+            breaker = _breakers[model] = CircuitBreaker(
+                model,
+                failure_threshold=conf["breaker_failures"],
+                window_s=conf["breaker_window_s"],
+                cooldown_s=conf["breaker_cooldown_s"],
+            )
+        return breaker
+
+
+def call_with_retries(fn, model, deadline_s):
+    """
+    Run `fn(budget_s)` behind the model's breaker, retrying transient errors with
+    full jitter until `max_attempts` is reached or the next attempt would start
+    past `deadline_s`. `budget_s` is the time left before the deadline and fn
+    must cap its HTTP timeout to it, so the last attempt cannot run a full
+    timeout past the deadline. Non-retryable errors (bad request, auth, ...) are
+    raised at once and do not count against the breaker; retryable ones that
+    exhaust the budget do.
+    """
+    conf = settings.GEMINI_RESILIENCE
+    deadline = time.monotonic() + deadline_s
+    breaker = breaker_for(model)
+    breaker.before_call()
+
+    def before_sleep(retry_state):
+        exc = retry_state.outcome.exception()
+        RETRIES.inc(model=model, reason=error_reason(exc))
+        logger.info("Gemini %s attempt %d failed (%s), retrying", model, retry_state.attempt_number, exc)
+
+    retrying = Retrying(
+        retry=retry_if_exception(is_retryable),
+        stop=stop_after_attempt(conf["max_attempts"]) | stop_before_delay(deadline_s),
+        wait=wait_random_exponential(
+            multiplier=conf["backoff_initial_ms"] / 1000, max=conf["backoff_max_ms"] / 1000,
+        ),
+        before_sleep=before_sleep,
+        reraise=True,
+    )
+    try:
+        result = retrying(lambda: fn(max(deadline - time.monotonic(), 0.001)))
+    except Exception as exc:
+        if is_retryable(exc):
+            breaker.record_failure()
+        else:
+            # upstream đã trả lời (400, 403...): lỗi của request, upstream vẫn sống
+            breaker.record_success()
+        raise
+    breaker.record_success()
+    return result
@@ -0,0 +1,158 @@
+"""
+Per-request-class model routing with hedged requests.
+
+Each request class in settings.GEMINI_ROUTES has a primary model and a latency
+budget. If the primary has not answered within `hedge_after_ms`, a backup request
+goes to `hedge_model`; the first successful answer wins and the other one is
+cancelled (dropped before it starts, or abandoned and its result discarded if
+already in flight). Latency, tokens and cost are recorded per model.
+"""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from backend import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+LATENCY = metrics.histogram(
+    "gemini_request_seconds", "Gemini call latency", ("model", "request_class", "role", "outcome"),
+)
+TOKENS = metrics.counter("gemini_tokens_total", "Gemini tokens", ("model", "direction"))
+COST = metrics.counter("gemini_cost_usd_total", "Estimated Gemini cost in USD", ("model", "request_class"))
+HEDGES = metrics.counter("gemini_hedged_requests_total", "Backup requests sent", ("request_class", "winner"))
+SLO_MISSES = metrics.counter("gemini_slo_miss_total", "Calls slower than the route SLO", ("request_class",))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.GEMINI_MAX_CONCURRENCY, thread_name_prefix="gemini",
+                )
+    return _executor
+
+
+def get_route(request_class):
+    try:
+        return settings.GEMINI_ROUTES[request_class]
+    except KeyError:
+        raise ValueError(f"unknown request class {request_class!r}, expected one of {sorted(settings.GEMINI_ROUTES)}")
+
+
+def estimate_cost(model, usage):
+    input_price, output_price = settings.GEMINI_PRICING.get(model, (0.0, 0.0))
+    cached = usage.get("cached_tokens", 0)
+    billed_input = usage["input_tokens"] - cached + cached * settings.GEMINI_CACHED_INPUT_FACTOR
+    return (billed_input * input_price + usage["output_tokens"] * output_price) / 1_000_000
+
+
+def record_usage(model, request_class, usage):
+    """Token and cost counters for one Gemini response (also used by chat streaming)."""
+    TOKENS.inc(usage["input_tokens"], model=model, direction="input")
+    TOKENS.inc(usage["output_tokens"], model=model, direction="output")
+    if usage.get("cached_tokens"):
+        TOKENS.inc(usage["cached_tokens"], model=model, direction="cached")
+    COST.inc(estimate_cost(model, usage), model=model, request_class=request_class)
+
+
+def _record(result, model, request_class, role, outcome, elapsed):
+    LATENCY.observe(elapsed, model=model, request_class=request_class, role=role, outcome=outcome)
+    if result is None:
+        return
+    record_usage(model, request_class, result.get("usage") or {"input_tokens": 0, "output_tokens": 0})
+
+
+def _attempt(call, prompt, model, route, request_class, role, cancelled):
+    started = time.monotonic()
+    with tracing.span("gemini.attempt", model=model, role=role) as span:
+        try:
+            result = call(
+                prompt,
+                max_tokens=route["max_tokens"],
+                model=model,
+                timeout_ms=route.get("timeout_ms"),
+                deadline_ms=route.get("slo_ms"),
+            )
+        except Exception:
+            _record(None, model, request_class, role, "error", time.monotonic() - started)
+            raise
+        # a loser that finishes after being cancelled is still billed, so count its cost
+        outcome = "cancelled" if cancelled.is_set() else ("ok" if result.get("parsed_result") else "invalid")
+        span.set(outcome=outcome)
+        _record(result, model, request_class, role, outcome, time.monotonic() - started)
+        return result
+
+
+def generate(prompt, request_class, call):
+    """
+    Run `call(prompt, max_tokens=, model=, timeout_ms=, deadline_ms=)` for the
+    route of `request_class`, hedging after the route's budget. Returns the
+    winning result with "model" and "hedged" set; raises the last error if every
+    attempt failed.
+    """
+    route = get_route(request_class)
+    started = time.monotonic()
+    attempts = {}  # future -> (role, cancel flag)
+
+    def submit(model, role):
+        cancelled = threading.Event()
+        # copy_context: span của attempt nằm dưới span của request (backend/tracing.py)
+        future = _pool().submit(
+            contextvars.copy_context().run, _attempt, call, prompt, model, route, request_class, role, cancelled,
+        )
+        attempts[future] = (role, cancelled)
+        return future
+
+    submit(route["model"], "primary")
+    hedge_after = route.get("hedge_after_ms")
+    pending = set(attempts)
+    winner = None
+    fallback = None  # answered but without valid JSON
+    last_error = None
+    while pending and winner is None:
+        timeout = None
+        if hedge_after and len(attempts) == 1:
+            timeout = max(0.0, hedge_after / 1000 - (time.monotonic() - started))
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            # primary vượt ngân sách latency => gửi request dự phòng
+            logger.info("Gemini %s primary over %d ms, sending hedge", request_class, hedge_after)
+            pending.add(submit(route.get("hedge_model") or route["model"], "hedge"))
+            continue
+        for future in done:
+            if future.exception() is not None:
+                last_error = future.exception()
+            elif future.result().get("parsed_result"):
+                winner = future
+                break
+            elif fallback is None:
+                fallback = future
+    winner = winner or fallback
+
+    for future, (_, cancelled) in attempts.items():
+        if future is not winner and not future.done():
+            cancelled.set()
+            future.cancel()
+
+    elapsed_ms = (time.monotonic() - started) * 1000
+    if elapsed_ms > route.get("slo_ms", float("inf")):
+        SLO_MISSES.inc(request_class=request_class)
+    hedged = len(attempts) > 1
+    if hedged:
+        HEDGES.inc(request_class=request_class, winner=attempts[winner][0] if winner else "none")
+
+    if winner is None:
+        raise last_error
+    result = dict(winner.result())
+    result["hedged"] = hedged
+    return result
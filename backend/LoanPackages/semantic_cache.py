@@ -0,0 +1,194 @@
+"""
+Second-tier cache for Gemini analyses of near-identical applications.
+
+The last-good cache in fallback.py matches byte-identical input only (and is
+read only when Gemini is down). Here the application is reduced to the scoring features the prompt rules depend on,
+quantized into bands (DTI / LTV in 5-point bands, income and loan amount in
+10% log steps, CIC group, late payments, history / employment buckets, ...),
+plus the loan option and the request class. Two applicants in the same bands,
+e.g. 25.1M vs 25.3M VND income with the same CIC group and option, share one
+cached analysis.
+
+On a hit the numbers are recomputed for the actual application: dti / ltv
+exactly, and the breakdown scores and loan_readiness_score shifted by how
+much fallback.local_analysis (the prompt's formulas) changes between the
+cached applicant and this one. Nothing else is reused: the numeric result
+has no text (see below).
+
+Only request classes in `request_classes` are cached, by default just
+"numeric", whose result is numbers that are all recomputed on a hit. The
+narrative class is never shared. Its reasoning / improvement_advice quote the
+applicant's own figures (build_prompt asks for specific data points from the
+profile), so serving them to another applicant would leak A's income and
+debt to B and contradict B's recomputed dti / ltv.
+
+Applications with free text the model would read (additional_info, document
+facts) bypass the cache. A `verify_rate` share of hits is still sent to Gemini:
+the fresh result is served and |cached - fresh| loan_readiness_score is
+recorded in gemini_semantic_cache_drift_points, next to the hit / miss counter
+(if that call fails, the hit is served instead of the fallback).
+`manage.py semantic_cache_report` replays stored LoanAnalysis rows offline to
+estimate both before changing the bands.
+"""
+import bisect
+import copy
+import hashlib
+import json
+import math
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+from backend import metrics
+
+from . import fallback
+
+LOOKUPS = metrics.counter(
+    "gemini_semantic_cache_total", "Semantic cache lookups", ("request_class", "outcome"),
+)
+DRIFT = metrics.histogram(
+    "gemini_semantic_cache_drift_points", "|cached - fresh| loan_readiness_score on verified hits",
+    ("request_class",), buckets=(0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30),
+)
+
+_HISTORY_MONTHS = (6, 12, 24, 36, 60)
+_EMPLOYMENT_MONTHS = (6, 12, 18, 24)
+_UTILIZATION_PCT = (30, 50.0001)  # <30 | 30-50 | >50, như rule trong prompt
+_OPTION_KEYS = ("bank_name", "title", "loan_type", "exclusive_interest_rate", "estimated_term", "key_requirement")
+
+
+_num = fallback._num
+
+
+def conf(name):
+    return settings.GEMINI_SEMANTIC_CACHE[name]
+
+
+def _band(value, width, cap):
+    return None if value is None else min(int(value // width), cap)
+
+
+def _log_band(value):
+    return int(math.log(value) / math.log(1.1)) if value > 0 else 0
+
+
+def _ratios(application):
+    income = _num(application.get("monthly_income"))
+    collateral = _num(application.get("vehicle_value")) or _num(application.get("property_value"))
+    dti = _num(application.get("monthly_debt_payments")) / income * 100 if income else None
+    ltv = _num(application.get("loan_amount")) / collateral * 100 if collateral else None
+    down = _num(application.get("down_payment")) / collateral * 100 if collateral else None
+    return dti, ltv, down
+
+
+def _option_ref(loan_option):
+    if loan_option.get("id") is not None:
+        return str(loan_option["id"])
+    text = json.dumps([loan_option.get(k) for k in _OPTION_KEYS], default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def features(application, loan_option, request_class):
+    """Quantized feature tuple, or None when the application must not share an analysis."""
+    if request_class not in conf("request_classes"):
+        return None
+    if str(application.get("additional_info") or "").strip() or application.get("documents_summary"):
+        return None
+    dti, ltv, down = _ratios(application)
+    return (
+        request_class,
+        _option_ref(loan_option),
+        application.get("userType"),
+        application.get("loan_type"),
+        int(_num(application.get("cic_group"))),
+        _band(dti, 5, 20),
+        _band(ltv, 5, 30),
+        _band(down, 5, 20),
+        _log_band(_num(application.get("monthly_income"))),
+        _log_band(_num(application.get("loan_amount"))),
+        min(int(_num(application.get("num_late_payments_24m"))), 5),
+        min(int(_num(application.get("num_new_inquiries_6m"))), 4),
+        min(int(_num(application.get("credit_mix_types"))), 3),
+        bisect.bisect(_HISTORY_MONTHS, _num(application.get("credit_history_months"))),
+        bisect.bisect(_UTILIZATION_PCT, _num(application.get("credit_utilization_pct"))),
+        bisect.bisect(_EMPLOYMENT_MONTHS, _num(application.get("employment_duration_months"))),
+        str(application.get("employment_type") or "").strip().lower(),
+        str(application.get("salary_payment_method") or "").strip().lower(),
+    )
+
+
+def _key(feature_tuple):
+    digest = hashlib.sha256(json.dumps(feature_tuple).encode()).hexdigest()
+    return f"gemini:sem:v{conf('version')}:{digest}"
+
+
+def _local(application, loan_option):
+    return fallback.local_analysis(application, loan_option)
+
+
+def store(application, loan_option, request_class, parsed_result):
+    """Remember a fresh Gemini result for its feature bucket."""
+    if not conf("enabled"):
+        return
+    feature_tuple = features(application, loan_option, request_class)
+    if feature_tuple is None:
+        return
+    local = _local(application, loan_option)
+    cache.set(
+        _key(feature_tuple),
+        {"parsed": parsed_result, "local": {"score": local["loan_readiness_score"], "breakdown": local["breakdown_scores"]}},
+        conf("ttl_s"),
+    )
+
+
+def _adjust(entry, application, loan_option):
+    """Cached analysis with this application's exact numbers."""
+    parsed = copy.deepcopy(entry["parsed"])
+    local = _local(application, loan_option)
+    if "dti" in parsed:
+        parsed["dti"] = local["dti"]
+    if "ltv" in parsed:
+        parsed["ltv"] = local["ltv"]
+    breakdown = parsed.get("breakdown_scores")
+    if isinstance(breakdown, dict):
+        for name, value in local["breakdown_scores"].items():
+            if isinstance(breakdown.get(name), (int, float)):
+                breakdown[name] = fallback._clamp(breakdown[name] + value - entry["local"]["breakdown"][name])
+    if isinstance(parsed.get("loan_readiness_score"), (int, float)):
+        shift = local["loan_readiness_score"] - entry["local"]["score"]
+        parsed["loan_readiness_score"] = fallback._clamp(parsed["loan_readiness_score"] + shift)
+    return parsed
+
+
+def lookup(application, loan_option, request_class):
+    """
+    (result, verify): result is shaped like call_gemini's with source "semantic",
+    or None on a miss; verify=True asks the caller to call Gemini anyway and
+    report the fresh result with record_drift().
+    """
+    if not conf("enabled"):
+        return None, False
+    feature_tuple = features(application, loan_option, request_class)
+    if feature_tuple is None:
+        LOOKUPS.inc(request_class=request_class, outcome="bypass")
+        return None, False
+    entry = cache.get(_key(feature_tuple))
+    if entry is None:
+        LOOKUPS.inc(request_class=request_class, outcome="miss")
+        return None, False
+    LOOKUPS.inc(request_class=request_class, outcome="hit")
+    result = {
+        "parsed_result": _adjust(entry, application, loan_option),
+        "raw_text": None,
+        "model": None,
+        "source": "semantic",
+    }
+    return result, random.random() < conf("verify_rate")
+
+
+def record_drift(cached_result, fresh_result, request_class):
+    cached_score = (cached_result["parsed_result"] or {}).get("loan_readiness_score")
+    fresh_score = (fresh_result.get("parsed_result") or {}).get("loan_readiness_score")
+    if isinstance(cached_score, (int, float)) and isinstance(fresh_score, (int, float)):
+        DRIFT.observe(abs(cached_score - fresh_score), request_class=request_class)
@@ -1,12 +1,39 @@
 from rest_framework import serializers
+from backend.fast_serializers import ValuesReader
+from Banks.models import Bank
+from Banks.logos import bank_icon_url, logo_url_builder
 from .models import LoanOption
 
 class LoanOptionSerializer(serializers.ModelSerializer):
+    bank = serializers.SlugRelatedField(slug_field="code", queryset=Bank.objects.all())
+    # bank_name / key_icon giữ nguyên shape cũ cho frontend, lấy từ Bank
+    bank_name = serializers.CharField(source="bank.name", read_only=True)
+    key_icon = serializers.SerializerMethodField()  # URL logo dạng hash (cache lâu dài) hoặc key_icon cũ
+
     class Meta:
         model = LoanOption
         fields = "__all__"  # Bao gồm tất cả các trường trong LoanOption model
         # class này không có logic validate hay create đặc biệt nào => chỉ dùng để serialize dữ liệu từ DB ra JSON cho frontend thôi
         
+    def get_key_icon(self, obj):
+        return bank_icon_url(obj.bank, self.context.get("request"))
+
     def create(self, validated_data):
         # Logic tạo mới LoanOption nếu cần (thường không cần trong API chỉ đọc)
-        return LoanOption.objects.create(**validated_data)
\ No newline at end of file
+        return LoanOption.objects.create(**validated_data)
+
+
+def _key_icon_getter(context):
+    url_for = logo_url_builder(context.get("request"))
+
+    def get(row):
+        key = row["bank__logo__key"]
+        return url_for(key) if key else row["bank__key_icon"]
+
+    return get
+
+# đường đọc nhanh cho GET, output giống hệt LoanOptionSerializer
+loan_option_reader = ValuesReader(
+    LoanOptionSerializer,
+    extra={"key_icon": (("bank__logo__key", "bank__key_icon"), _key_icon_getter)},
+)
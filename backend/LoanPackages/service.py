@@ -2,25 +2,55 @@ import os
 import json
 import re
 import logging
-from google import genai
-from google.genai import types
+import threading
+from django.conf import settings
+from backend import tracing
+from . import fallback, resilience, routing, semantic_cache
 
 logger = logging.getLogger(__name__)
 
-# Khởi tạo client 1 lần
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
-MODEL = "gemini-2.5-pro"   # bạn có thể đổi thành model khác nếu cần
+# google.genai chỉ được import và client chỉ được tạo khi thật sự cần
+# (manage.py, migrate, test... không phải trả chi phí này)
+_client = None
+_client_lock = threading.Lock()
 
 
-def build_prompt(loan_application: dict, loan_option: dict) -> str:
+class AIUnavailable(RuntimeError):
+    pass
+
+
+def get_client():
     """
-    Build prompt string theo format bạn cung cấp.
+    Return the shared Gemini client, importing google.genai and creating it on
+    first use. Raises AIUnavailable when GEMINI_API_KEY is not configured.
     """
-    prompt = f"""
-You are a professional financial credit scoring assistant with over 15 years of experience in banking and loan evaluation. Your expertise includes assessing creditworthiness, calculating key financial ratios like DTI (Debt-to-Income ratio), LTV (Loan-to-Value ratio), analyzing credit history, employment stability, and matching applicant profiles to specific loan options. You provide objective, data-driven analysis, highlighting strengths, weaknesses, and actionable recommendations to improve approval chances.
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                api_key = os.environ.get("GEMINI_API_KEY")
+                if not api_key:
+                    raise AIUnavailable("GEMINI_API_KEY is not set")
+                from google import genai
+                _client = genai.Client(api_key=api_key)
+    return _client
 
-Task: Given the loan applicant's profile from the loan_application data and the selected loan_option, analyze the match between the applicant and the loan. Calculate key financial indicators such as DTI, LTV. Provide a loan_readiness_score (0-100) based on how well the applicant's profile aligns with the loan's requirements (e.g., interest rate suitability, term feasibility, key requirements like minimum income). Provide breakdown scores for each category (0-100). Explain your reasoning in detail, referencing specific data points from the applicant's profile and the loan option. Finally, give improvement advice as a list of 4 specific, prioritized steps the applicant can take to boost their score and approval odds.
 
+def prewarm():
+    """Build the client ahead of the first analysis request (see backend/wsgi.py)."""
+    try:
+        get_client()
+        from google.genai import types  # noqa: F401
+    except AIUnavailable as exc:
+        logger.warning("Gemini prewarm skipped: %s", exc)
+
+
+def _profile_and_scoring_rules(loan_application: dict, loan_option: dict) -> str:
+    """
+    Applicant profile, loan option and scoring rules: phần chung của prompt
+    narrative (build_prompt) và prompt chỉ tính số (build_numeric_prompt).
+    """
+    return f"""
 Applicant profile (loan_application data):
 - User Type: {loan_application.get("userType")}
 - Loan Type: {loan_application.get("loan_type")}
@@ -40,7 +70,7 @@ Applicant profile (loan_application data):
 - Employment Duration Months: {loan_application.get("employment_duration_months")}
 - Salary Payment Method: {loan_application.get("salary_payment_method")}
 - Additional Info: {loan_application.get("additional_info")}
-- Appraisal Doc: {loan_application.get("appraisal_doc")}
+- Uploaded Documents (extracted facts): {loan_application.get("documents_summary") or "none"}
 
 Selected Loan Option (loan_option data):
 - Bank Name: {loan_option.get("bank_name")}
@@ -69,6 +99,19 @@ Scoring Guidelines for loan_readiness_score:
 - 60-79: Good
 - 40-59: Fair
 - 0-39: Poor
+""".strip()
+
+
+def build_prompt(loan_application: dict, loan_option: dict) -> str:
+    """
+    Build prompt string theo format bạn cung cấp.
+    """
+    prompt = f"""
+You are a professional financial credit scoring assistant with over 15 years of experience in banking and loan evaluation. Your expertise includes assessing creditworthiness, calculating key financial ratios like DTI (Debt-to-Income ratio), LTV (Loan-to-Value ratio), analyzing credit history, employment stability, and matching applicant profiles to specific loan options. You provide objective, data-driven analysis, highlighting strengths, weaknesses, and actionable recommendations to improve approval chances.
+
+Task: Given the loan applicant's profile from the loan_application data and the selected loan_option, analyze the match between the applicant and the loan. Calculate key financial indicators such as DTI, LTV. Provide a loan_readiness_score (0-100) based on how well the applicant's profile aligns with the loan's requirements (e.g., interest rate suitability, term feasibility, key requirements like minimum income). Provide breakdown scores for each category (0-100). Explain your reasoning in detail, referencing specific data points from the applicant's profile and the loan option. Finally, give improvement advice as a list of 4 specific, prioritized steps the applicant can take to boost their score and approval odds.
+
+{_profile_and_scoring_rules(loan_application, loan_option)}
 
 Reasoning Structure:
 1. Summarize applicant's strengths and weaknesses based on key indicators (DTI, LTV, credit factors, employment).
@@ -91,44 +134,146 @@ Ensure the response is a valid JSON object enclosed in triple backticks (```json
     return prompt.strip()
 
 
-def call_gemini(prompt: str, max_tokens: int = 500):
+def build_numeric_prompt(loan_application: dict, loan_option: dict) -> str:
+    """
+    Numeric pass only: ratios and scores without the narrative, so it can be
+    routed to a faster model (see LoanPackages/routing.py).
+    """
+    prompt = f"""
+You are a financial credit scoring assistant. Compute the applicant's ratios and scores for the selected loan option using the rules below. Do not write any explanation.
+
+{_profile_and_scoring_rules(loan_application, loan_option)}
+
+Return the output strictly in JSON with the following fields:
+- loan_readiness_score: number from 0 to 100
+- dti: calculated DTI percentage (number, rounded to 2 decimals)
+- ltv: calculated LTV percentage (number, rounded to 2 decimals, or null if no collateral)
+- breakdown_scores: object with {{"credit_score": number, "income_stability": number, "debt_to_income": number, "employment_history": number, "credit_utilization": number, "payment_history": number}}
+Ensure the response is a valid JSON object enclosed in triple backticks (```json ... ```) with no additional text outside the JSON.
+"""
+    return prompt.strip()
+
+
+def call_gemini(prompt: str, max_tokens: int = 500, model: str = None, timeout_ms: int = None):
     """
-    Gọi Gemini API với prompt text.
+    Gọi Gemini API với prompt text (một lần, không retry).
+    timeout_ms giới hạn thời gian HTTP của lần gọi này.
     """
-    response = client.models.generate_content(
-        model=MODEL,
-        contents=prompt,
-        config=types.GenerateContentConfig(max_output_tokens=max_tokens),
-    )
+    from google.genai import types
+
+    model = model or settings.GEMINI_MODEL
+    with tracing.span("gemini.call", model=model, prompt_chars=len(prompt)):
+        response = get_client().models.generate_content(
+            model=model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                max_output_tokens=max_tokens,
+                http_options=types.HttpOptions(timeout=timeout_ms) if timeout_ms else None,
+            ),
+        )
 
     # Lấy text kết quả
     raw_text = None
     try:
-        raw_text = response.candidates[0].content[0].text.strip()
+        raw_text = response.text.strip()
     except Exception as e:
         logger.error("Gemini response parse error: %s", e)
         raw_text = str(response)
 
     # Parse JSON từ kết quả
     parsed = None
-    try:
-        parsed = json.loads(raw_text)
-    except Exception:
-        # Thử cắt chuỗi JSON giữa { ... }
-        match = re.search(r"(\{.*\})", raw_text, re.DOTALL)
-        if match:
-            try:
-                parsed = json.loads(match.group(1))
-            except Exception:
-                parsed = None
+    with tracing.span("analysis.parse_json", chars=len(raw_text)) as span:
+        try:
+            parsed = json.loads(raw_text)
+        except Exception:
+            # Thử cắt chuỗi JSON giữa { ... }
+            span.set(recovered=True)
+            match = re.search(r"(\{.*\})", raw_text, re.DOTALL)
+            if match:
+                try:
+                    parsed = json.loads(match.group(1))
+                except Exception:
+                    parsed = None
+        span.set(valid=parsed is not None)
+
+    return {
+        "parsed_result": parsed,
+        "raw_text": raw_text,
+        "model": model,
+        "usage": usage_of(response),
+    }
+
+
+def usage_of(response):
+    """Token usage of a Gemini response (or the last chunk of a stream)."""
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "input_tokens": getattr(usage, "prompt_token_count", None) or 0,
+        # thinking tokens are billed as output
+        "output_tokens": (getattr(usage, "candidates_token_count", None) or 0)
+        + (getattr(usage, "thoughts_token_count", None) or 0),
+        # phần input đọc từ context cache (đã nằm trong input_tokens)
+        "cached_tokens": getattr(usage, "cached_content_token_count", None) or 0,
+    }
+
 
-    return {"parsed_result": parsed, "raw_text": raw_text}
+def call_gemini_resilient(prompt, max_tokens=500, model=None, timeout_ms=None, deadline_ms=None):
+    """
+    call_gemini behind the model's circuit breaker, with jittered retries for
+    transient errors until deadline_ms (see LoanPackages/resilience.py).
+    """
+    model = model or settings.GEMINI_MODEL
+    get_client()  # AIUnavailable khi thiếu key: lỗi cấu hình, không retry
+
+    def attempt(budget_s):
+        # lần thử sát deadline chỉ được phần ngân sách còn lại, không chạy trọn timeout_ms
+        budget_ms = max(int(budget_s * 1000), 1)
+        return call_gemini(
+            prompt, max_tokens=max_tokens, model=model,
+            timeout_ms=min(timeout_ms, budget_ms) if timeout_ms else budget_ms,
+        )
 
+    return resilience.call_with_retries(attempt, model, deadline_s=(deadline_ms or 60000) / 1000)
 
-def evaluate_with_gemini(application: dict, loan_option: dict):
+
+def evaluate_with_gemini(application: dict, loan_option: dict, request_class: str = "narrative"):
     """
     Hàm chính để gọi Gemini phân tích hồ sơ + loan option.
+    request_class chọn route (model, ngân sách latency) trong settings.GEMINI_ROUTES.
+    Khi upstream lỗi / breaker đang mở thì trả kết quả fallback
+    (result["source"] là "cache" hoặc "local" thay vì "gemini").
+    Hồ sơ gần giống một hồ sơ đã phân tích dùng lại kết quả đó (source "semantic",
+    xem semantic_cache.py).
     """
-    prompt = build_prompt(application, loan_option)
-    result = call_gemini(prompt)
+    with tracing.span("analysis.semantic_cache", request_class=request_class) as span:
+        near, verify = semantic_cache.lookup(application, loan_option, request_class)
+        span.set(hit=near is not None, verify=verify)
+    if near is not None and not verify:
+        return near
+
+    with tracing.span("analysis.build_prompt", request_class=request_class):
+        if request_class == "numeric":
+            prompt = build_numeric_prompt(application, loan_option)
+        else:
+            prompt = build_prompt(application, loan_option)
+    try:
+        with tracing.span("analysis.upstream", request_class=request_class) as span:
+            result = routing.generate(prompt, request_class, call_gemini_resilient)
+            span.set(model=result["model"], hedged=result["hedged"])
+    except Exception as exc:
+        if not (isinstance(exc, resilience.CircuitOpen) or resilience.is_retryable(exc)):
+            raise
+        if near is not None:
+            # hit được chọn để verify: kết quả cache vẫn hợp lệ, tốt hơn fallback
+            logger.info("Gemini %s unavailable (%s), serving semantic hit unverified", request_class, exc)
+            return near
+        logger.warning("Gemini %s unavailable (%s), serving fallback", request_class, exc)
+        with tracing.span("analysis.fallback", request_class=request_class):
+            return fallback.fallback_result(application, loan_option, request_class)
+    result["source"] = "gemini"
+    if result["parsed_result"]:
+        fallback.remember(application, loan_option, request_class, result["parsed_result"])
+        semantic_cache.store(application, loan_option, request_class, result["parsed_result"])
+        if near is not None:
+            semantic_cache.record_drift(near, result, request_class)
     return result
@@ -1,3 +1,205 @@
-from django.test import TestCase
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import chat, resilience
+from .models import ChatMessage, ChatSession, LoanAnalysis
+
+FAST_RETRIES = {**settings.GEMINI_RESILIENCE, "backoff_initial_ms": 1, "backoff_max_ms": 1}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(resilience.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = resilience.CircuitBreaker("test-model", failure_threshold=3, window_s=60, cooldown_s=30)
+
+    def open_breaker(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, resilience.CLOSED)
+        self.assertFalse(self.breaker.before_call())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, resilience.OPEN)
+        self.assertTrue(self.breaker.rejecting())
+        with self.assertRaises(resilience.CircuitOpen):
+            self.breaker.before_call()
+
+    def test_failures_outside_the_window_do_not_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 61
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, resilience.CLOSED)
+
+    def test_half_open_lets_one_probe_through(self):
+        self.open_breaker()
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, resilience.HALF_OPEN)
+        self.assertFalse(self.breaker.rejecting())
+
+        self.assertTrue(self.breaker.before_call())
+        self.assertTrue(self.breaker.rejecting())
+        with self.assertRaises(resilience.CircuitOpen):
+            self.breaker.before_call()
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, resilience.CLOSED)
+        self.assertFalse(self.breaker.before_call())
+
+    def test_failed_probe_opens_again(self):
+        self.open_breaker()
+        self.clock.now += 30
+        self.breaker.before_call()
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, resilience.OPEN)
+        self.clock.now += 29
+        with self.assertRaises(resilience.CircuitOpen):
+            self.breaker.before_call()
+        self.clock.now += 1
+        self.assertTrue(self.breaker.before_call())
+
+    def test_release_frees_the_probe_slot(self):
+        self.open_breaker()
+        self.clock.now += 30
+        self.breaker.before_call()
+        self.breaker.release()
+
+        self.assertEqual(self.breaker.state, resilience.HALF_OPEN)
+        self.assertTrue(self.breaker.before_call())
+
+
+@override_settings(GEMINI_RESILIENCE=FAST_RETRIES)
+class CallWithRetriesTests(SimpleTestCase):
+    def setUp(self):
+        resilience._breakers.clear()
+        self.addCleanup(resilience._breakers.clear)
+
+    def test_transient_errors_are_retried(self):
+        fn = mock.Mock(side_effect=[httpx.ReadTimeout("slow"), "ok"])
+        self.assertEqual(resilience.call_with_retries(fn, "test-model", deadline_s=5), "ok")
+        self.assertEqual(fn.call_count, 2)
+        # mỗi lần thử nhận phần ngân sách còn lại
+        self.assertLessEqual(fn.call_args.args[0], 5)
+
+    def test_exhausted_retries_count_against_the_breaker(self):
+        fn = mock.Mock(side_effect=httpx.ConnectError("down"))
+        for _ in range(settings.GEMINI_RESILIENCE["breaker_failures"]):
+            with self.assertRaises(httpx.ConnectError):
+                resilience.call_with_retries(fn, "test-model", deadline_s=5)
+        self.assertEqual(fn.call_count, FAST_RETRIES["max_attempts"] * FAST_RETRIES["breaker_failures"])
+        with self.assertRaises(resilience.CircuitOpen):
+            resilience.call_with_retries(fn, "test-model", deadline_s=5)
+
+    def test_other_errors_are_raised_at_once(self):
+        fn = mock.Mock(side_effect=ValueError("bad request"))
+        with self.assertRaises(ValueError):
+            resilience.call_with_retries(fn, "test-model", deadline_s=5)
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(resilience.breaker_for("test-model").state, resilience.CLOSED)
+
+
+class FakeModels:
+    def __init__(self, error=None):
+        self.error = error
+
+    def generate_content_stream(self, **kwargs):
+        if self.error:
+            raise self.error
+        for text in ("Your ", "DTI ", "is 16.7%."):
+            yield SimpleNamespace(text=text, usage_metadata=None)
+
+
+class ChatStreamProbeTests(TestCase):
+    """A half-open probe taken by a chat stream is given back however the stream ends."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user("applicant@example.com", "pw", full_name="applicant")
+        analysis = LoanAnalysis.objects.create(
+            user=user, request_class="numeric", loan_application={}, loan_option={},
+            result={"loan_readiness_score": 70}, source="gemini",
+        )
+        self.session = ChatSession.objects.create(analysis=analysis, user=user)
+        for name, value in (("context_cache", None), ("anchor_text", "profile")):
+            patcher = mock.patch.object(chat, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        resilience._breakers.clear()
+        self.addCleanup(resilience._breakers.clear)
+        self.breaker = resilience.breaker_for(settings.GEMINI_CHAT["model"])
+        # breaker vừa hết cooldown: lượt chat tiếp theo là probe
+        self.breaker._state = resilience.HALF_OPEN
+
+    def stream(self, models):
+        with mock.patch.object(chat, "get_client", return_value=SimpleNamespace(models=models)):
+            return list(chat.stream_reply(self.session, "What is my DTI?"))
+
+    def test_success_closes_the_breaker(self):
+        events = self.stream(FakeModels())
+        self.assertTrue(events[-1].startswith("event: done"))
+        self.assertEqual(self.breaker.state, resilience.CLOSED)
+        self.assertEqual(
+            list(self.session.messages.values_list("role", flat=True)),
+            [ChatMessage.Role.USER, ChatMessage.Role.ASSISTANT],
+        )
+
+    def test_non_retryable_error_releases_the_probe(self):
+        events = self.stream(FakeModels(ValueError("bad request")))
+        self.assertTrue(events[-1].startswith("event: error"))
+        self.assertFalse(self.breaker.rejecting())
+        self.assertFalse(self.session.messages.exists())
+
+    def test_retryable_error_opens_the_breaker(self):
+        self.stream(FakeModels(httpx.ReadTimeout("slow")))
+        self.assertEqual(self.breaker.state, resilience.OPEN)
+        self.assertFalse(self.session.messages.exists())
+
+    def test_client_disconnect_releases_the_probe(self):
+        with mock.patch.object(chat, "get_client", return_value=SimpleNamespace(models=FakeModels())):
+            events = chat.stream_reply(self.session, "What is my DTI?")
+            next(events)
+            self.assertTrue(self.breaker.rejecting())
+            events.close()
+        self.assertFalse(self.breaker.rejecting())
+        self.assertFalse(self.session.messages.exists())
+
+    def test_error_before_the_call_releases_the_probe(self):
+        with mock.patch.object(chat, "recent_messages", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                self.stream(FakeModels())
+        self.assertFalse(self.breaker.rejecting())
+
+    def test_unstarted_stream_holds_no_probe(self):
+        chat.stream_reply(self.session, "What is my DTI?")
+        self.assertFalse(self.breaker.rejecting())
+
+    def test_open_breaker_answers_503(self):
+        self.breaker._state = resilience.OPEN
+        self.breaker._opened_at = resilience.time.monotonic()
+        client = APIClient()
+        client.force_authenticate(self.session.user)
+        with mock.patch("LoanPackages.views.get_client"):
+            response = client.post(f"/api/loan_options/chat/{self.session.pk}/messages/", {"message": "hi"}, format="json")
+        self.assertEqual(response.status_code, 503)
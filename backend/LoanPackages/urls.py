@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import LoanOptionView, geminiView
+from .views import ChatMessageView, ChatSessionDetailView, ChatSessionView, LoanOptionMatchView, LoanOptionView, geminiView
 
 urlpatterns = [
     path('create/', LoanOptionView.as_view(), name='loan-option'),
-    path('gemini/', geminiView.as_view(), name='gemini')
+    path('match/', LoanOptionMatchView.as_view(), name='loan-option-match'),
+    path('gemini/', geminiView.as_view(), name='gemini'),
+    path('chat/', ChatSessionView.as_view(), name='chat-session'),
+    path('chat/<int:session_id>/', ChatSessionDetailView.as_view(), name='chat-session-detail'),
+    path('chat/<int:session_id>/messages/', ChatMessageView.as_view(), name='chat-message'),
 ]
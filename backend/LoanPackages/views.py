@@ -2,44 +2,151 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from .serializer import LoanOptionSerializer
+from rest_framework.renderers import BrowsableAPIRenderer
+from backend import tracing
+from backend.fast_serializers import FastJSONRenderer
+from backend.db_router import replica_reads
+from backend.idempotency import idempotent
+from backend.intake_guard import intake_guard
+from .models import ChatMessage, ChatSession, LoanAnalysis
+from .serializer import LoanOptionSerializer, loan_option_reader
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse
-from .service import evaluate_with_gemini
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from .service import AIUnavailable, evaluate_with_gemini, get_client
+from . import affordability, catalog, chat, resilience
+from Documents import extraction
+from user_profile.models import LoanApplication
 
 class LoanOptionView(APIView):
     # permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    @replica_reads
     def get(self, request):
+        # snapshot trong bộ nhớ (LoanPackages/catalog.py), output giống LoanOptionSerializer
+        context = {"request": request}
+        snapshot = catalog.snapshot()
         option_id = request.query_params.get("id")
         if option_id:
-            option = get_object_or_404(LoanOptionSerializer.Meta.model, pk=option_id)
-            serializer = LoanOptionSerializer(option)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            row = snapshot.by_id.get(int(option_id)) if option_id.isdigit() else None
+            if row is None:
+                raise Http404
+            return Response(loan_option_reader.one(row, context), status=status.HTTP_200_OK)
 
-        options = LoanOptionSerializer.Meta.model.objects.all()
-        serializer = LoanOptionSerializer(options, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = loan_option_reader.build_all(snapshot.rows, context)
+        return Response(data, status=status.HTTP_200_OK)
     
     def post(self, request):
         serializer = LoanOptionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save()  # post_save => catalog.bump()
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+class LoanOptionMatchView(APIView):
+    """
+    GET ?application_id=<id>  (hồ sơ của mình, hoặc staff)
+     or ?loan_type=car&monthly_income=30000000&monthly_debt_payments=5000000&loan_amount=500000000
+    => các LoanOption cùng loan_type, mỗi gói kèm "affordability" (trả góp, tổng lãi, DTI sau
+    khi vay, xem LoanPackages/affordability.py), xếp gói vừa sức / ít lãi nhất lên đầu.
+    """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    _AMOUNTS = ("monthly_income", "monthly_debt_payments", "loan_amount")
+
+    def _applicant(self, request):
+        params = request.query_params
+        if params.get("application_id"):
+            if not request.user.is_authenticated:
+                raise Http404
+            applications = LoanApplication.objects.all()
+            if not request.user.is_staff:
+                applications = applications.filter(user=request.user)
+            applicant = get_object_or_404(
+                applications.values("id", "loan_type", *self._AMOUNTS), pk=params["application_id"],
+            )
+            return {**applicant, **{name: float(applicant[name] or 0) for name in self._AMOUNTS}}
+        applicant = {"loan_type": params.get("loan_type")}
+        if applicant["loan_type"] not in affordability.DTI_LIMITS:
+            raise ValueError(f"loan_type must be one of {sorted(affordability.DTI_LIMITS)}, or pass application_id")
+        for name in self._AMOUNTS:
+            try:
+                applicant[name] = float(params.get(name, 0 if name == "monthly_debt_payments" else ""))
+            except ValueError:
+                raise ValueError(f"{name} must be a number")
+            if applicant[name] < 0 or (name != "monthly_debt_payments" and applicant[name] == 0):
+                raise ValueError(f"{name} must be positive")
+        return applicant
+
+    @replica_reads
+    def get(self, request):
+        try:
+            applicant = self._applicant(request)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        options = loan_option_reader.build_all(
+            catalog.snapshot().by_type.get(applicant["loan_type"], ()), {"request": request},
+        )
+        projected = affordability.project(
+            options, applicant["loan_type"], applicant["monthly_income"],
+            applicant["monthly_debt_payments"], applicant["loan_amount"],
+        )
+        for option in options:
+            option["affordability"] = projected[option["id"]]
+        options.sort(key=affordability.rank_key)
+        return Response({"applicant": applicant, "results": options}, status=status.HTTP_200_OK)
+
 class geminiView(APIView):
     # permission_classes = [IsAuthenticated]
 
+    # retry / double-click với cùng Idempotency-Key không gọi Gemini (có phí) lần nữa
+    @intake_guard("gemini-analysis", application=lambda data: data.get("loan_application"))
+    @idempotent("gemini-analysis", replay_headers=("X-Analysis-Source",))
     def post(self, request):
         application = request.data.get("loan_application")   # dict
         loan_option = request.data.get("loan_option")   # dict
 
         if not application or not loan_option:
             return Response({"error": "loan_application and loan_option required"}, status=400)
+        # "numeric" (chỉ điểm số, model nhanh) hoặc "narrative" (phân tích đầy đủ)
+        request_class = request.data.get("analysis", "narrative")
+        if request_class not in settings.GEMINI_ROUTES:
+            return Response({"error": f"analysis must be one of {sorted(settings.GEMINI_ROUTES)}"}, status=400)
 
-        result = evaluate_with_gemini(application, loan_option)
+        # tài liệu đi vào prompt dưới dạng tóm tắt đã trích xuất (Documents/extraction.py),
+        # không phải tên file / nội dung client gửi lên
+        application = {k: v for k, v in application.items() if k not in ("appraisal_doc", "documents_summary")}
+        application_id = request.data.get("application_id")
+        if application_id is not None and request.user.is_authenticated:
+            try:
+                application_id = int(application_id)
+            except (TypeError, ValueError):
+                return Response({"error": "application_id must be an integer"}, status=400)
+            with tracing.span("analysis.documents_summary"):
+                application["documents_summary"] = extraction.prompt_summary(application_id, request.user)
+
+        try:
+            result = evaluate_with_gemini(application, loan_option, request_class)
+        except AIUnavailable as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         if result["parsed_result"]:
-            return Response(result["parsed_result"], status=status.HTTP_200_OK)
+            # lưu lại để chat hỏi tiếp không phải gửi lại cả prompt (xem chat.py)
+            with tracing.span("analysis.store"):
+                analysis = LoanAnalysis.objects.create(
+                    user=request.user if request.user.is_authenticated else None,
+                    request_class=request_class,
+                    loan_application=application,
+                    loan_option=loan_option,
+                    result=result["parsed_result"],
+                    source=result["source"],
+                    model=result.get("model"),
+                )
+            # X-Analysis-Source: gemini | cache | local (fallback khi Gemini lỗi)
+            return Response(
+                {**result["parsed_result"], "analysis_id": analysis.pk},
+                status=status.HTTP_200_OK,
+                headers={"X-Analysis-Source": result["source"]},
+            )
         else:
             return Response(
                 {
@@ -47,4 +154,63 @@ class geminiView(APIView):
                     "raw_text": result["raw_text"],  # optional: chỉ để debug
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
\ No newline at end of file
+            )
+
+
+def _owned(queryset, request):
+    # chỉ dữ liệu của chính user; analysis ẩn danh (user=None) không mở chat được,
+    # vì id tuần tự => ai cũng đoán được hồ sơ tài chính của người khác
+    return queryset.filter(user=request.user)
+
+
+class ChatSessionView(APIView):
+    """POST {"analysis_id"} => mở phiên chat trên một kết quả geminiView (cần đăng nhập)."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        analysis = get_object_or_404(_owned(LoanAnalysis.objects.all(), request), pk=request.data.get("analysis_id"))
+        session = ChatSession.objects.create(analysis=analysis, user=request.user)
+        return Response({"session_id": session.pk, "analysis_id": analysis.pk}, status=status.HTTP_201_CREATED)
+
+
+class ChatSessionDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id):
+        session = get_object_or_404(_owned(ChatSession.objects.all(), request), pk=session_id)
+        messages = session.messages.values("id", "role", "content", "created_at")
+        return Response({
+            "session_id": session.pk,
+            "analysis_id": session.analysis_id,
+            "messages": list(messages),
+        }, status=status.HTTP_200_OK)
+
+
+class ChatMessageView(APIView):
+    """
+    POST {"message"} => text/event-stream:
+    `delta` {"text"} ..., then `done` {"message_id", "usage"} or `error`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, session_id):
+        session = get_object_or_404(
+            _owned(ChatSession.objects.select_related("analysis"), request), pk=session_id,
+        )
+        message = (request.data.get("message") or "").strip()
+        if not message:
+            return Response({"error": "message required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(message) > settings.GEMINI_CHAT["max_message_chars"]:
+            return Response({"error": f"message longer than {settings.GEMINI_CHAT['max_message_chars']} characters"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            get_client()
+        except AIUnavailable as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if resilience.breaker_for(settings.GEMINI_CHAT["model"]).rejecting():
+            # không giữ slot probe ở đây: stream_reply tự lấy và trả lại
+            return Response({"error": f"Gemini {settings.GEMINI_CHAT['model']} circuit is open"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        response = StreamingHttpResponse(chat.stream_reply(session, message), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx: không buffer stream
+        return response
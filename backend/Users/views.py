@@ -4,6 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from rest_framework.permissions import IsAuthenticated
+from backend.db_router import replica_reads
 from .models import User
 from .serializers import register, login, UserProfileSerializer
 
@@ -60,3 +61,12 @@ class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):
         Giới hạn queryset chỉ trả về hồ sơ của người dùng đang đăng nhập.
         """
         return self.queryset.filter(id=self.request.user.id)
+
+    # chỉ đọc: đọc từ replica khi có (xem backend/db_router.py)
+    @replica_reads
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @replica_reads
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,209 @@
+"""
+Read-replica routing for pure-read endpoints.
+
+Reads go to a replica only inside a view wrapped with @replica_reads, so a
+write path never reads stale rows by accident:
+
+    class LoanOptionView(APIView):
+        @replica_reads
+        def get(self, request): ...
+
+Per request the wrapper picks one healthy replica (same alias for the whole
+request), or falls back to "default" when:
+
+- the user wrote recently (read-your-writes). Any write marks the request;
+  ReplicaPinMiddleware then pins the user to primary for `pin_s` (cache
+  key for authenticated users, cookie for anonymous ones).
+- the replica lags more than `max_lag_s`. MySQL reports Seconds_Behind_Source.
+  Other backends (the local SQLite setup) compare the newest LoanApplication
+  on both sides.
+- the replica is down. A failed probe or a DatabaseError while the view
+  runs marks it unhealthy for `retry_after_s`, and the view is re-run on
+  primary.
+
+Replica aliases are every DATABASES entry named replica*, see settings.py.
+"""
+import contextvars
+import functools
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "db_pin"
+
+READS = metrics.counter("db_replica_reads_total", "Views served by a read replica", ("alias",))
+FALLBACKS = metrics.counter("db_replica_fallbacks_total", "Replica reads sent to primary", ("reason",))
+LAG = metrics.gauge("db_replica_lag_seconds", "Last measured replica lag", ("alias",))
+
+_read_alias = contextvars.ContextVar("db_read_alias", default=None)
+_wrote = contextvars.ContextVar("db_wrote", default=None)
+
+_health = {}  # alias -> (checked_at monotonic, usable, reason)
+_health_lock = threading.Lock()
+
+
+def conf(name):
+    return settings.REPLICA_ROUTING[name]
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+class ReplicaRouter:
+    """Reads follow the alias chosen by @replica_reads; everything else uses default."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote[0] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replica là bản sao của default
+
+
+def _measure_lag(alias):
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == "mysql":
+            for statement in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):
+                try:
+                    cursor.execute(statement)
+                except DatabaseError:
+                    continue
+                row = cursor.fetchone()
+                if row is None:
+                    return 0.0  # không cấu hình replication (vd: dev)
+                columns = [c[0] for c in cursor.description]
+                status = dict(zip(columns, row))
+                lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+                return float("inf") if lag is None else float(lag)  # NULL = replication dừng
+        cursor.execute("SELECT 1")
+
+    # không có số liệu từ server: so hồ sơ mới nhất giữa primary và replica
+    from user_profile.models import LoanApplication
+
+    replica_max = LoanApplication.objects.using(alias).order_by("-id").values_list("id", flat=True).first() or 0
+    missing = (
+        LoanApplication.objects.using("default").filter(id__gt=replica_max)
+        .order_by("id").values_list("created_at", flat=True).first()
+    )
+    return 0.0 if missing is None else max(0.0, (timezone.now() - missing).total_seconds())
+
+
+def _usable(alias):
+    now = time.monotonic()
+    with _health_lock:
+        checked = _health.get(alias)
+    if checked:
+        checked_at, usable, reason = checked
+        ttl = conf("check_interval_s") if usable or reason == "lag" else conf("retry_after_s")
+        if now - checked_at < ttl:
+            return usable, reason
+    try:
+        lag = _measure_lag(alias)
+    except Exception as exc:
+        logger.warning("Replica %s unavailable: %s", alias, exc)
+        mark_down(alias)
+        return False, "down"
+    finally:
+        connections[alias].close_if_unusable_or_obsolete()
+    LAG.set(lag if lag != float("inf") else -1, alias=alias)
+    usable = lag <= conf("max_lag_s")
+    reason = None if usable else "lag"
+    with _health_lock:
+        _health[alias] = (now, usable, reason)
+    return usable, reason
+
+
+def mark_down(alias):
+    with _health_lock:
+        _health[alias] = (time.monotonic(), False, "down")
+
+
+def _pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+def is_pinned(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return bool(cache.get(_pin_key(user.pk)))
+    return PIN_COOKIE in request.COOKIES
+
+
+def choose_replica(request):
+    """(alias, None) for a usable replica, or (None, reason) to read from primary."""
+    aliases = replica_aliases()
+    if not aliases or not conf("enabled"):
+        return None, None
+    if is_pinned(request):
+        return None, "pinned"
+    reasons = []
+    for alias in random.sample(aliases, len(aliases)):
+        usable, reason = _usable(alias)
+        if usable:
+            return alias, None
+        reasons.append(reason)
+    return None, "lag" if "lag" in reasons else "down"
+
+
+def replica_reads(view_method):
+    """Run a read-only view method against a replica when it is safe to."""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        alias, reason = choose_replica(request)
+        if alias is None:
+            if reason:
+                FALLBACKS.inc(reason=reason)
+            return view_method(self, request, *args, **kwargs)
+        token = _read_alias.set(alias)
+        try:
+            # view phải tự đánh giá queryset (serializer.data, .values() list): render chạy sau khi alias đã reset
+            response = view_method(self, request, *args, **kwargs)
+            READS.inc(alias=alias)
+            return response
+        except DatabaseError as exc:
+            logger.warning("Read on replica %s failed, retrying on primary: %s", alias, exc)
+            mark_down(alias)
+            FALLBACKS.inc(reason="error")
+        finally:
+            _read_alias.reset(token)
+        return view_method(self, request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Pin a user to primary for REPLICA_ROUTING["pin_s"] after a request that wrote."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrote = [False]
+        token = _wrote.set(wrote)
+        try:
+            response = self.get_response(request)
+        finally:
+            _wrote.reset(token)
+        if wrote[0] and replica_aliases():
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                cache.set(_pin_key(user.pk), 1, conf("pin_s"))
+            else:
+                response.set_cookie(PIN_COOKIE, "1", max_age=conf("pin_s"), httponly=True, samesite="Lax")
+        return response
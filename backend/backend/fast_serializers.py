@@ -0,0 +1,153 @@
+"""
+Read-only fast path for hot list/detail GETs.
+
+`ValuesReader` takes an existing ModelSerializer and compiles its fields once
+into `.values()` lookups plus per-field converters. Rows then go straight from
+the DB cursor to dicts with the same keys, order and representation that the
+ModelSerializer would produce, without building model instances or walking
+serializer fields per value.
+
+`FastJSONRenderer` renders with orjson when it is installed and falls back to
+DRF's JSONRenderer otherwise.
+"""
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # optional, DRF's json encoder is used instead
+    orjson = None
+
+# fields whose to_representation is a no-op for values already coming from the DB
+_PASSTHROUGH = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.FloatField,
+    serializers.BooleanField,
+    serializers.JSONField,
+    serializers.ChoiceField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.SlugRelatedField,
+)
+
+
+def _converter(field):
+    if isinstance(field, _PASSTHROUGH):
+        return None
+    if (
+        isinstance(field, serializers.DateTimeField)
+        and getattr(field, "format", api_settings.DATETIME_FORMAT) == ISO_8601
+    ):
+        # same result as DateTimeField.to_representation, minus the per-call setting lookups
+        tz = getattr(field, "timezone", field.default_timezone())
+
+        def datetime_to_iso(value):
+            if tz is not None and value.tzinfo is not None:
+                value = value.astimezone(tz)
+            value = value.isoformat()
+            return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+        return datetime_to_iso
+    return field.to_representation
+
+
+READERS = []  # mọi ValuesReader, backend/preload.py compile sẵn trước khi fork
+
+
+class ValuesReader:
+    """
+    `extra` covers fields that are not a plain column (e.g. SerializerMethodField):
+    {"name": (("lookup", ...), factory)} where factory(context) returns fn(row).
+    """
+
+    def __init__(self, serializer_class, extra=None):
+        self.serializer_class = serializer_class
+        self.extra = extra or {}
+        self._compiled = None
+        READERS.append(self)
+
+    def _compile(self):
+        lookups = []
+        plan = []  # (output name, lookup, converter or None)
+        extras = []  # (output name, factory)
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in self.extra:
+                extra_lookups, factory = self.extra[name]
+                lookups.extend(extra_lookups)
+                plan.append((name, None, None))
+                extras.append((name, factory))
+                continue
+            if isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)) or (
+                isinstance(field, serializers.RelatedField)
+                and not isinstance(field, (serializers.PrimaryKeyRelatedField, serializers.SlugRelatedField))
+            ):
+                raise TypeError(f"{self.serializer_class.__name__}.{name} needs an `extra` entry")
+            lookup = "__".join(field.source_attrs)
+            if isinstance(field, serializers.SlugRelatedField):
+                lookup = f"{lookup}__{field.slug_field}"
+            converter = _converter(field)
+            lookups.append(lookup)
+            plan.append((name, lookup, converter))
+        self._compiled = (tuple(dict.fromkeys(lookups)), tuple(plan), tuple(extras))
+        return self._compiled
+
+    @property
+    def lookups(self):
+        return (self._compiled or self._compile())[0]
+
+    def values(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def _row_builder(self, context):
+        _, plan, extras = self._compiled or self._compile()
+        getters = {name: factory(context or {}) for name, factory in extras}
+
+        def build(row):
+            out = {}
+            for name, lookup, converter in plan:
+                if lookup is None:
+                    out[name] = getters[name](row)
+                    continue
+                value = row[lookup]
+                if converter is not None and value is not None:
+                    value = converter(value)
+                out[name] = value
+            return out
+
+        return build
+
+    def one(self, row, context=None):
+        return self._row_builder(context)(row)
+
+    def build_all(self, rows, context=None):
+        """Representations of rows already read with .values(*self.lookups)."""
+        build = self._row_builder(context)
+        return [build(row) for row in rows]
+
+    def many(self, queryset, context=None, chunk_size=2000):
+        build = self._row_builder(context)
+        return [build(row) for row in self.values(queryset).iterator(chunk_size=chunk_size)]
+
+    def first(self, queryset, context=None):
+        row = self.values(queryset).first()
+        return None if row is None else self.one(row, context)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            # kiểu orjson không hỗ trợ (Decimal, lazy str, ...) => dùng encoder của DRF
+            return super().render(data, accepted_media_type, renderer_context)
+        # same escaping as JSONRenderer so output stays a strict JavaScript subset
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
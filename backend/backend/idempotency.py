@@ -0,0 +1,150 @@
+"""
+`Idempotency-Key` support for POST endpoints that create rows or cost money.
+
+    class LoanApplyView(APIView):
+        @idempotent("loan-apply")
+        def post(self, request): ...
+
+The first response for (scope, user, key) is stored in the default cache for
+IDEMPOTENCY["ttl_s"] and replayed, with `Idempotent-Replayed: true`, for every
+retry carrying the same key. While the first request is still running, a
+duplicate waits for its result (polling the cache) instead of executing again;
+the in-flight marker is a cache.add() lock, atomic on Redis and locmem, with
+its own TTL so a crashed worker cannot block the key forever.
+
+The key is bound to the request body: reusing it with a different body is a
+client bug and gets 422. 5xx responses are not stored, so a retry after a
+server error runs again. Requests without the header behave as before.
+"""
+import functools
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from backend import metrics
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+REQUESTS = metrics.counter(
+    "idempotency_requests_total", "POSTs carrying an Idempotency-Key", ("scope", "outcome"),
+)
+
+
+def conf(name):
+    return settings.IDEMPOTENCY[name]
+
+
+def _fingerprint(request):
+    try:
+        body = json.dumps(request.data, sort_keys=True, default=str)
+    except TypeError:
+        body = repr(request.data)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _cache_key(scope, request, key):
+    owner = request.user.pk if request.user.is_authenticated else "anon"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return f"idem:{scope}:{owner}:{digest}"
+
+
+def stored(scope, request):
+    """True if the request's Idempotency-Key already has a stored response (it will be replayed)."""
+    key = request.headers.get(HEADER)
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return False
+    return cache.get(_cache_key(scope, request, key)) is not None
+
+
+def _replay(stored, fingerprint, scope):
+    if stored["fingerprint"] != fingerprint:
+        REQUESTS.inc(scope=scope, outcome="mismatch")
+        return Response(
+            {"error": f"{HEADER} was already used with a different request body"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    REQUESTS.inc(scope=scope, outcome="replayed")
+    headers = {**stored["headers"], REPLAYED_HEADER: "true"}
+    return Response(stored["data"], status=stored["status"], headers=headers)
+
+
+def _store(cache_key, response, fingerprint, replay_headers):
+    if response.status_code >= 500 or not hasattr(response, "data"):
+        return
+    cache.set(
+        cache_key,
+        {
+            "fingerprint": fingerprint,
+            "status": response.status_code,
+            "data": response.data,
+            "headers": {h: response[h] for h in replay_headers if response.has_header(h)},
+        },
+        conf("ttl_s"),
+    )
+
+
+def idempotent(scope, replay_headers=()):
+    """
+    Decorator for APIView.post. `replay_headers` are response headers stored and
+    replayed along with the body (e.g. X-Analysis-Source).
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is None:
+                return view_method(self, request, *args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {"error": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            cache_key = _cache_key(scope, request, key)
+            lock_key = f"{cache_key}:lock"
+            fingerprint = _fingerprint(request)
+            deadline = time.monotonic() + conf("wait_s")
+            delay = 0.05
+            waited = False
+            while True:
+                stored = cache.get(cache_key)
+                if stored is not None:
+                    return _replay(stored, fingerprint, scope)
+                token = uuid.uuid4().hex
+                if cache.add(lock_key, token, conf("lock_ttl_s")):
+                    break
+                # request đầu tiên đang chạy: chờ kết quả của nó thay vì chạy lại
+                waited = True
+                if time.monotonic() >= deadline:
+                    REQUESTS.inc(scope=scope, outcome="timeout")
+                    return Response(
+                        {"error": f"a request with this {HEADER} is still in progress"},
+                        status=status.HTTP_409_CONFLICT,
+                        headers={"Retry-After": "1"},
+                    )
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+
+            try:
+                # có thể request trước vừa lưu kết quả rồi nhả lock ngay trước lúc add()
+                stored = cache.get(cache_key)
+                if stored is not None:
+                    return _replay(stored, fingerprint, scope)
+                REQUESTS.inc(scope=scope, outcome="executed_after_wait" if waited else "executed")
+                response = view_method(self, request, *args, **kwargs)
+                _store(cache_key, response, fingerprint, replay_headers)
+                return response
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+
+        return wrapper
+    return decorator
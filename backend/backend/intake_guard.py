@@ -0,0 +1,234 @@
+"""
+Velocity limits and threshold-probing detection for application intake.
+
+    class LoanApplyView(APIView):
+        @intake_guard("loan-apply")
+        @idempotent("loan-apply")
+        def post(self, request): ...
+
+Runs before the view, i.e. before scoring and Gemini, with a constant number
+of cache operations per request whatever the traffic. Every POST is keyed by
+the identities it carries: user (authenticated), ip (REMOTE_ADDR, or the
+X-Forwarded-For hop set by INTAKE_GUARD["proxy_depth"]) and device (the
+optional X-Device-Id header). Identity values are hashed before they go into
+cache keys.
+
+Velocity: for each rule (identity, window_s, limit, action) a sliding-window
+counter made of two fixed-window counts in the shared cache (~2 integer keys
+per identity and window, cache.incr is atomic on Redis):
+
+    estimate = count(previous window) * (1 - elapsed / window_s) + count(current window)
+
+Probing: someone cycling inputs to find the knockout thresholds of
+base_line_scoring sends applications that differ from their previous one in
+one or two numeric fields by a small step (income 25M -> 24M -> 23M, ...).
+Per identity, one cache entry keeps the last application's features and a
+score decaying with `half_life_s`. Each such small step adds 1 to the score,
+while a change of loan type or a large change starts over. This is a heuristic:
+concurrent requests of one identity may overwrite each other's state.
+
+Any "block" rule over its limit returns 429 with Retry-After (blocked attempts
+still count). "flag" rules let the request through with request.intake_flags
+set, e.g. ["velocity:ip:3600", "probe:user"]. The
+apply view stores them on LoanApplication.intake_flags (review queue
+?flagged=true). The guard sits outside @idempotent so a 429 is never stored
+and replayed, and uses the same scope: a retry whose Idempotency-Key already
+has a stored response goes straight to the replay without being counted, so
+a client retrying after a timeout does not use up its own velocity limit. If
+the cache is unreachable, the guard lets requests through.
+"""
+import functools
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from backend import idempotency, metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+DEVICE_HEADER = "X-Device-Id"
+# trường số mà knockout / điểm baseline phụ thuộc vào
+PROBE_FIELDS = (
+    "monthly_income", "monthly_debt_payments", "cic_group", "loan_amount", "down_payment",
+    "vehicle_value", "property_value", "credit_history_months", "num_late_payments_24m",
+    "employment_duration_months",
+)
+
+DECISIONS = metrics.counter(
+    "intake_guard_total", "Intake guard rules over their limit", ("scope", "rule", "action"),
+)
+CHECKED = metrics.counter("intake_guard_checked_total", "Requests checked by the intake guard", ("scope", "outcome"))
+
+
+def conf(name):
+    return settings.INTAKE_GUARD[name]
+
+
+def _hash(value):
+    return hashlib.sha256(str(value).encode()).hexdigest()[:16]
+
+
+def client_ip(request):
+    depth = conf("proxy_depth")
+    if depth:
+        hops = [hop.strip() for hop in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if hop.strip()]
+        if len(hops) >= depth:
+            return hops[-depth]  # hop do proxy tin cậy ghi, client không tự đặt được
+    return request.META.get("REMOTE_ADDR")
+
+
+def identities(request):
+    """{"user" | "ip" | "device": hashed value} for the identities the request carries."""
+    found = {}
+    if request.user.is_authenticated:
+        found["user"] = _hash(request.user.pk)
+    ip = client_ip(request)
+    if ip:
+        found["ip"] = _hash(ip)
+    device = request.headers.get(DEVICE_HEADER, "").strip()
+    if device:
+        found["device"] = _hash(device[:200])
+    return found
+
+
+def _count(key, window_s):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, 2 * window_s):
+            return 1
+        return cache.incr(key)  # worker khác vừa tạo key
+
+
+def check_velocity(scope, ids, now):
+    """[(rule name, action, retry_after_s)] of the velocity rules over their limit."""
+    rules = [rule for rule in conf("velocity") if rule[0] in ids]
+    keys = []
+    for kind, window_s, _, _ in rules:
+        bucket = int(now // window_s)
+        base = f"intake:{scope}:{kind}:{ids[kind]}:{window_s}"
+        keys.append((f"{base}:{bucket - 1}", f"{base}:{bucket}"))
+    previous = cache.get_many([prev for prev, _ in keys])
+
+    hits = []
+    for (kind, window_s, limit, action), (prev_key, key) in zip(rules, keys):
+        elapsed = now % window_s
+        estimate = previous.get(prev_key, 0) * (1 - elapsed / window_s) + _count(key, window_s)
+        if estimate > limit:
+            hits.append((f"velocity:{kind}:{window_s}", action, math.ceil(window_s - elapsed)))
+    return hits
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _is_probe(previous, current, probe):
+    changed = 0
+    for old, new in zip(previous, current):
+        if old == new:
+            continue
+        if old is None or new is None:
+            return False
+        if abs(new - old) / max(abs(old), abs(new), 1.0) > probe["max_relative_change"]:
+            return False
+        changed += 1
+    return 1 <= changed <= probe["max_changed_fields"]
+
+
+def check_probing(scope, ids, application, now):
+    """[(rule name, action, retry_after_s)] of the identities whose probing score is too high."""
+    probe = conf("probe")
+    kinds = [kind for kind in probe["identities"] if kind in ids]
+    if not kinds or not isinstance(application, dict):
+        return []
+    loan_type = str(application.get("loan_type") or "")
+    current = [_number(application.get(name)) for name in PROBE_FIELDS]
+    keys = {kind: f"intake:{scope}:probe:{kind}:{ids[kind]}" for kind in kinds}
+    states = cache.get_many(list(keys.values()))
+
+    hits, updates = [], {}
+    for kind, key in keys.items():
+        state = states.get(key)
+        score = 0.0
+        if state is not None:
+            score = state["score"] * 0.5 ** ((now - state["at"]) / probe["half_life_s"])
+            if state["loan_type"] == loan_type and _is_probe(state["features"], current, probe):
+                score += 1
+        updates[key] = {"loan_type": loan_type, "features": current, "score": score, "at": now}
+        if score >= probe["block_at"]:
+            # chờ đến khi điểm giảm xuống dưới ngưỡng block
+            wait = probe["half_life_s"] * math.log2(score / probe["block_at"]) + 1
+            hits.append((f"probe:{kind}", "block", math.ceil(wait)))
+        elif score >= probe["flag_at"]:
+            hits.append((f"probe:{kind}", "flag", 0))
+    cache.set_many(updates, probe["ttl_s"])
+    return hits
+
+
+def check(scope, request, application):
+    """(blocked, flags, retry_after_s) for the request."""
+    ids = identities(request)
+    now = time.time()
+    hits = check_velocity(scope, ids, now) + check_probing(scope, ids, application, now)
+    for rule, action, _ in hits:
+        DECISIONS.inc(scope=scope, rule=rule, action=action)
+    blocked = [retry for _, action, retry in hits if action == "block"]
+    flags = [rule for rule, action, _ in hits if action == "flag"]
+    return bool(blocked), flags, max(blocked, default=0)
+
+
+def intake_guard(scope, application=lambda data: data):
+    """
+    Decorator for APIView.post. `application` picks the application dict out of
+    request.data (e.g. lambda data: data.get("loan_application")).
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            request.intake_flags = []
+            if not conf("enabled"):
+                return view_method(self, request, *args, **kwargs)
+            data = application(request.data)  # body lỗi => 400 của DRF như trước
+            with tracing.span("intake_guard", scope=scope) as span:
+                try:
+                    replay = idempotency.stored(scope, request)
+                    if not replay:
+                        blocked, flags, retry_after = check(scope, request, data)
+                except Exception as exc:
+                    # cache (Redis) lỗi: không chặn hồ sơ thật vì guard
+                    logger.warning("Intake guard skipped for %s: %s", scope, exc)
+                    CHECKED.inc(scope=scope, outcome="error")
+                    return view_method(self, request, *args, **kwargs)
+                if replay:
+                    span.set(replay=True)
+                else:
+                    span.set(blocked=blocked, flags=",".join(flags))
+            if replay:
+                # retry của request đã có kết quả: @idempotent trả lại, không đếm lần nữa
+                CHECKED.inc(scope=scope, outcome="replay")
+                return view_method(self, request, *args, **kwargs)
+            if blocked:
+                CHECKED.inc(scope=scope, outcome="blocked")
+                logger.warning("Intake guard blocked %s from %s", scope, client_ip(request))
+                return Response(
+                    {"error": "too many applications, please retry later"},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={"Retry-After": str(retry_after)},
+                )
+            CHECKED.inc(scope=scope, outcome="flagged" if flags else "allowed")
+            request.intake_flags = flags
+            return view_method(self, request, *args, **kwargs)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,144 @@
+"""
+Minimal in-process metrics registry with Prometheus text exposition.
+
+    from backend import metrics
+    CALLS = metrics.counter("gemini_calls_total", "Gemini calls", ("model", "outcome"))
+    CALLS.inc(model="gemini-2.5-pro", outcome="ok")
+
+Each worker process keeps its own values; scrape every worker (or sum in
+Prometheus) as usual for multi-process servers.
+"""
+import math
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+_lock = threading.Lock()
+_registry = {}
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+def _key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = _key(self.labelnames, labels)
+        with _lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def snapshot(self, **labels):
+        """{"count", "sum"} for one label set (zeros if never observed)."""
+        row = self._values.get(_key(self.labelnames, labels))
+        return {"count": row[-1], "sum": row[-2]} if row else {"count": 0, "sum": 0.0}
+
+    def samples(self):
+        for key, row in list(self._values.items()):
+            for bound, count in zip(self.buckets, row):
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, [("le", le)]), count
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), row[-2]
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), row[-1]
+
+
+def _get_or_create(cls, name, help_text, labelnames, **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, help_text, labelnames, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"metric {name} already registered as {metric.kind}")
+        return metric
+
+
+def counter(name, help_text, labelnames=()):
+    return _get_or_create(Counter, name, help_text, labelnames)
+
+
+def gauge(name, help_text, labelnames=()):
+    return _get_or_create(Gauge, name, help_text, labelnames)
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+
+def render():
+    lines = []
+    for metric in sorted(_registry.values(), key=lambda m: m.name):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint: staff session or `Authorization: Bearer <METRICS_TOKEN>`."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    authorized = (token and request.headers.get("Authorization") == f"Bearer {token}") or (
+        request.user.is_authenticated and request.user.is_staff
+    )
+    if not authorized:
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4")
@@ -0,0 +1,151 @@
+"""
+Read-only state built once in the server master, before it forks the workers.
+
+Under gunicorn with preload_app (see gunicorn.conf.py) wsgi.py runs in the
+master and startup.warm_up() calls preload() there:
+- every view is imported through the URLconf, plus the modules listed in
+  PRELOAD["imports"] (google.genai alone is ~1 s of imports),
+- the fast_serializers readers are compiled,
+- every structure registered below is built (loan option catalog, active
+  outcome models, ...),
+- DB connections are closed (workers must not share a socket) and all objects
+  are moved to the permanent GC generation with gc.freeze(). The workers' cyclic
+  GC then never touches those objects, so their pages stay shared copy-on-write
+  instead of being copied into each worker by the collector.
+
+    from backend import preload
+
+    preload.register("loan_catalog", load, version=version)
+    rows = preload.get("loan_catalog")
+
+A structure is load() plus an optional version() returning a cheap token of the
+source data. At most every check_interval_s, get() compares the token with the
+one it was loaded at and reloads on a change (catalog import, newly activated
+model). The reloaded copy is private to that worker until the next restart
+shares it again. invalidate(name) forces a reload in this process.
+
+Without a preloading server nothing changes for callers: get() builds the
+structure on first use. `manage.py bench_preload` compares worker memory and
+first request latency with and without preloading.
+"""
+import gc
+import importlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+REPORT = {}  # số liệu của lần preload() gần nhất
+
+_entries = {}
+_lock = threading.Lock()
+
+
+def conf(name):
+    return settings.PRELOAD[name]
+
+
+class _Entry:
+    __slots__ = ("load", "version", "check_interval_s", "value", "token", "loaded", "checked_at")
+
+    def __init__(self, load, version, check_interval_s):
+        self.load = load
+        self.version = version
+        self.check_interval_s = check_interval_s
+        self.value = None
+        self.token = None
+        self.loaded = False
+        self.checked_at = 0.0
+
+    def reload(self):
+        # đọc version trước khi dựng: dữ liệu đổi trong lúc dựng thì lần kiểm tra sau dựng lại
+        token = self.version() if self.version is not None else None
+        self.value = self.load()
+        self.token = token
+        self.loaded = True
+        self.checked_at = time.monotonic()
+
+
+def register(name, load, version=None, check_interval_s=None):
+    """check_interval_s defaults to PRELOAD["check_interval_s"]."""
+    _entries[name] = _Entry(load, version, check_interval_s)
+
+
+def get(name):
+    entry = _entries[name]
+    if not entry.loaded:
+        with _lock:
+            if not entry.loaded:
+                entry.reload()
+        return entry.value
+    interval = entry.check_interval_s if entry.check_interval_s is not None else conf("check_interval_s")
+    if entry.version is not None and time.monotonic() - entry.checked_at >= interval:
+        entry.checked_at = time.monotonic()  # các thread khác dùng bản hiện tại trong lúc kiểm tra
+        if entry.version() != entry.token:
+            with _lock:
+                entry.reload()
+    return entry.value
+
+
+def invalidate(name):
+    entry = _entries.get(name)
+    if entry is not None:
+        entry.loaded = False
+
+
+def _step(name, fn):
+    started = time.perf_counter()
+    fn()
+    REPORT["steps_ms"][name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def _import_all():
+    resolver = get_resolver()
+    resolver.url_patterns  # noqa: B018  import mọi urls.py / views
+    resolver.reverse_dict  # noqa: B018
+    for module in conf("imports"):
+        try:
+            importlib.import_module(module)
+        except ImportError as exc:
+            logger.info("preload: skipping %s (%s)", module, exc)
+
+
+def _compile_readers():
+    from backend.fast_serializers import READERS
+
+    for reader in READERS:
+        reader.lookups  # noqa: B018
+
+
+def _load_all():
+    for name, entry in _entries.items():
+        try:
+            entry.reload()
+        except DatabaseError as exc:
+            # vd. chưa migrate: để get() dựng lại lúc dùng
+            logger.warning("preload: %s not loaded (%s)", name, exc)
+
+
+def preload():
+    """Build everything shareable in this process; call before forking workers."""
+    started = time.perf_counter()
+    REPORT.clear()
+    REPORT["steps_ms"] = {}
+    _step("imports", _import_all)
+    _step("readers", _compile_readers)
+    _step("structures", _load_all)
+    connections.close_all()
+    if conf("freeze"):
+        _step("gc_freeze", lambda: (gc.collect(), gc.freeze()))
+    REPORT.update(
+        total_ms=round((time.perf_counter() - started) * 1000, 1),
+        structures=sorted(name for name, entry in _entries.items() if entry.loaded),
+        frozen_objects=gc.get_freeze_count(),
+    )
+    logger.info("preload: %s", REPORT)
+    return REPORT
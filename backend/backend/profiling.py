@@ -0,0 +1,270 @@
+"""
+Opt-in sampling profiler for live requests.
+
+A request is profiled when
+- a staff user sends `X-Profile: 1` (any endpoint), or
+- it hits one of PROFILING["paths"] and wins the PROFILING["sample_rate"] draw.
+
+While a profiled request runs, one shared sampler thread reads the request
+thread's stack every `interval_ms` (sys._current_frames, no tracing hooks) and
+counts each distinct stack, from ProfilingMiddleware down to the view,
+serializer and scoring frames. The result is stored as JSON with the request
+metadata under PROFILING["dir"] and its id returned in `X-Profile-Id`:
+
+    GET /profiles/                 latest profiles (staff)
+    GET /profiles/<id>/            full JSON
+    GET /profiles/<id>/?output=folded
+                                   "a;b;c <samples>" lines for flamegraph.pl / speedscope
+
+With no profiled request in flight the sampler thread blocks on an Event, and
+the middleware costs one header lookup plus one random() per request.
+Profiles are per host (local files); only the newest `max_profiles` are kept.
+"""
+import json
+import logging
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+ID_HEADER = "X-Profile-Id"
+
+PROFILES = metrics.counter("request_profiles_total", "Requests profiled", ("trigger",))
+
+_STDLIB = os.path.dirname(os.__file__)
+_ID = re.compile(r"\d{14}-[0-9a-f]{8}")
+
+
+def conf(name):
+    return settings.PROFILING[name]
+
+
+def storage():
+    return FileSystemStorage(location=conf("dir"))
+
+
+def _label(code, frame):
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class Profile:
+    def __init__(self, thread_id, root_code):
+        self.thread_id = thread_id
+        self.root_code = root_code
+        self.stacks = Counter()
+        self.samples = 0
+
+    def add(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            if code is self.root_code:
+                break  # phần phía trên (server, middleware ngoài) giống nhau ở mọi request
+            stack.append(_label(code, frame))
+            frame = frame.f_back
+        if stack:
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+class _Sampler:
+    """One daemon thread sampling every registered request thread."""
+
+    def __init__(self):
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, profile):
+        with self._lock:
+            self._active[profile.thread_id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+
+    def stop(self, profile):
+        with self._lock:
+            self._active.pop(profile.thread_id, None)
+            if not self._active:
+                self._wake.clear()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # giữ lock khi lấy mẫu: stop() trả về thì profile không còn bị ghi nữa
+            with self._lock:
+                frames = sys._current_frames()
+                for profile in self._active.values():
+                    frame = frames.get(profile.thread_id)
+                    if frame is not None:
+                        profile.add(frame)
+                del frames
+            time.sleep(conf("interval_ms") / 1000)
+
+
+_sampler = _Sampler()
+
+
+def _is_staff(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    # token auth của DRF chỉ chạy trong view: xác thực trước ở đây
+    try:
+        user = Request(request, authenticators=[cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES]).user
+    except APIException:
+        return False
+    return user.is_authenticated and user.is_staff
+
+
+def _trigger(request):
+    if request.headers.get(HEADER):
+        return "header" if _is_staff(request) else None
+    rate = conf("sample_rate")
+    if rate and random.random() < rate and request.path.startswith(tuple(conf("paths"))):
+        return "sampled"
+    return None
+
+
+def _hot(stacks, limit=25):
+    """Project functions by inclusive samples (a function counted once per stack)."""
+    local = {
+        name for name in {label.split(":")[0] for stack in stacks for label in stack.split(";")}
+        if _is_local(name)
+    }
+    inclusive = Counter()
+    for stack, count in stacks.items():
+        for label in set(stack.split(";")):
+            if label.split(":")[0] in local:
+                inclusive[label] += count
+    return [{"function": label, "samples": count} for label, count in inclusive.most_common(limit)]
+
+
+def _is_local(module):
+    loaded = sys.modules.get(module)
+    path = getattr(loaded, "__file__", None) or ""
+    # stdlib / site-packages (kể cả venv nằm trong BASE_DIR) không phải code của project
+    return path.startswith(str(settings.BASE_DIR)) and not path.startswith(_STDLIB) and "site-packages" not in path
+
+
+def _save(profile, request, response, trigger, started_at, duration):
+    profile_id = f"{started_at:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+    user = getattr(request, "user", None)
+    data = {
+        "id": profile_id,
+        "trigger": trigger,
+        "method": request.method,
+        "path": request.path,
+        "query": request.META.get("QUERY_STRING", ""),
+        "user_id": user.pk if user is not None and user.is_authenticated else None,
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 1),
+        "started_at": started_at.isoformat(),
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "interval_ms": conf("interval_ms"),
+        "samples": profile.samples,
+        "hot": _hot(profile.stacks),
+        "stacks": dict(profile.stacks.most_common()),
+    }
+    store = storage()
+    store.save(f"{profile_id}.json", ContentFile(json.dumps(data).encode()))
+    names = sorted(store.listdir("")[1])
+    for name in names[: max(0, len(names) - conf("max_profiles"))]:
+        store.delete(name)
+    return profile_id
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = _trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profile = Profile(threading.get_ident(), ProfilingMiddleware.__call__.__code__)
+        started_at = timezone.now()
+        started = time.perf_counter()
+        _sampler.start(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _sampler.stop(profile)
+        duration = time.perf_counter() - started
+        PROFILES.inc(trigger=trigger)
+        try:
+            response[ID_HEADER] = _save(profile, request, response, trigger, started_at, duration)
+        except Exception:
+            logger.exception("Could not store profile of %s %s", request.method, request.path)
+        return response
+
+
+def _load(profile_id):
+    name = f"{profile_id}.json"
+    store = storage()
+    if not _ID.fullmatch(profile_id) or not store.exists(name):
+        raise Http404
+    with store.open(name) as f:
+        return json.load(f)
+
+
+class ProfileListView(APIView):
+    """GET => newest profiles first, without the stacks (?limit=50)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", 50)), conf("max_profiles"))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        store = storage()
+        names = sorted(store.listdir("")[1], reverse=True)[:limit] if os.path.isdir(conf("dir")) else []
+        results = []
+        for name in names:
+            with store.open(name) as f:
+                data = json.load(f)
+            data.pop("stacks")
+            data["hot"] = data["hot"][:5]
+            results.append(data)
+        return Response({"results": results})
+
+
+class ProfileDetailView(APIView):
+    """GET => full profile JSON, or ?output=folded for flame graph tools (?format is DRF's)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        data = _load(profile_id)
+        if request.query_params.get("output") == "folded":
+            body = "".join(f"{stack} {count}\n" for stack, count in data["stacks"].items())
+            response = HttpResponse(body, content_type="text/plain; charset=utf-8")
+            response["Content-Disposition"] = f'attachment; filename="{profile_id}.folded"'
+            return response
+        return Response(data)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,15 +44,20 @@ INSTALLED_APPS = [
     'corsheaders',
     'user_profile',
     'LoanPackages',
+    'Banks',
+    'Documents',
 ]
 
 MIDDLEWARE = [
+    'backend.tracing.TracingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'backend.profiling.ProfilingMiddleware',
+    'backend.db_router.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -91,6 +97,34 @@ DATABASES = {
     }
 }
 
+# Replica chỉ đọc, cùng NAME / USER với default: DB_REPLICA_HOSTS="10.0.0.2:3306,10.0.0.3"
+# => alias replica1, replica2 (xem backend/db_router.py)
+for _i, _host in enumerate(filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), 1):
+    _name, _, _port = _host.strip().partition(":")
+    DATABASES[f"replica{_i}"] = {
+        **DATABASES["default"], "HOST": _name, "PORT": _port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+# Thử local không cần MySQL: DB_SQLITE=1 dùng db.sqlite3, DB_SQLITE_REPLICAS=1 thêm
+# db_replica1.sqlite3 (tự copy / migrate để giả lập replication và độ trễ)
+if os.environ.get("DB_SQLITE"):
+    DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": BASE_DIR / "db.sqlite3"}}
+    for _i in range(1, int(os.environ.get("DB_SQLITE_REPLICAS", 0)) + 1):
+        DATABASES[f"replica{_i}"] = {
+            "ENGINE": "django.db.backends.sqlite3", "NAME": BASE_DIR / f"db_replica{_i}.sqlite3",
+            "TEST": {"MIRROR": "default"},
+        }
+
+DATABASE_ROUTERS = ['backend.db_router.ReplicaRouter']
+REPLICA_ROUTING = {
+    "enabled": os.environ.get("DB_REPLICA_READS", "1") == "1",
+    "max_lag_s": 5,          # replica trễ hơn => đọc primary
+    "pin_s": 10,             # sau khi user ghi, đọc primary trong khoảng này (read-your-writes)
+    "check_interval_s": 2,   # đo lại độ trễ mỗi replica
+    "retry_after_s": 30,     # replica lỗi: thử lại sau
+}
+
 AUTH_USER_MODEL = 'Users.User'
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -128,6 +162,25 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (bank logos, ...)
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_URL = 'media/'
+
+# Upload tài liệu theo chunk, xem Documents/uploads.py
+DOCUMENT_UPLOAD_TEMP_DIR = MEDIA_ROOT / 'uploads'  # cùng filesystem với MEDIA_ROOT để chỉ cần rename
+DOCUMENT_MAX_BYTES = 1024 * 1024 * 1024
+DOCUMENT_CHUNK_BYTES = 8 * 1024 * 1024       # gợi ý cho client
+DOCUMENT_MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+# Trích xuất nội dung tài liệu chạy nền (Documents/extraction.py)
+DOCUMENT_EXTRACTION = {
+    "workers": int(os.environ.get("DOCUMENT_EXTRACTION_WORKERS", 2)),  # process, không phải thread
+    "max_bytes": 50 * 1024 * 1024,  # file lớn hơn không parse
+    "max_text_chars": 20000,        # text lưu lại cho mỗi file
+    "summary_chars": 600,           # tóm tắt đưa vào prompt
+    "stale_after_s": 600,           # pending lâu hơn => extract_documents chạy lại
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -161,6 +214,19 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
+    'x-profile',
+    'traceparent',
+    'x-device-id',
+]
+# headers frontend được đọc
+CORS_EXPOSE_HEADERS = [
+    'x-analysis-source',
+    'idempotent-replayed',
+    'x-profile-id',
+    'x-trace-id',
+    'traceparent',
+    'retry-after',
 ]
 # settings.py
 REST_FRAMEWORK = {
@@ -169,3 +235,177 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',    # nếu dùng DRF token
     ],
 }
+
+# Tạo Gemini client ngay khi worker khởi động thay vì ở request phân tích đầu tiên
+GEMINI_PREWARM = os.environ.get("GEMINI_PREWARM", "0") == "1"
+
+# Gemini model routing, xem LoanPackages/routing.py
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-pro")
+GEMINI_FAST_MODEL = os.environ.get("GEMINI_FAST_MODEL", "gemini-2.5-flash")
+GEMINI_ROUTES = {
+    # request class: primary model, backup model for the hedged request, when to
+    # send it, latency SLO for the whole call (also the retry deadline), HTTP
+    # timeout of a single attempt, output token cap
+    "numeric": {
+        "model": GEMINI_FAST_MODEL,
+        "hedge_model": GEMINI_FAST_MODEL,
+        "hedge_after_ms": 4000,
+        "slo_ms": 10000,
+        "timeout_ms": 8000,
+        "max_tokens": 2048,
+    },
+    "narrative": {
+        "model": GEMINI_MODEL,
+        "hedge_model": GEMINI_FAST_MODEL,
+        "hedge_after_ms": 25000,
+        "slo_ms": 45000,
+        "timeout_ms": 40000,
+        "max_tokens": 8192,
+    },
+}
+# Cache theo đặc trưng đã lượng tử hoá (LoanPackages/semantic_cache.py)
+GEMINI_SEMANTIC_CACHE = {
+    "enabled": os.environ.get("GEMINI_SEMANTIC_CACHE", "1") == "1",
+    "ttl_s": 7 * 24 * 3600,
+    "verify_rate": 0.05,  # tỉ lệ hit vẫn gọi Gemini để đo độ lệch điểm
+    # chỉ loại kết quả toàn số; narrative trích số liệu của chính người nộp, không dùng chung được
+    "request_classes": ("numeric",),
+    "version": 1,         # tăng khi đổi prompt / cách chia band
+}
+# USD per 1M tokens: (input, output)
+GEMINI_PRICING = {
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+# input token đọc từ context cache tính bằng 25% giá input
+GEMINI_CACHED_INPUT_FACTOR = 0.25
+GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "16"))
+
+# chat hỏi tiếp trên một LoanAnalysis, xem LoanPackages/chat.py
+GEMINI_CHAT = {
+    "model": GEMINI_FAST_MODEL,
+    "summary_model": GEMINI_FAST_MODEL,
+    "max_output_tokens": 2048,
+    "timeout_ms": 30000,
+    "history_tokens": 1500,       # lịch sử chưa tóm tắt vượt mức này thì gộp vào summary
+    "summary_max_tokens": 1024,
+    "context_cache_ttl_s": 3600,
+    "min_cache_tokens": 1024,     # explicit cache của Gemini cần tối thiểu ~1024 token
+    "max_message_chars": 2000,
+}
+
+# retries và circuit breaker, xem LoanPackages/resilience.py
+GEMINI_RESILIENCE = {
+    "max_attempts": 3,
+    "backoff_initial_ms": 500,   # full jitter: sleep ~ U(0, min(max, initial * 2^n))
+    "backoff_max_ms": 8000,
+    "breaker_failures": 5,       # lỗi trong breaker_window_s thì mở breaker
+    "breaker_window_s": 60,
+    "breaker_cooldown_s": 30,    # sau đó cho 1 request thử (half-open)
+}
+
+# percentile điểm theo loan type, xem user_profile/percentiles.py
+SCORE_SKETCH = {
+    "flush_every": 50,          # số evaluation buffer trong worker trước khi ghi DB
+    "flush_interval_s": 10,
+    "refresh_interval_s": 30,   # đọc lại sketch đã merge từ các worker khác
+}
+
+# xác suất được duyệt học từ LoanOutcome (user_profile/outcome_model.py, manage.py train_outcome_model)
+OUTCOME_MODEL = {
+    "l2": 1.0,                  # hệ số regularization trên đặc trưng đã chuẩn hoá
+    "validation_share": 0.2,    # phần quyết định mới nhất giữ lại để đo AUC / log loss
+    "min_outcomes": 200,
+    "refresh_interval_s": 60,   # worker kiểm tra version các model active sau bấy nhiêu giây
+}
+
+# dựng sẵn trong master trước khi fork worker (gunicorn preload_app), xem backend/preload.py
+PRELOAD = {
+    "enabled": os.environ.get("PRELOAD", "1") == "1",
+    "imports": ("google.genai", "google.genai.types", "numpy"),  # import nặng, chỉ import (client tạo sau fork)
+    "freeze": True,             # gc.freeze(): GC của worker không ghi vào các trang dùng chung
+    "check_interval_s": 30,     # worker so version của dữ liệu đã dựng sau bấy nhiêu giây
+}
+
+# Redis nếu có REDIS_URL (dùng chung giữa các worker), không thì cache trong process
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Lưu trữ dữ liệu cũ (user_profile/retention.py, manage.py apply_retention).
+# keep_months: số tháng trọn vẹn giữ ở bảng chính; batch_size / pause_ms: nhịp chạy
+RETENTION_POLICIES = {
+    "user_profile.LoanApplication": {"keep_months": 24},
+    "user_profile.LoanEvaluation": {"keep_months": 6},  # chỉ evaluation đã có bản mới hơn
+}
+
+# Idempotency-Key cho POST apply / gemini (backend/idempotency.py), lưu trong CACHES["default"]
+IDEMPOTENCY = {
+    "ttl_s": 24 * 3600,  # response đầu tiên được replay trong khoảng này
+    "lock_ttl_s": 120,   # > thời gian tối đa của một request (narrative slo 45s + retry)
+    "wait_s": 60,        # request trùng chờ request đang chạy tối đa bấy nhiêu
+}
+
+# giới hạn tốc độ nộp hồ sơ và phát hiện dò ngưỡng knockout, xem backend/intake_guard.py
+INTAKE_GUARD = {
+    "enabled": os.environ.get("INTAKE_GUARD", "1") == "1",
+    "proxy_depth": int(os.environ.get("INTAKE_PROXY_DEPTH", "0")),  # số proxy tin cậy ghi X-Forwarded-For
+    # (identity, window_s, limit, action): sliding window ước lượng từ 2 window cố định
+    "velocity": (
+        ("user", 60, 5, "block"),
+        ("user", 3600, 30, "block"),
+        ("device", 60, 5, "block"),
+        ("device", 3600, 30, "flag"),
+        ("ip", 60, 30, "block"),     # NAT / văn phòng: nhiều người chung IP
+        ("ip", 3600, 300, "flag"),
+    ),
+    "probe": {
+        "identities": ("user", "device", "ip"),
+        "max_changed_fields": 2,     # hồ sơ chỉ khác hồ sơ trước ở 1-2 trường số ...
+        "max_relative_change": 0.25, # ... mỗi trường lệch không quá 25%
+        "half_life_s": 1800,
+        "flag_at": 4,
+        "block_at": 8,
+        "ttl_s": 24 * 3600,
+    },
+}
+
+# Trả góp / DTI sau khi vay cho mọi LoanOption (LoanPackages/affordability.py)
+LOAN_AFFORDABILITY = {
+    "term_step_months": 12,  # các kỳ hạn thử: 12, 24, ... đến kỳ hạn tối đa của gói
+}
+
+# Sampling profiler (backend/profiling.py): header X-Profile: 1 của staff, hoặc lấy mẫu theo tỉ lệ
+PROFILING = {
+    "sample_rate": float(os.environ.get("PROFILE_SAMPLE_RATE", 0)),  # 0.01 = 1% request của "paths"
+    "paths": ("/api/loan_application/apply/", "/api/loan_options/gemini/"),
+    "interval_ms": 5,
+    "max_profiles": 200,  # giữ bấy nhiêu file mới nhất
+    "dir": os.environ.get("PROFILE_DIR", str(BASE_DIR / "profiles")),  # không nằm trong MEDIA_ROOT
+}
+
+# Tracing theo stage (backend/tracing.py); traceparent đến từ client có cờ sampled luôn được ghi
+TRACING = {
+    "sample_rate": float(os.environ.get("TRACE_SAMPLE_RATE", 0.1)),
+    "exporter": os.environ.get("TRACE_EXPORTER", "file"),  # file | otlp | none
+    "file": os.environ.get("TRACE_FILE", str(BASE_DIR / "traces" / "spans.jsonl")),
+    "endpoint": os.environ.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", "http://localhost:4318/v1/traces"),
+    "service_name": "fincare-backend",
+    "max_queue": 10000,  # đầy thì bỏ span, không chặn request
+    "batch_size": 512,
+    "flush_interval_s": 2,
+}
+
+# Bearer token cho Prometheus scrape /metrics/ (staff session cũng được)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
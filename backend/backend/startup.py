@@ -0,0 +1,31 @@
+"""
+Work done once per server process, after Django is set up (called from
+wsgi.py / asgi.py, never from manage.py commands).
+
+Under gunicorn with preload_app (gunicorn.conf.py) wsgi.py is imported once in
+the master: warm_up() then only builds the fork-safe, read-only state
+(backend/preload.py) and gunicorn's post_fork hook runs worker_init() in each
+worker.
+"""
+import os
+
+from django.conf import settings
+
+from backend import preload
+
+# gunicorn.conf.py đặt biến này khi preload_app bật
+FORKING_MASTER_ENV = "SERVER_PRELOAD_APP"
+
+
+def warm_up():
+    if settings.PRELOAD["enabled"]:
+        preload.preload()
+    if os.environ.get(FORKING_MASTER_ENV) != "1":
+        worker_init()
+
+
+def worker_init():
+    # Gemini client giữ connection pool / thread: không tạo trước khi fork
+    if settings.GEMINI_PREWARM:
+        from LoanPackages.service import prewarm
+        prewarm()
@@ -0,0 +1,259 @@
+"""
+Lightweight request tracing: stage spans with W3C trace context.
+
+    from backend import tracing
+
+    with tracing.span("apply.score", loan_type=app.loan_type):
+        result = base_line_scoring.evaluate(app)
+
+TracingMiddleware opens the root span of every request. It continues the
+caller's trace from an incoming `traceparent` header, otherwise it starts a new
+trace sampled at TRACING["sample_rate"]. It returns `traceparent` and
+`X-Trace-Id`. span() nests under the current span of the context (contextvars,
+so also across threads started with contextvars.copy_context(), see
+LoanPackages/routing.py). Outside a sampled trace, e.g. in management commands
+or unsampled requests, span() is a no-op.
+
+Finished spans
+- feed the `trace_span_seconds{name}` histogram (p99 per stage in Prometheus),
+- are queued to a background exporter that writes batches to
+  TRACING["exporter"]: "file" (JSON lines at TRACING["file"]), "otlp" (OTLP/HTTP
+  JSON to TRACING["endpoint"], e.g. an OpenTelemetry collector) or "none".
+  A full queue drops spans instead of blocking the request.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+TRACE_ID_HEADER = "X-Trace-Id"
+_TRACEPARENT = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+
+SPAN_SECONDS = metrics.histogram(
+    "trace_span_seconds", "Duration of traced stages", ("name",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+DROPPED = metrics.counter("trace_spans_dropped_total", "Spans not exported", ("reason",))
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+def conf(name):
+    return settings.TRACING[name]
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def finish(self):
+        self.end_ns = time.time_ns()
+        SPAN_SECONDS.observe((self.end_ns - self.start_ns) / 1e9, name=self.name)
+        _exporter.put(self)
+
+
+class _NoopSpan:
+    trace_id = None
+    traceparent = None
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+def current():
+    return _current.get()
+
+
+def current_trace_id():
+    active = _current.get()
+    return active.trace_id if active else None
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Child span of the current one; no-op when there is no sampled trace."""
+    parent = _current.get()
+    if parent is None:
+        yield NOOP
+        return
+    child = Span(name, parent.trace_id, parent.span_id, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.error = f"{type(exc).__name__}: {exc}"[:300]
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+def start_trace(name, traceparent=None):
+    """Root span for a request, or None when the trace is not sampled."""
+    match = _TRACEPARENT.fullmatch((traceparent or "").strip().lower())
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        if not int(flags, 16) & 1:
+            return None  # caller quyết định không lấy mẫu
+        return Span(name, trace_id, parent_id)
+    if random.random() >= conf("sample_rate"):
+        return None
+    return Span(name, os.urandom(16).hex())
+
+
+def _record(span):
+    return {
+        "trace_id": span.trace_id,
+        "span_id": span.span_id,
+        "parent_id": span.parent_id,
+        "name": span.name,
+        "start_unix_ns": span.start_ns,
+        "duration_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+        "status": "error" if span.error else "ok",
+        "error": span.error,
+        "attributes": span.attributes,
+    }
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp(spans):
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": conf("service_name")}}]},
+        "scopeSpans": [{
+            "scope": {"name": "backend.tracing"},
+            "spans": [
+                {
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    "parentSpanId": s.parent_id or "",
+                    "name": s.name,
+                    "kind": 2 if s.name.startswith("HTTP ") else 1,  # server / internal
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                    "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+                }
+                for s in spans
+            ],
+        }],
+    }]}
+
+
+class _Exporter:
+    """Bounded queue + one daemon thread writing batches, so requests never wait on IO."""
+
+    def __init__(self):
+        self._queue = None
+        self._lock = threading.Lock()
+
+    def put(self, span):
+        if conf("exporter") == "none":
+            return
+        if self._queue is None:
+            with self._lock:
+                if self._queue is None:
+                    self._queue = queue.Queue(maxsize=conf("max_queue"))
+                    threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            DROPPED.inc(reason="queue_full")
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + conf("flush_interval_s")
+            while len(batch) < conf("batch_size"):
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception as exc:
+                logger.warning("Could not export %d spans: %s", len(batch), exc)
+                DROPPED.inc(len(batch), reason="export_error")
+
+    def write(self, batch):
+        if conf("exporter") == "file":
+            path = conf("file")
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(_record(s), default=str) + "\n" for s in batch)
+        elif conf("exporter") == "otlp":
+            import requests
+
+            response = requests.post(conf("endpoint"), json=_otlp(batch), timeout=5)
+            response.raise_for_status()
+
+
+_exporter = _Exporter()
+
+
+class TracingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        root = start_trace(f"HTTP {request.method}", request.headers.get("traceparent"))
+        if root is None:
+            return self.get_response(request)
+        token = _current.set(root)
+        response = None
+        try:
+            response = self.get_response(request)
+        except BaseException as exc:
+            root.error = f"{type(exc).__name__}: {exc}"[:300]
+            raise
+        finally:
+            _current.reset(token)
+            match = getattr(request, "resolver_match", None)
+            route = f"/{match.route}" if match else "unmatched"  # không dùng path thô làm label metric
+            root.name = f"HTTP {request.method} {route}"
+            root.set(**{"http.method": request.method, "http.route": route, "http.target": request.path})
+            if response is not None:
+                root.set(**{"http.status_code": response.status_code})
+            root.finish()
+        response["traceparent"] = root.traceparent
+        response[TRACE_ID_HEADER] = root.trace_id
+        return response
@@ -1,11 +1,18 @@
 from django.contrib import admin
 from django.urls import path, include
+from backend.metrics import metrics_view
+from backend.profiling import ProfileDetailView, ProfileListView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('Users.urls')), # Thêm dòng này để định tuyến API
     path('api/loan_application/', include('user_profile.urls')),
     path('api/loan_options/', include('LoanPackages.urls')), # Thêm dòng này để định tuyến API
+    path('api/banks/', include('Banks.urls')),
+    path('api/documents/', include('Documents.urls')),
+    path('metrics/', metrics_view, name='metrics'),
+    path('profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('profiles/<str:profile_id>/', ProfileDetailView.as_view(), name='profile-detail'),
 ]
 # ```
 # eof
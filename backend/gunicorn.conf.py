@@ -0,0 +1,26 @@
+"""
+gunicorn -c gunicorn.conf.py backend.wsgi
+
+preload_app: the master imports the app and builds the read-only state of
+backend/preload.py once, then forks the workers, which share it copy-on-write
+(`manage.py bench_preload` measures the difference). GUNICORN_PRELOAD=0 loads
+the app in every worker instead, e.g. for `--reload` during development.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))  # phân tích narrative của Gemini có SLO 45s
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+if preload_app:
+    os.environ["SERVER_PRELOAD_APP"] = "1"  # backend/startup.py: bỏ phần per-worker trong master
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from backend.startup import worker_init
+
+        worker_init()
@@ -25,7 +25,5 @@ Return the output strictly in JSON with the following fields:
 - improvement_advice: list of 4-5 items to help the applicant improve their score
 """
 
-import os
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-pro")  # tuỳ quyền của bạn
+# Model Gemini: xem GEMINI_MODEL / GEMINI_ROUTES trong backend/settings.py
 
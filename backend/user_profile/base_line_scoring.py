@@ -1,4 +1,7 @@
+import hashlib
+import json
 from decimal import Decimal
+from types import SimpleNamespace
 
 CAR_CONFIG = {
     "dti_knockout": Decimal("0.40"),   # DTI > 40% thì loại
@@ -12,6 +15,36 @@ REAL_ESTATE_LOAN_CONFIG = {
     "down_payment_min_pct": Decimal("0.20"),
 }
 
+
+def config_version():
+    """
+    Short fingerprint of the scoring configs. Any threshold change produces a new
+    version, so evaluations written under an older config can be found and re-scored.
+    """
+    payload = json.dumps(
+        {"car": CAR_CONFIG, "real_estate": REAL_ESTATE_LOAN_CONFIG},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+CONFIG_VERSION = config_version()
+
+# LoanApplication columns read by evaluate_car / evaluate_real_estate
+SCORING_FIELDS = (
+    "id", "loan_type", "monthly_income", "monthly_debt_payments", "cic_group",
+    "credit_history_months", "num_late_payments_24m", "num_new_inquiries_6m",
+    "credit_mix_types", "loan_amount", "down_payment", "vehicle_value",
+    "property_value", "employment_duration_months", "salary_payment_method",
+    "additional_info",
+)
+
+# every key evaluate_car / evaluate_real_estate can put in "breakdown"
+BREAKDOWN_KEYS = (
+    "history", "dti", "history_length", "credit_mix", "new_credit",
+    "collateral", "capacity", "character", "capital", "bonus",
+)
+
 def _safe_decimal(x):
     return Decimal(x) if x is not None else Decimal("0")
 
@@ -210,3 +243,17 @@ def evaluate_real_estate(application):
         "knockout_reasons": [],
         "breakdown": breakdown
     }
+
+def evaluate(application):
+    """Dispatch to the scorer matching application.loan_type."""
+    if application.loan_type == 'car':
+        return evaluate_car(application)
+    return evaluate_real_estate(application)
+
+def evaluate_rows(rows):
+    """
+    Score a batch of plain dicts (e.g. LoanApplication.objects.values() rows).
+    Returns [(application_id, result), ...]. Only depends on this module, so it can
+    run inside a process pool without Django being set up in the worker.
+    """
+    return [(row["id"], evaluate(SimpleNamespace(**row))) for row in rows]
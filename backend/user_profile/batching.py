@@ -0,0 +1,23 @@
+def keyset_chunks(queryset, chunk_size=2000, after=0):
+    """
+    Yield lists of rows from `queryset` in primary-key order, `chunk_size` at a time.
+
+    Each chunk is its own `WHERE id > last ORDER BY id LIMIT n` query read through
+    `.iterator()` (server-side cursor where the backend supports it), so memory is
+    bounded by one chunk and the cost per chunk stays flat deep into the table,
+    unlike OFFSET paging. `.values()` querysets must include "id".
+    """
+    last_id = after
+    while True:
+        chunk = list(
+            queryset.filter(pk__gt=last_id)
+            .order_by("pk")[:chunk_size]
+            .iterator(chunk_size=chunk_size)
+        )
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        last_id = last["id"] if isinstance(last, dict) else last.pk
@@ -0,0 +1,199 @@
+"""
+Streaming export of LoanApplication joined to its latest LoanEvaluation.
+
+Rows are read in keyset chunks and written out chunk by chunk, so memory stays
+flat whatever the row count. CSV needs nothing extra; the columnar formats
+(Parquet, Arrow IPC stream) need `pyarrow`, which is imported only when used.
+"""
+import csv
+import datetime
+
+from django.utils import timezone
+
+from .base_line_scoring import BREAKDOWN_KEYS
+from .batching import keyset_chunks
+from .models import LoanApplication, LoanEvaluation
+
+APPLICATION_FIELDS = (
+    "id", "user_id", "loan_type", "monthly_income", "monthly_debt_payments",
+    "cic_group", "credit_history_months", "credit_utilization_pct",
+    "num_late_payments_24m", "num_new_inquiries_6m", "credit_mix_types",
+    "loan_amount", "down_payment", "vehicle_value", "property_value",
+    "employment_type", "employment_duration_months", "salary_payment_method",
+    "dti", "ltv", "created_at",
+)
+EVALUATION_FIELDS = (
+    "evaluation_id", "baseline_score", "eligible", "knockout_reasons",
+    "config_version", "evaluated_at",
+)
+COLUMNS = (
+    APPLICATION_FIELDS
+    + EVALUATION_FIELDS
+    + tuple(f"breakdown_{key}" for key in BREAKDOWN_KEYS)
+)
+
+FORMATS = {
+    # format: (content type, file extension)
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+def filtered_applications(date_from=None, date_to=None, loan_type=None):
+    """date_from / date_to are inclusive dates on LoanApplication.created_at."""
+    qs = LoanApplication.objects.all()
+    tz = timezone.get_current_timezone()
+    if date_from:
+        qs = qs.filter(created_at__gte=datetime.datetime.combine(date_from, datetime.time.min, tz))
+    if date_to:
+        next_day = date_to + datetime.timedelta(days=1)
+        qs = qs.filter(created_at__lt=datetime.datetime.combine(next_day, datetime.time.min, tz))
+    if loan_type:
+        qs = qs.filter(loan_type=loan_type)
+    return qs
+
+def iter_export_chunks(queryset, chunk_size=2000):
+    """Yield lists of tuples ordered like COLUMNS."""
+    for chunk in keyset_chunks(queryset.values(*APPLICATION_FIELDS), chunk_size):
+        ids = [row["id"] for row in chunk]
+        latest = {}
+        # sorted ascending, so the last one seen per application is the latest
+        evaluations = (
+            LoanEvaluation.objects.filter(application_id__in=ids)
+            .order_by("application_id", "created_at", "id")
+            .values("application_id", "id", "baseline_score", "eligible",
+                    "knockout_reasons", "config_version", "created_at", "score_breakdown")
+        )
+        for evaluation in evaluations.iterator(chunk_size=chunk_size):
+            latest[evaluation["application_id"]] = evaluation
+
+        out = []
+        for row in chunk:
+            values = [row[field] for field in APPLICATION_FIELDS]
+            evaluation = latest.get(row["id"])
+            if evaluation is None:
+                values.extend([None] * (len(EVALUATION_FIELDS) + len(BREAKDOWN_KEYS)))
+            else:
+                breakdown = evaluation["score_breakdown"] or {}
+                values.extend([
+                    evaluation["id"],
+                    evaluation["baseline_score"],
+                    evaluation["eligible"],
+                    "; ".join(evaluation["knockout_reasons"] or []),
+                    evaluation["config_version"],
+                    evaluation["created_at"],
+                ])
+                values.extend(breakdown.get(key) for key in BREAKDOWN_KEYS)
+            out.append(tuple(values))
+        yield out
+
+class _Echo:
+    """csv.writer target that returns the line instead of buffering it."""
+    def write(self, value):
+        return value
+
+def stream_csv(chunks):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for chunk in chunks:
+        yield "".join(writer.writerow(row) for row in chunk)
+
+class _ChunkSink:
+    """
+    Write-only file object for pyarrow writers. Bytes written are handed back by
+    drain(), while tell() keeps counting absolute offsets (the Parquet footer needs them).
+    """
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise RuntimeError("Columnar export needs pyarrow (pip install pyarrow).") from exc
+    return pyarrow
+
+def _arrow_schema(pa):
+    money = pa.decimal128(14, 2)
+    types = {
+        "id": pa.int64(), "user_id": pa.int64(), "loan_type": pa.string(),
+        "monthly_income": pa.decimal128(12, 2), "monthly_debt_payments": pa.decimal128(12, 2),
+        "cic_group": pa.int32(), "credit_history_months": pa.int32(),
+        "credit_utilization_pct": pa.float64(), "num_late_payments_24m": pa.int32(),
+        "num_new_inquiries_6m": pa.int32(), "credit_mix_types": pa.int32(),
+        "loan_amount": money, "down_payment": money, "vehicle_value": money,
+        "property_value": money, "employment_type": pa.string(),
+        "employment_duration_months": pa.int32(), "salary_payment_method": pa.string(),
+        "dti": pa.float64(), "ltv": pa.float64(),
+        "created_at": pa.timestamp("us", tz="UTC"),
+        "evaluation_id": pa.int64(), "baseline_score": pa.float64(), "eligible": pa.bool_(),
+        "knockout_reasons": pa.string(), "config_version": pa.string(),
+        "evaluated_at": pa.timestamp("us", tz="UTC"),
+    }
+    types.update({f"breakdown_{key}": pa.float64() for key in BREAKDOWN_KEYS})
+    return pa.schema([(name, types[name]) for name in COLUMNS])
+
+def _record_batch(pa, schema, chunk):
+    columns = list(zip(*chunk))
+    arrays = [pa.array(col, type=field.type) for col, field in zip(columns, schema)]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def stream_columnar(chunks, fmt):
+    """
+    Return a generator of bytes in Parquet (one row group per chunk) or Arrow IPC
+    stream format. pyarrow is checked here, before the first byte is sent.
+    """
+    pa = _import_pyarrow()
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        import pyarrow.ipc
+        writer = pa.ipc.new_stream(sink, schema)
+
+    def generate():
+        for chunk in chunks:
+            if chunk:
+                writer.write_batch(_record_batch(pa, schema, chunk))
+                yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return generate()
+
+def stream_export(fmt, queryset, chunk_size=2000):
+    chunks = iter_export_chunks(queryset, chunk_size)
+    if fmt == "csv":
+        return stream_csv(chunks)
+    return stream_columnar(chunks, fmt)
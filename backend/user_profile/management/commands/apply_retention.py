@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+
+from user_profile import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Move rows older than their RETENTION_POLICIES window into the archive tables, "
+        "in small batches with a pause between them so live traffic is not blocked. "
+        "Safe to interrupt and re-run; rollups and percentiles keep the archived data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--policy", action="append", default=None,
+            help=f"table to process, repeatable (default: all of {sorted(retention.POLICIES)})",
+        )
+        parser.add_argument("--max-batches", type=int, default=None, help="stop each policy after N batches")
+        parser.add_argument("--dry-run", action="store_true", help="only count matching rows")
+
+    def handle(self, *args, **options):
+        names = options["policy"] or [name for name in retention.POLICIES if name in settings.RETENTION_POLICIES]
+        for name in names:
+            if name not in retention.POLICIES or name not in settings.RETENTION_POLICIES:
+                raise CommandError(f"no retention policy for {name!r}")
+
+        # evaluation trước: hồ sơ bị archive sau đó không phải nén lại các evaluation cũ
+        for name in sorted(names, key=lambda n: n != retention.EVALUATIONS):
+            conf = retention.policy(name)
+            before = retention.cutoff(conf["keep_months"])
+            if options["dry_run"]:
+                count, _ = retention.run(name, dry_run=True)
+                self.stdout.write(f"{name}: {count} rows created before {before:%Y-%m-%d} would be archived.")
+                continue
+            started = time.monotonic()
+            done, batches = retention.run(
+                name, max_batches=options["max_batches"],
+                progress=lambda n, d, b: self.stdout.write(f"  {n}: {d} archived ({b} batches)"),
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: archived {done} rows created before {before:%Y-%m-%d} "
+                f"in {batches} batches, {time.monotonic() - started:.1f}s."
+            ))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_profile import outcome_model
+from user_profile.batching import keyset_chunks
+from user_profile.models import LoanApplication, LoanType
+
+
+class Command(BaseCommand):
+    help = (
+        "Score the latest evaluation of every application with the active outcome model "
+        "(approval_probability / outcome_model_version), in keyset batches. Applications "
+        "already scored by the active version are skipped, so it can be re-run after activating a model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        for loan_type in LoanType.values:
+            model = outcome_model.active(loan_type)
+            if model is None:
+                self.stdout.write(f"{loan_type}: no active outcome model, skipped")
+                continue
+            rows = (
+                LoanApplication.objects.filter(loan_type=loan_type, latest_evaluation__isnull=False)
+                .exclude(latest_evaluation__outcome_model_version=model.version)
+                .values("id", "latest_evaluation_id", *outcome_model.FEATURE_FIELDS)
+            )
+            started = time.monotonic()
+            done = 0
+            for chunk in keyset_chunks(rows, options["chunk_size"]):
+                outcome_model.store(
+                    [row["latest_evaluation_id"] for row in chunk],
+                    model.probabilities(chunk).round(4).tolist(),
+                    model.version,
+                )
+                done += len(chunk)
+                self.stdout.write(f"  {loan_type}: {done} ({done / (time.monotonic() - started):.0f} rows/s)")
+            self.stdout.write(self.style.SUCCESS(f"{loan_type}: {done} evaluations scored with {model.version}"))
@@ -0,0 +1,119 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.utils import timezone
+
+from Users.models import User
+from user_profile import review_queue
+from user_profile.models import LoanApplication, LoanEvaluation
+
+
+class _Rollback(Exception):
+    pass
+
+
+# (label, query params, pages to follow with next_cursor)
+CASES = (
+    ("newest", {}, 1),
+    ("car eligible by score", {"loan_type": "car", "eligible": "true", "sort": "-score"}, 1),
+    ("score 60-80, cic 1", {"score_min": "60", "score_max": "80", "cic_group": "1", "sort": "-score"}, 1),
+    ("real_estate last 30 days", {"loan_type": "real_estate", "eligible": "false", "created_from": None}, 1),
+    ("newest, 20 pages deep", {}, 20),
+    ("car by score, 20 pages deep", {"loan_type": "car", "eligible": "true", "sort": "-score"}, 20),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed N applications with evaluations inside a rolled-back transaction and time "
+        "review-queue pages through the full API view (p50 / p95 per page)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                started = time.monotonic()
+                staff = self._seed(options["rows"])
+                self.stdout.write(f"Seeded {options['rows']:,} applications in {time.monotonic() - started:.0f}s")
+                self._analyze()
+                client = Client(HTTP_HOST="localhost")
+                client.force_login(staff)
+                for label, params, pages in CASES:
+                    self._run(client, label, params, pages, options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, rows):
+        rng = random.Random(7)
+        staff = User.objects.create(email="bench-queue@example.com", full_name="Bench officer", is_staff=True)
+        now = timezone.now()
+        batch = 20000
+        for start in range(0, rows, batch):
+            n = min(batch, rows - start)
+            apps = LoanApplication.objects.bulk_create([
+                LoanApplication(
+                    user=staff,
+                    loan_type=rng.choice(("car", "real_estate")),
+                    monthly_income=rng.randrange(8, 120) * 1_000_000,
+                    cic_group=rng.choice((1, 1, 1, 2, 2, 3, 4, 5)),
+                    loan_amount=rng.randrange(100, 5000) * 1_000_000,
+                    created_at=now - timedelta(seconds=rng.randrange(0, 2 * 365 * 86400)),
+                )
+                for _ in range(n)
+            ])
+            if apps[0].pk is None:  # backend không trả id từ bulk insert (MySQL)
+                apps = list(LoanApplication.objects.order_by("-id")[:n])[::-1]
+            evaluations = []
+            for app in apps:
+                score = round(rng.uniform(0, 100) * 2) / 2
+                evaluations.append(LoanEvaluation(
+                    application=app, baseline_score=score, eligible=score >= 50 and rng.random() > 0.1,
+                    knockout_reasons=[] if score >= 50 else ["dti_above_max"], config_version="bench",
+                ))
+            LoanEvaluation.objects.bulk_create(evaluations)
+            review_queue.refresh_latest([app.pk for app in apps])
+        return staff
+
+    def _analyze(self):
+        # thống kê mới cho planner, như DB thật sau khi có dữ liệu
+        table = LoanApplication._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == "mysql":
+                cursor.execute(f"ANALYZE TABLE {table}")
+                cursor.fetchall()
+            elif connection.vendor in ("sqlite", "postgresql"):
+                cursor.execute(f"ANALYZE {table}")
+
+    def _run(self, client, label, params, pages, repeat):
+        params = dict(params)
+        if "created_from" in params:
+            params["created_from"] = (timezone.localdate() - timedelta(days=30)).isoformat()
+        timings = []
+        for _ in range(repeat):
+            query = dict(params)
+            for _ in range(pages):
+                started = time.perf_counter()
+                response = client.get("/api/loan_application/review-queue/", query)
+                timings.append((time.perf_counter() - started) * 1000)
+                data = response.json()
+                if not data["next_cursor"]:
+                    break
+                query["cursor"] = data["next_cursor"]
+        timings.sort()
+        sort = params.get("sort") or review_queue.DEFAULT_SORT
+        plan = review_queue.build_queryset(params).order_by(*review_queue.ordering(sort))[:51].explain()
+        index = next((word for word in plan.replace("(", " ").split() if word.startswith("queue_")), "no queue_ index")
+        self.stdout.write(
+            f"{label:>30}: p50 {statistics.median(timings):6.1f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:6.1f} ms over {len(timings)} pages ({index})"
+        )
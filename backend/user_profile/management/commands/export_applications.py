@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from user_profile import export
+from user_profile.models import LoanType
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Export LoanApplication rows joined to their latest LoanEvaluation "
+        "(score_breakdown flattened to columns) as CSV, Parquet or Arrow."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file-format", choices=sorted(export.FORMATS), default="csv")
+        parser.add_argument("--output", "-o", help="file path (default: stdout)")
+        parser.add_argument("--date-from", type=_date, help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--date-to", type=_date, help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--loan-type", choices=LoanType.values)
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        fmt = options["file_format"]
+        queryset = export.filtered_applications(
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+            loan_type=options["loan_type"],
+        )
+        try:
+            body = export.stream_export(fmt, queryset, chunk_size=options["chunk_size"])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        binary = fmt != "csv"
+        if options["output"]:
+            mode = "wb" if binary else "w"
+            with open(options["output"], mode, **({} if binary else {"newline": "", "encoding": "utf-8"})) as fh:
+                for part in body:
+                    fh.write(part)
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            out = sys.stdout.buffer if binary else sys.stdout
+            for part in body:
+                out.write(part)
+            out.flush()
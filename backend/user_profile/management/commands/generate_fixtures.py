@@ -0,0 +1,324 @@
+import collections
+import csv
+import functools
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time as day_time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from Banks.models import Bank
+from LoanPackages.models import LoanOption
+from user_profile import percentiles, rollups, synthetic
+from user_profile.models import LoanApplication, LoanEvaluation
+
+USER_FIELDS = (
+    "id", "password", "last_login", "is_superuser", "username", "first_name", "last_name",
+    "email", "full_name", "is_staff", "is_active", "date_joined",
+)
+APPLICATION_FIELDS = (
+    "id", "user_id", "loan_type", "monthly_income", "monthly_debt_payments", "cic_group",
+    "credit_history_months", "credit_utilization_pct", "num_late_payments_24m", "num_new_inquiries_6m",
+    "credit_mix_types", "loan_amount", "down_payment", "vehicle_value", "property_value",
+    "employment_type", "employment_duration_months", "salary_payment_method", "additional_info",
+    "created_at", "dti", "ltv", "latest_score", "latest_eligible", "latest_evaluation_id",
+)
+EVALUATION_FIELDS = (
+    "id", "application_id", "baseline_score", "eligible", "knockout_reasons", "score_breakdown",
+    "config_version", "created_at",
+)
+NULL = r"\N"  # NULL của LOAD DATA; với COPY dùng (FORMAT csv, NULL '\N')
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def _csv_value(value):
+    if value is None:
+        return NULL
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return value.astimezone(dt_timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+@functools.lru_cache(maxsize=4 * synthetic.BLOCK)
+def _adapt_datetime(value):
+    # hồ sơ và evaluation dùng chung created_at: chỉ chuyển đổi một lần
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def _pipelined(pool, fn, jobs, window):
+    """fn(*job) for each job in order; with a pool, up to `window` jobs are built ahead."""
+    if pool is None:
+        for job in jobs:
+            yield fn(*job)
+        return
+    pending = collections.deque()
+    for job in jobs:
+        pending.append(pool.submit(fn, *job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class Table:
+    """
+    Writes rows of one model to the database and / or a CSV file. Methods:
+    executemany (raw INSERT batches; mysqlclient turns them into multi-row
+    INSERTs), bulk_create (through the ORM) or load (the file format streamed
+    with LOAD DATA LOCAL INFILE on MySQL, COPY on PostgreSQL).
+    """
+
+    def __init__(self, model, fields, *, load, method, batch_size, output):
+        self.model = model
+        self.fields = fields
+        self.method = method
+        self.batch_size = batch_size
+        self.load = load
+        self.rows = 0
+        self.seconds = 0.0
+        by_attname = {field.attname: field for field in model._meta.concrete_fields}
+        model_fields = [by_attname[name] for name in fields]
+        columns = [field.column for field in model_fields]
+        self.sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            connection.ops.quote_name(model._meta.db_table),
+            ", ".join(connection.ops.quote_name(column) for column in columns),
+            ", ".join(["%s"] * len(columns)),
+        )
+        self.adapters = []
+        for i, field in enumerate(model_fields):
+            kind = field.get_internal_type()
+            if kind == "DateTimeField":
+                self.adapters.append((i, _adapt_datetime))
+            elif kind == "JSONField":
+                self.adapters.append((i, lambda value: None if value is None else json.dumps(value)))
+        self.columns = columns
+        self.file = self.writer = None
+        if output:
+            self.path = os.path.join(output, f"{model._meta.db_table}.csv")
+            self.file = open(self.path, "w", newline="", encoding="utf-8")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(columns)
+
+    def write(self, rows, db_rows=None):
+        """db_rows: what to insert when it differs from the file rows (default: rows)."""
+        if self.writer:
+            self.writer.writerows([_csv_value(value) for value in row] for row in rows)
+        self.rows += len(rows)
+        if not self.load:
+            return
+        rows = rows if db_rows is None else db_rows
+        started = time.perf_counter()
+        if self.method == "load":
+            self._load(rows)
+        elif self.method == "bulk_create":
+            self.model.objects.bulk_create(
+                [self.model(**dict(zip(self.fields, row))) for row in rows], batch_size=self.batch_size,
+            )
+        else:
+            params = [list(row) for row in rows]
+            for row in params:
+                for i, adapt in self.adapters:
+                    row[i] = adapt(row[i])
+            with connection.cursor() as cursor:
+                for i in range(0, len(params), self.batch_size):
+                    cursor.executemany(self.sql, params[i:i + self.batch_size])
+        self.seconds += time.perf_counter() - started
+
+    def _load(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        columns = ", ".join(connection.ops.quote_name(column) for column in self.columns)
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+                raw = cursor.cursor
+                buffer.seek(0)
+                if hasattr(raw, "copy_expert"):  # psycopg2
+                    raw.copy_expert(sql, buffer)
+                else:
+                    with raw.copy(sql) as copy:
+                        copy.write(buffer.getvalue())
+                return
+            # cần OPTIONS {"local_infile": 1} và local_infile=ON phía server
+            with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", encoding="utf-8", delete=False) as f:
+                f.write(buffer.getvalue())
+            try:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                    "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                    f"LINES TERMINATED BY '\\r\\n' ({columns})",
+                    [f.name],
+                )
+            finally:
+                os.unlink(f.name)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+    def report(self):
+        rate = f" ({self.rows / self.seconds:,.0f} rows/s insert)" if self.load and self.seconds else ""
+        return f"{self.model._meta.db_table}: {self.rows:,} rows{rate}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate seeded, reproducible synthetic users, banks, loan options, applications and "
+        "their evaluations (user_profile/synthetic.py) and bulk load them, write them as CSV "
+        "files (one per table, DB column headers) for LOAD DATA / COPY, or both."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--applications", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=None, help="default: one user per 4 applications")
+        parser.add_argument("--banks", type=int, default=10)
+        parser.add_argument("--options-per-bank", type=int, default=6)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--months", type=int, default=24, help="spread created_at over the last N months")
+        parser.add_argument("--end-date", type=_date, default=None, help="YYYY-MM-DD, last day of the spread (default: today)")
+        parser.add_argument("--method", choices=("executemany", "bulk_create", "load"), default="executemany",
+                            help="load = LOAD DATA LOCAL INFILE (MySQL) / COPY (PostgreSQL)")
+        parser.add_argument("--batch-size", type=int, default=2000, help="rows per INSERT batch")
+        parser.add_argument("--workers", type=int, default=max(1, min(4, (os.cpu_count() or 1) - 1)),
+                            help="processes building / scoring blocks while the main one inserts (1 = inline)")
+        parser.add_argument("--output", "-o", help="directory for CSV files")
+        parser.add_argument("--no-db", action="store_true", help="only write the files (ids start at 1)")
+        parser.add_argument("--rebuild-rollups", action="store_true", help="rebuild rollups / score sketches afterwards")
+
+    def handle(self, *args, **options):
+        seed = options["seed"]
+        n_apps = options["applications"]
+        n_users = options["users"] if options["users"] is not None else max(1, n_apps // 4)
+        load = not options["no_db"]
+        output = options["output"]
+        if not load and not output:
+            raise CommandError("--no-db needs --output")
+        if load and options["method"] == "load" and connection.vendor not in ("mysql", "postgresql"):
+            raise CommandError("--method load needs MySQL or PostgreSQL")
+        if n_apps and n_users < 1:
+            raise CommandError("applications need at least one user")
+        User = get_user_model()
+        if load and (
+            User.objects.filter(email__startswith=f"fixture-{seed}-").exists()
+            or Bank.objects.filter(code__startswith=f"fixture-{seed}-").exists()
+        ):
+            raise CommandError(f"fixtures for seed {seed} are already loaded; use another --seed")
+        if output:
+            os.makedirs(output, exist_ok=True)
+
+        end_day = options["end_date"] or timezone.now().date()
+        end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), day_time.min), dt_timezone.utc)
+        span_us = options["months"] * 30 * 86_400 * 10**6
+        start = end - timedelta(microseconds=span_us)
+
+        def table(model, fields):
+            return Table(model, fields, load=load, method=options["method"],
+                         batch_size=options["batch_size"], output=output)
+
+        def first_id(model):
+            return (model.objects.aggregate(m=Max("id"))["m"] or 0) + 1 if load else 1
+
+        users = table(User, USER_FIELDS)
+        # executemany / LOAD bỏ qua pre_save: updated_at (auto_now) phải ghi tường minh
+        banks = table(Bank, ("id", "code", "name", "key_icon", "logo_id", "updated_at"))
+        loan_options = table(LoanOption, ("id", "bank_id", "loan_type", "title", "exclusive_interest_rate",
+                                          "estimated_term", "key_requirement", "average_processing_time",
+                                          "updated_at"))
+        applications = table(LoanApplication, APPLICATION_FIELDS)
+        evaluations = table(LoanEvaluation, EVALUATION_FIELDS)
+        tables = (users, banks, loan_options, applications, evaluations)
+
+        user_start, bank_start, option_start, app_start, eval_start = (
+            first_id(model) for model in (User, Bank, LoanOption, LoanApplication, LoanEvaluation)
+        )
+        pool = ProcessPoolExecutor(max_workers=options["workers"]) if options["workers"] > 1 else None
+        started = time.perf_counter()
+        try:
+            rng = synthetic.block_rng(seed, synthetic.CATALOG)
+            with transaction.atomic():
+                banks.write([
+                    (bank_start + k, f"fixture-{seed}-bank-{k + 1}", f"Fixture Bank {k + 1}", None, None, end)
+                    for k in range(options["banks"])
+                ])
+                loan_options.write([
+                    (option_start + i, bank_start + row.pop("bank"), *row.values(), end)
+                    for i, row in enumerate(synthetic.loan_options(rng, options["banks"], options["options_per_bank"]))
+                ])
+
+            # không đăng nhập được ("!" = unusable), cố định theo seed để file lặp lại được
+            password = "!" + hashlib.sha256(f"fixture-{seed}".encode()).hexdigest()[:40]
+            for block_start in range(0, n_users, synthetic.BLOCK):
+                n = min(synthetic.BLOCK, n_users - block_start)
+                rng = synthetic.block_rng(seed, synthetic.USERS, block_start // synthetic.BLOCK)
+                joined = synthetic.spread(rng, start - timedelta(days=30), span_us, block_start, n, n_users)
+                names = synthetic.full_names(rng, n)
+                with transaction.atomic():
+                    users.write([
+                        (user_start + block_start + i, password, None, False, None, "", "",
+                         f"fixture-{seed}-{block_start + i + 1}@example.com", names[i], False, True, joined[i])
+                        for i in range(n)
+                    ])
+
+            plan = {
+                "n_apps": n_apps, "n_users": n_users, "user_start": user_start, "app_start": app_start,
+                "eval_start": eval_start, "start": start, "span_us": span_us,
+            }
+            jobs = ((seed, block, plan) for block in range(-(-n_apps // synthetic.BLOCK)))
+            for app_rows, eval_rows in _pipelined(pool, synthetic.application_block, jobs, options["workers"] * 2):
+                with transaction.atomic():
+                    # MySQL không hoãn được FK: chèn hồ sơ chưa có latest_evaluation, rồi nối lại cả block
+                    applications.write(app_rows, db_rows=[row[:-1] + (None,) for row in app_rows] if load else None)
+                    evaluations.write(eval_rows)
+                    if load:
+                        LoanApplication.objects.filter(id__range=(app_rows[0][0], app_rows[-1][0])).update(
+                            latest_evaluation_id=F("id") + (eval_start - app_start),
+                        )
+                done = applications.rows
+                self.stdout.write(f"  {done:,} applications ({done / (time.perf_counter() - started):,.0f}/s)")
+        finally:
+            if pool:
+                pool.shutdown()
+            for t in tables:
+                t.close()
+
+        if load:
+            with connection.cursor() as cursor:
+                # PostgreSQL: id chèn tay không đẩy sequence
+                for sql in connection.ops.sequence_reset_sql(no_style(), [User, Bank, LoanOption, LoanApplication, LoanEvaluation]):
+                    cursor.execute(sql)
+        elapsed = time.perf_counter() - started
+        for t in tables:
+            self.stdout.write(t.report())
+        total = sum(t.rows for t in tables)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total:,} rows (seed {seed}) in {elapsed:.1f}s, {total / elapsed:,.0f} rows/s overall"
+            + (f"; files in {output}" if output else "")
+        ))
+        if load and options["rebuild_rollups"]:
+            report = rollups.rebuild()
+            sketches = percentiles.rebuild()
+            self.stdout.write(f"Rebuilt rollups ({report['cohorts']} cohorts) and {sketches} score sketches.")
+        elif load:
+            self.stdout.write("Rollups / score sketches are stale: run rebuild_rollups (or pass --rebuild-rollups).")
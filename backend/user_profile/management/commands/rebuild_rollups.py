@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_profile import percentiles, rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute CohortRollup / KnockoutRollup and the ScoreSketch percentile "
+        "histograms from the latest LoanEvaluation of every application. Evaluations written while this runs may be lost from "
+        "the rollups, so run it while applications are not being scored (or re-run)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        report = rollups.rebuild(chunk_size=options["chunk_size"])
+        sketches = percentiles.rebuild(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt rollups from {report['applications']} applications: "
+            f"{report['cohorts']} cohorts, {report['knockouts']} knockout rows, "
+            f"{sketches} score sketches "
+            f"in {time.monotonic() - started:.1f}s."
+        ))
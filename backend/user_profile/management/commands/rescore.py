@@ -0,0 +1,130 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from user_profile import base_line_scoring, outcome_model, percentiles, review_queue, rollups
+from user_profile.batching import keyset_chunks
+from user_profile.models import LoanApplication, LoanEvaluation, RescoreCheckpoint
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-score every LoanApplication against the current CAR_CONFIG / "
+        "REAL_ESTATE_LOAN_CONFIG and write new LoanEvaluation rows tagged with the "
+        "config version. Progress is checkpointed per version, so an interrupted run "
+        "resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--workers", type=int, default=4, help="scoring processes (1 = score inline)")
+        parser.add_argument("--limit", type=int, default=None, help="stop after N applications")
+        parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first application")
+
+    def handle(self, *args, **options):
+        version = base_line_scoring.CONFIG_VERSION
+        chunk_size = options["chunk_size"]
+        workers = max(1, options["workers"])
+        limit = options["limit"]
+        if limit is not None and limit < 1:
+            raise CommandError("--limit must be at least 1")
+
+        checkpoint, _ = RescoreCheckpoint.objects.get_or_create(config_version=version)
+        if options["restart"]:
+            checkpoint.last_application_id = 0
+            checkpoint.processed = 0
+            checkpoint.started_at = timezone.now()
+            checkpoint.finished_at = None
+            checkpoint.save()
+        elif checkpoint.finished_at:
+            self.stdout.write(f"Config {version} already fully re-scored (use --restart to redo).")
+            return
+
+        self.stdout.write(
+            f"Re-scoring with config {version}, resuming after application id "
+            f"{checkpoint.last_application_id} ({checkpoint.processed} done)."
+        )
+
+        # bỏ qua hồ sơ đã có evaluation với version hiện tại (vd: nộp sau khi đổi config)
+        already_scored = LoanEvaluation.objects.filter(
+            application=OuterRef("pk"), config_version=version
+        )
+        rows = (
+            LoanApplication.objects.filter(~Exists(already_scored))
+            .values(*dict.fromkeys(
+                base_line_scoring.SCORING_FIELDS + rollups.APPLICATION_FIELDS + outcome_model.FEATURE_FIELDS
+            ))
+        )
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        started = time.monotonic()
+        done = 0
+        try:
+            for chunk in keyset_chunks(rows, chunk_size, after=checkpoint.last_application_id):
+                if limit is not None:
+                    chunk = chunk[: limit - done]
+                scored = self._score(chunk, pool, workers)
+                predictions = dict(zip((row["id"] for row in chunk), outcome_model.predict_rows(chunk)))
+                by_id = {row["id"]: row for row in chunk}
+                previous = rollups.latest_evaluations(list(by_id))
+                delta = rollups.RollupDelta()
+                sketch = percentiles.SketchDelta()
+                for app_id, result in scored:
+                    delta.move(by_id[app_id], result, previous.get(app_id))
+                    sketch.move(by_id[app_id], result, previous.get(app_id))
+                now = timezone.now()
+                evaluations = [
+                    LoanEvaluation(
+                        application_id=app_id,
+                        baseline_score=result["baseline_score"],
+                        eligible=result["eligible"],
+                        knockout_reasons=result.get("knockout_reasons", []),
+                        score_breakdown=result.get("breakdown", {}),
+                        config_version=version,
+                        created_at=now,
+                        **predictions[app_id],
+                    )
+                    for app_id, result in scored
+                ]
+                # evaluations, rollups, sketch và checkpoint commit cùng nhau => resume không bị ghi trùng
+                with transaction.atomic():
+                    LoanEvaluation.objects.bulk_create(evaluations, batch_size=1000)
+                    review_queue.refresh_latest(list(by_id))
+                    delta.apply()
+                    sketch.apply()
+                    checkpoint.last_application_id = chunk[-1]["id"]
+                    checkpoint.processed += len(chunk)
+                    checkpoint.save(update_fields=["last_application_id", "processed", "updated_at"])
+
+                done += len(chunk)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"  up to id {checkpoint.last_application_id}: {done} rows "
+                    f"({done / elapsed:.0f} rows/s)"
+                )
+                if limit is not None and done >= limit:
+                    self.stdout.write("Limit reached; run again to continue from the checkpoint.")
+                    return
+        finally:
+            if pool:
+                pool.shutdown()
+
+        checkpoint.finished_at = timezone.now()
+        checkpoint.save(update_fields=["finished_at", "updated_at"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-scored {done} applications with config {version} ({checkpoint.processed} total)."
+        ))
+
+    def _score(self, chunk, pool, workers):
+        if pool is None:
+            return base_line_scoring.evaluate_rows(chunk)
+        step = -(-len(chunk) // workers)
+        batches = [chunk[i:i + step] for i in range(0, len(chunk), step)]
+        scored = []
+        for part in pool.map(base_line_scoring.evaluate_rows, batches):
+            scored.extend(part)
+        return scored
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user_profile import outcome_model
+from user_profile.models import LoanType, OutcomeModel
+
+
+class Command(BaseCommand):
+    help = (
+        "Fit the approval model (L2-regularized logistic regression, user_profile/outcome_model.py) "
+        "per loan type on recorded LoanOutcome rows, report hold-out AUC / log loss next to the "
+        "active model's, and optionally activate it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loan-type", choices=LoanType.values, action="append", default=None,
+                            help="repeatable (default: every loan type)")
+        parser.add_argument("--l2", type=float, default=None, help="default: OUTCOME_MODEL['l2']")
+        parser.add_argument("--validation-share", type=float, default=None)
+        parser.add_argument("--activate", action="store_true", help="make the new model the active one")
+
+    def handle(self, *args, **options):
+        failed = []
+        for loan_type in options["loan_type"] or LoanType.values:
+            started = time.monotonic()
+            current = OutcomeModel.objects.filter(loan_type=loan_type, active=True).first()
+            try:
+                model = outcome_model.train(loan_type, l2=options["l2"], validation_share=options["validation_share"])
+            except outcome_model.TrainingError as exc:
+                self.stderr.write(f"{loan_type}: {exc}")
+                failed.append(loan_type)
+                continue
+            self.stdout.write(
+                f"{loan_type}: {model.version} in {time.monotonic() - started:.1f}s "
+                + ", ".join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in model.metrics.items())
+            )
+            if current is not None:
+                previous = ", ".join(f"{k}={current.metrics[k]:.4f}" for k in ("auc", "log_loss") if current.metrics.get(k) is not None)
+                self.stdout.write(f"  active: {current.version} {previous}")
+            if options["activate"]:
+                outcome_model.activate(model)
+                self.stdout.write(self.style.SUCCESS(
+                    f"  activated {model.version}; run backfill_approval_probability to update stored evaluations"
+                ))
+        if failed:
+            raise CommandError(f"not trained: {', '.join(failed)}")
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.24 on 2026-10-19 11:13
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0003_remove_loanevaluation_ai_breakdown_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RescoreCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('config_version', models.CharField(max_length=40, unique=True)),
+                ('last_application_id', models.BigIntegerField(default=0)),
+                ('processed', models.BigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='loanevaluation',
+            name='config_version',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='loanevaluation',
+            index=models.Index(fields=['application', 'config_version'], name='user_profil_applica_e70c44_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.24 on 2026-10-19 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0004_loanevaluation_config_version_rescorecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('loan_type', models.CharField(choices=[('car', 'Car Loan'), ('real_estate', 'Real Estate Loan')], max_length=20)),
+                ('cic_group', models.IntegerField()),
+                ('dti_band', models.CharField(max_length=10)),
+                ('applications', models.BigIntegerField(default=0)),
+                ('eligible', models.BigIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='KnockoutRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('loan_type', models.CharField(choices=[('car', 'Car Loan'), ('real_estate', 'Real Estate Loan')], max_length=20)),
+                ('cic_group', models.IntegerField()),
+                ('dti_band', models.CharField(max_length=10)),
+                ('reason', models.CharField(max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='knockoutrollup',
+            constraint=models.UniqueConstraint(fields=('month', 'loan_type', 'cic_group', 'dti_band', 'reason'), name='uniq_knockout_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='cohortrollup',
+            constraint=models.UniqueConstraint(fields=('month', 'loan_type', 'cic_group', 'dti_band'), name='uniq_cohort_rollup'),
+        ),
+    ]
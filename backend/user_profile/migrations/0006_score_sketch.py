@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-19 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0005_cohort_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('loan_type', models.CharField(choices=[('car', 'Car Loan'), ('real_estate', 'Real Estate Loan')], max_length=20)),
+                ('segment', models.CharField(max_length=20)),
+                ('counts', models.BinaryField()),
+                ('total', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='scoresketch',
+            constraint=models.UniqueConstraint(fields=('loan_type', 'segment'), name='uniq_score_sketch'),
+        ),
+    ]
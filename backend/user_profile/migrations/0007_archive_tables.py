@@ -0,0 +1,41 @@
+# Generated by Django 4.2.24 on 2026-10-19 11:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0006_score_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedApplication',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.BigIntegerField(db_index=True)),
+                ('loan_type', models.CharField(choices=[('car', 'Car Loan'), ('real_estate', 'Real Estate Loan')], max_length=20)),
+                ('cic_group', models.IntegerField()),
+                ('monthly_income', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('monthly_debt_payments', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField()),
+                ('latest_score', models.FloatField(blank=True, null=True)),
+                ('latest_eligible', models.BooleanField(blank=True, null=True)),
+                ('latest_knockout_reasons', models.JSONField(blank=True, null=True)),
+                ('payload', models.BinaryField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedEvaluation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('application_id', models.BigIntegerField(db_index=True)),
+                ('created_at', models.DateTimeField()),
+                ('payload', models.BinaryField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.24 on 2026-10-19 11:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_latest(apps, schema_editor):
+    """Copy each application's latest evaluation onto it, 5000 ids per UPDATE."""
+    LoanApplication = apps.get_model("user_profile", "LoanApplication")
+    LoanEvaluation = apps.get_model("user_profile", "LoanEvaluation")
+    latest = LoanEvaluation.objects.filter(application=models.OuterRef("pk")).order_by("-created_at", "-id")
+    last_id = 0
+    while True:
+        ids = list(LoanApplication.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:5000])
+        if not ids:
+            return
+        LoanApplication.objects.filter(id__in=ids).update(
+            latest_evaluation_id=models.Subquery(latest.values("id")[:1]),
+            latest_score=models.Subquery(latest.values("baseline_score")[:1]),
+            latest_eligible=models.Subquery(latest.values("eligible")[:1]),
+        )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0007_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='latest_eligible',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='latest_evaluation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='user_profile.loanevaluation'),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='latest_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_latest, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['loan_type', 'latest_eligible', 'latest_score', 'id'], name='queue_type_elig_score'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['loan_type', 'latest_eligible', 'created_at', 'id'], name='queue_type_elig_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['latest_score', 'id'], name='queue_score'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['created_at', 'id'], name='queue_recent'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.24 on 2026-10-19 12:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Banks', '0002_logo_assets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('user_profile', '0008_review_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutcomeModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=40, unique=True)),
+                ('loan_type', models.CharField(choices=[('car', 'Car Loan'), ('real_estate', 'Real Estate Loan')], max_length=20)),
+                ('params', models.JSONField()),
+                ('l2', models.FloatField()),
+                ('metrics', models.JSONField(default=dict)),
+                ('active', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='loanevaluation',
+            name='approval_probability',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanevaluation',
+            name='outcome_model_version',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.CreateModel(
+            name='LoanOutcome',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approved', models.BooleanField()),
+                ('decided_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='outcome', to='user_profile.loanapplication')),
+                ('bank', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Banks.bank')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
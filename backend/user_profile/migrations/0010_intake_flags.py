@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-19 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0009_outcome_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='intake_flags',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
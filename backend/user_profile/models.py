@@ -59,6 +59,25 @@ class LoanApplication(models.Model):
     dti = models.FloatField(null=True, blank=True)  # Debt-to-Income
     ltv = models.FloatField(null=True, blank=True)  # Loan-to-Value
 
+    # evaluation mới nhất, chép sang đây để review queue lọc / sắp xếp bằng index
+    # (xem user_profile/review_queue.py)
+    latest_evaluation = models.ForeignKey(
+        "LoanEvaluation", on_delete=models.SET_NULL, null=True, blank=True, related_name="+",
+    )
+    latest_score = models.FloatField(null=True, blank=True)
+    latest_eligible = models.BooleanField(null=True, blank=True)
+    # luật của backend/intake_guard.py ở mức "flag" khi nộp hồ sơ, vd. ["probe:user"]
+    intake_flags = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # lọc bằng (loan_type, eligible), sắp theo điểm hoặc thời gian, keyset theo id
+            models.Index(fields=["loan_type", "latest_eligible", "latest_score", "id"], name="queue_type_elig_score"),
+            models.Index(fields=["loan_type", "latest_eligible", "created_at", "id"], name="queue_type_elig_recent"),
+            models.Index(fields=["latest_score", "id"], name="queue_score"),
+            models.Index(fields=["created_at", "id"], name="queue_recent"),
+        ]
+
     def __str__(self):
         return f"LoanApplication {self.id} user={self.user_id} type={self.loan_type}"
 
@@ -69,7 +88,142 @@ class LoanEvaluation(models.Model):
     eligible = models.BooleanField()  # hồ sơ pass hay fail
     knockout_reasons = models.JSONField(null=True, blank=True)  # lý do loại trực tiếp
     score_breakdown = models.JSONField(null=True, blank=True)   # chi tiết điểm
+    config_version = models.CharField(max_length=40, null=True, blank=True)
+    # phiên bản CAR_CONFIG / REAL_ESTATE_LOAN_CONFIG dùng để chấm điểm
+    # xác suất được ngân hàng duyệt theo OutcomeModel đang active (null nếu chưa có model)
+    approval_probability = models.FloatField(null=True, blank=True)
+    outcome_model_version = models.CharField(max_length=40, null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["application", "config_version"]),
+        ]
+
     def __str__(self):
         return f"Evaluation for App {self.application_id} score={self.baseline_score}"
+
+# Quyết định thật của ngân hàng cho hồ sơ, dữ liệu để train OutcomeModel
+class LoanOutcome(models.Model):
+    application = models.OneToOneField(LoanApplication, on_delete=models.CASCADE, related_name="outcome")
+    approved = models.BooleanField()
+    bank = models.ForeignKey("Banks.Bank", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    decided_at = models.DateTimeField(default=timezone.now)
+    recorded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Outcome for App {self.application_id} approved={self.approved}"
+
+# Model xác suất duyệt đã train, xem user_profile/outcome_model.py. Mỗi loan type tối đa một model active
+class OutcomeModel(models.Model):
+    version = models.CharField(max_length=40, unique=True)  # "<loan_type>-<hash tham số>"
+    loan_type = models.CharField(max_length=20, choices=LoanType.choices)
+    params = models.JSONField()  # {"features": [...], "weights": [...], "intercept": x}
+    l2 = models.FloatField()
+    metrics = models.JSONField(default=dict)  # auc / log_loss trên tập kiểm định, số outcome
+    active = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"OutcomeModel {self.version}{' (active)' if self.active else ''}"
+
+# Tiến độ của lệnh `manage.py rescore`, mỗi phiên bản config một dòng
+class RescoreCheckpoint(models.Model):
+    config_version = models.CharField(max_length=40, unique=True)
+    last_application_id = models.BigIntegerField(default=0)  # keyset cursor
+    processed = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Rescore {self.config_version} last_id={self.last_application_id}"
+
+# Bảng tổng hợp cho analytics theo cohort, xem user_profile/rollups.py.
+# Mỗi hồ sơ được tính một lần, theo evaluation mới nhất của nó.
+class CohortRollup(models.Model):
+    month = models.DateField()  # ngày 1 của tháng nộp hồ sơ
+    loan_type = models.CharField(max_length=20, choices=LoanType.choices)
+    cic_group = models.IntegerField()
+    dti_band = models.CharField(max_length=10)
+    applications = models.BigIntegerField(default=0)
+    eligible = models.BigIntegerField(default=0)
+    score_sum = models.FloatField(default=0)  # tổng baseline_score, avg = score_sum / applications
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["month", "loan_type", "cic_group", "dti_band"], name="uniq_cohort_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Cohort {self.month:%Y-%m} {self.loan_type} cic={self.cic_group} dti={self.dti_band}"
+
+class KnockoutRollup(models.Model):
+    month = models.DateField()
+    loan_type = models.CharField(max_length=20, choices=LoanType.choices)
+    cic_group = models.IntegerField()
+    dti_band = models.CharField(max_length=10)
+    reason = models.CharField(max_length=255)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["month", "loan_type", "cic_group", "dti_band", "reason"], name="uniq_knockout_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Knockout {self.month:%Y-%m} {self.loan_type} {self.reason}={self.count}"
+
+# Histogram baseline_score (0..100, bước 0.5) theo loan type / segment,
+# dùng để trả percentile cho hồ sơ, xem user_profile/percentiles.py
+class ScoreSketch(models.Model):
+    loan_type = models.CharField(max_length=20, choices=LoanType.choices)
+    segment = models.CharField(max_length=20)  # "all" hoặc "cic<n>"
+    counts = models.BinaryField()  # uint32 little-endian, một số đếm cho mỗi bin
+    total = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["loan_type", "segment"], name="uniq_score_sketch"),
+        ]
+
+    def __str__(self):
+        return f"ScoreSketch {self.loan_type}/{self.segment} n={self.total}"
+
+# Dữ liệu cũ đã chuyển khỏi bảng chính, xem user_profile/retention.py.
+# payload = zlib(JSON) của bản ghi gốc; các cột còn lại đủ để dựng lại rollup / percentile
+class ArchivedApplication(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # = LoanApplication.id cũ
+    user_id = models.BigIntegerField(db_index=True)
+    loan_type = models.CharField(max_length=20, choices=LoanType.choices)
+    cic_group = models.IntegerField()
+    monthly_income = models.DecimalField(max_digits=12, decimal_places=2)
+    monthly_debt_payments = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField()
+    # evaluation mới nhất lúc lưu trữ (null nếu hồ sơ chưa được chấm)
+    latest_score = models.FloatField(null=True, blank=True)
+    latest_eligible = models.BooleanField(null=True, blank=True)
+    latest_knockout_reasons = models.JSONField(null=True, blank=True)
+    payload = models.BinaryField()  # {"application": {...}, "evaluations": [...]}
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archived LoanApplication {self.id}"
+
+# Evaluation cũ đã bị thay bằng evaluation mới hơn (hồ sơ vẫn còn ở bảng chính)
+class ArchivedEvaluation(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # = LoanEvaluation.id cũ
+    application_id = models.BigIntegerField(db_index=True)
+    created_at = models.DateTimeField()
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archived LoanEvaluation {self.id} for App {self.application_id}"
@@ -0,0 +1,280 @@
+"""
+Approval probability learned from bank decisions (LoanOutcome), scored next to
+the hand-tuned baseline of evaluate_car / evaluate_real_estate.
+
+`manage.py train_outcome_model` fits one L2-regularized logistic regression per
+loan type on the application features below (Newton / IRLS in NumPy on
+standardized features, the last `validation_share` of decisions by date held
+out for AUC / log loss). The standardization is folded into the stored
+weights, so a model is just (FEATURES, weights, intercept) under a content
+hash version, one active per loan type:
+
+    p(approved) = 1 / (1 + exp(-(intercept + weights . features(application))))
+
+predict() is that dot product in plain Python (a few µs, used in the apply
+path); predict_rows() is the same model as one NumPy matmul for backfills and
+rescore. The active models are registered with backend/preload.py (built in
+the gunicorn master before fork); a worker checks the active versions at most
+every OUTCOME_MODEL["refresh_interval_s"] and reloads when they change.
+"""
+import hashlib
+import json
+import math
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from backend import preload
+
+from .models import LoanEvaluation, LoanOutcome, OutcomeModel
+
+# cột LoanApplication cần để dựng vector đặc trưng
+FEATURE_FIELDS = (
+    "loan_type", "monthly_income", "monthly_debt_payments", "cic_group", "credit_history_months",
+    "credit_utilization_pct", "num_late_payments_24m", "num_new_inquiries_6m", "credit_mix_types",
+    "loan_amount", "down_payment", "vehicle_value", "property_value", "employment_type",
+    "employment_duration_months", "salary_payment_method",
+)
+FEATURES = (
+    "log_income", "log_loan_amount", "dti", "ltv", "down_payment_pct",
+    "cic2", "cic3", "cic4", "cic5", "log_history_months", "utilization", "utilization_missing",
+    "log_late_payments", "new_inquiries", "credit_mix", "log_employment_months",
+    "bank_transfer", "permanent_employment",
+)
+
+
+class TrainingError(ValueError):
+    pass
+
+
+def conf(name):
+    return settings.OUTCOME_MODEL[name]
+
+
+def _get(obj, name):
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def _float(value):
+    return float(value) if value is not None else 0.0
+
+
+def features(application):
+    """Feature vector (list of floats, order of FEATURES) of a LoanApplication or values() row."""
+    income = _float(_get(application, "monthly_income"))
+    loan = _float(_get(application, "loan_amount"))
+    collateral = _float(_get(application, "vehicle_value" if _get(application, "loan_type") == "car" else "property_value"))
+    cic = int(_get(application, "cic_group") or 1)
+    utilization = _get(application, "credit_utilization_pct")
+    return [
+        math.log(max(income, 1.0)),
+        math.log(max(loan, 1.0)),
+        min(_float(_get(application, "monthly_debt_payments")) / income, 2.0) if income > 0 else 2.0,
+        min(loan / collateral, 2.0) if collateral > 0 else 1.0,
+        _float(_get(application, "down_payment")) / collateral if collateral > 0 else 0.0,
+        float(cic == 2), float(cic == 3), float(cic == 4), float(cic >= 5),
+        math.log1p(_float(_get(application, "credit_history_months"))),
+        _float(utilization) / 100 if utilization is not None else 0.0,
+        float(utilization is None),
+        math.log1p(_float(_get(application, "num_late_payments_24m"))),
+        min(_float(_get(application, "num_new_inquiries_6m")), 10.0),
+        min(_float(_get(application, "credit_mix_types")), 5.0),
+        math.log1p(_float(_get(application, "employment_duration_months"))),
+        float(_get(application, "salary_payment_method") == "bank_transfer"),
+        float(str(_get(application, "employment_type") or "").strip().lower() == "permanent"),
+    ]
+
+
+def feature_matrix(rows):
+    return np.array([features(row) for row in rows], dtype=float).reshape(-1, len(FEATURES))
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+
+def fit(X, y, l2=1.0, max_iter=50, tol=1e-8):
+    """
+    L2-regularized logistic regression by Newton's method (the intercept is not
+    penalized). Returns (weights, intercept) for the raw, unstandardized X.
+    """
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0  # cột hằng số: weight về 0 nhờ L2
+    Xb = np.hstack([np.ones((len(X), 1)), (X - mean) / scale])
+    penalty = np.full(Xb.shape[1], float(l2))
+    penalty[0] = 0.0
+    w = np.zeros(Xb.shape[1])
+    w[0] = math.log(y.mean() / (1 - y.mean()))
+    for _ in range(max_iter):
+        p = _sigmoid(Xb @ w)
+        gradient = Xb.T @ (p - y) + penalty * w
+        hessian = (Xb.T * (p * (1 - p))) @ Xb + np.diag(penalty) + 1e-9 * np.eye(len(w))
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.abs(step).max() < tol:
+            break
+    weights = w[1:] / scale
+    return weights, float(w[0] - weights @ mean)
+
+
+def auc(y, p):
+    """ROC AUC via the rank-sum statistic (ties get their average rank)."""
+    positives = int(y.sum())
+    negatives = len(y) - positives
+    if not positives or not negatives:
+        return None
+    order = np.argsort(p, kind="mergesort")
+    ranks = np.empty(len(p))
+    sorted_p = p[order]
+    # hạng trung bình cho các giá trị bằng nhau
+    starts = np.flatnonzero(np.r_[True, sorted_p[1:] != sorted_p[:-1]])
+    ends = np.r_[starts[1:], len(p)]
+    for start, end in zip(starts, ends):
+        ranks[order[start:end]] = (start + end + 1) / 2
+    return float((ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def log_loss(y, p):
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return float(-(y * np.log(p) + (1 - y) * np.log(1 - p)).mean())
+
+
+def training_rows(loan_type):
+    """(feature rows, labels) of recorded outcomes for the loan type, oldest decision first."""
+    rows = (
+        LoanOutcome.objects.filter(application__loan_type=loan_type)
+        .order_by("decided_at", "id")
+        .values("approved", *(f"application__{name}" for name in FEATURE_FIELDS))
+    )
+    applications, labels = [], []
+    for row in rows.iterator(chunk_size=5000):
+        labels.append(float(row.pop("approved")))
+        applications.append({name.removeprefix("application__"): value for name, value in row.items()})
+    return applications, np.array(labels)
+
+
+def train(loan_type, l2=None, validation_share=None):
+    """Fit and save (inactive) a model for the loan type; returns the OutcomeModel."""
+    l2 = conf("l2") if l2 is None else l2
+    validation_share = conf("validation_share") if validation_share is None else validation_share
+    applications, y = training_rows(loan_type)
+    if len(y) < conf("min_outcomes"):
+        raise TrainingError(f"{len(y)} {loan_type} outcomes, need at least {conf('min_outcomes')}")
+    if y.min() == y.max():
+        raise TrainingError(f"every {loan_type} outcome is {'approved' if y[0] else 'rejected'}")
+    X = feature_matrix(applications)
+
+    # kiểm định trên các quyết định mới nhất, rồi fit lại trên toàn bộ dữ liệu
+    split = int(len(y) * (1 - validation_share))
+    report = {"outcomes": len(y), "approval_rate": round(float(y.mean()), 4)}
+    if 0 < split < len(y) and y[:split].min() != y[:split].max():
+        weights, intercept = fit(X[:split], y[:split], l2)
+        p = _sigmoid(X[split:] @ weights + intercept)
+        report.update(validation_size=len(y) - split, auc=auc(y[split:], p), log_loss=log_loss(y[split:], p))
+    weights, intercept = fit(X, y, l2)
+    report["train_log_loss"] = log_loss(y, _sigmoid(X @ weights + intercept))
+
+    params = {"features": list(FEATURES), "weights": [round(float(w), 10) for w in weights], "intercept": round(intercept, 10)}
+    digest = hashlib.sha256(json.dumps([loan_type, params], sort_keys=True).encode()).hexdigest()[:10]
+    model, _ = OutcomeModel.objects.update_or_create(
+        version=f"{loan_type}-{digest}",
+        defaults={"loan_type": loan_type, "params": params, "l2": l2, "metrics": report},
+    )
+    return model
+
+
+def activate(model):
+    with transaction.atomic():
+        OutcomeModel.objects.filter(loan_type=model.loan_type, active=True).exclude(pk=model.pk).update(active=False)
+        OutcomeModel.objects.filter(pk=model.pk).update(active=True, activated_at=timezone.now())
+    preload.invalidate("outcome_models")
+
+
+class Compiled:
+    """Active model of one loan type, ready for scoring."""
+
+    __slots__ = ("version", "weights", "intercept", "vector")
+
+    def __init__(self, model):
+        if model.params["features"] != list(FEATURES):
+            raise ValueError(f"outcome model {model.version} was trained on other features")
+        self.version = model.version
+        self.weights = list(model.params["weights"])
+        self.intercept = model.params["intercept"]
+        self.vector = np.array(self.weights)
+
+    def probability(self, application):
+        z = self.intercept + sum(w * x for w, x in zip(self.weights, features(application)))
+        return 1.0 / (1.0 + math.exp(-min(max(z, -35.0), 35.0)))
+
+    def probabilities(self, rows):
+        return _sigmoid(feature_matrix(rows) @ self.vector + self.intercept)
+
+
+def _load_active():
+    active = {}
+    for model in OutcomeModel.objects.filter(active=True):
+        try:
+            active[model.loan_type] = Compiled(model)
+        except ValueError:
+            pass  # model của bộ đặc trưng cũ: train lại
+    return active
+
+
+def _active_versions():
+    return tuple(OutcomeModel.objects.filter(active=True).order_by("version").values_list("version", flat=True))
+
+
+preload.register(
+    "outcome_models", _load_active, version=_active_versions, check_interval_s=conf("refresh_interval_s"),
+)
+
+
+def active(loan_type):
+    """Compiled active model for the loan type, or None."""
+    return preload.get("outcome_models").get(loan_type)
+
+
+def predict(application):
+    """{"approval_probability", "outcome_model_version"}; both None without an active model."""
+    model = active(_get(application, "loan_type"))
+    if model is None:
+        return {"approval_probability": None, "outcome_model_version": None}
+    return {"approval_probability": round(model.probability(application), 4), "outcome_model_version": model.version}
+
+
+def store(evaluation_ids, probabilities, version, batch_size=500):
+    """Write approval_probability / outcome_model_version onto existing evaluations (backfills)."""
+    quote = connection.ops.quote_name
+    table = quote(LoanEvaluation._meta.db_table)
+    pairs = list(zip(evaluation_ids, probabilities))
+    with connection.cursor() as cursor:
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            # một UPDATE ... CASE cho cả batch; bulk_update của ORM chậm hơn nhiều lần ở bước dựng biểu thức
+            cursor.execute(
+                f"UPDATE {table} SET {quote('approval_probability')} = CASE {quote('id')} "
+                + "WHEN %s THEN %s " * len(batch)
+                + f"END, {quote('outcome_model_version')} = %s "
+                + f"WHERE {quote('id')} IN ({', '.join(['%s'] * len(batch))})",
+                [value for pair in batch for value in pair] + [version] + [pk for pk, _ in batch],
+            )
+
+
+def predict_rows(rows):
+    """[{"approval_probability", "outcome_model_version"}] for values() rows with FEATURE_FIELDS, batched per loan type."""
+    results = [{"approval_probability": None, "outcome_model_version": None}] * len(rows)
+    by_type = {}
+    for i, row in enumerate(rows):
+        by_type.setdefault(row["loan_type"], []).append(i)
+    for loan_type, indexes in by_type.items():
+        model = active(loan_type)
+        if model is None:
+            continue
+        probabilities = model.probabilities([rows[i] for i in indexes]).round(4).tolist()
+        for i, probability in zip(indexes, probabilities):
+            results[i] = {"approval_probability": probability, "outcome_model_version": model.version}
+    return results
@@ -0,0 +1,247 @@
+"""
+Score percentiles ("better than X% of car-loan applicants") from mergeable
+histograms instead of ORDER BY / COUNT over LoanEvaluation.
+
+baseline_score is bounded to 0..100 and moves in whole points, so a fixed
+0.5-resolution histogram (201 bins) is an exact sketch: merging two workers is
+bin-wise addition, a re-score is -1 on the old bin and +1 on the new one, and a
+lookup is one prefix-sum read. Like the cohort rollups, every application
+counts once, under its latest evaluation.
+
+Apply-path writes are buffered per worker (after commit) and flushed into the
+ScoreSketch rows every `flush_every` writes or `flush_interval_s` seconds. Each
+worker reads the persisted rows at most every `refresh_interval_s` and adds
+its own unflushed writes.
+"""
+import atexit
+import logging
+import struct
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ScoreSketch
+from .rollups import iter_all
+
+logger = logging.getLogger(__name__)
+
+MAX_SCORE = 100
+RESOLUTION = 0.5
+BINS = int(MAX_SCORE / RESOLUTION) + 1
+_FORMAT = f"<{BINS}I"
+ALL = "all"
+
+
+def bin_of(score):
+    return min(max(int(round(float(score or 0) / RESOLUTION)), 0), BINS - 1)
+
+
+def pack(counts):
+    return struct.pack(_FORMAT, *counts)
+
+
+def unpack(blob):
+    if not blob:
+        return [0] * BINS
+    return list(struct.unpack(_FORMAT, bytes(blob)))
+
+
+def _get(obj, name):
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def segments(application):
+    """Sketch keys an application contributes to: its loan type overall and its CIC group."""
+    loan_type = _get(application, "loan_type")
+    return ((loan_type, ALL), (loan_type, f"cic{_get(application, 'cic_group')}"))
+
+
+class SketchDelta:
+    """Per-key bin deltas; `apply()` merges them into the ScoreSketch rows."""
+
+    def __init__(self):
+        self.bins = defaultdict(lambda: [0] * BINS)
+
+    def __bool__(self):
+        return any(any(counts) for counts in self.bins.values())
+
+    def add(self, application, evaluation, sign=1):
+        b = bin_of(_get(evaluation, "baseline_score"))
+        for key in segments(application):
+            self.bins[key][b] += sign
+
+    def move(self, application, evaluation, previous=None):
+        if previous is not None:
+            self.add(application, previous, sign=-1)
+        self.add(application, evaluation)
+
+    def merge(self, other):
+        for key, counts in other.bins.items():
+            mine = self.bins[key]
+            for i, n in enumerate(counts):
+                if n:
+                    mine[i] += n
+
+    def apply(self):
+        keys = sorted(k for k, counts in self.bins.items() if any(counts))
+        if not keys:
+            return
+        with transaction.atomic():
+            ScoreSketch.objects.bulk_create(
+                [ScoreSketch(loan_type=lt, segment=seg, counts=pack([0] * BINS)) for lt, seg in keys],
+                ignore_conflicts=True,
+            )
+            rows = {
+                (row.loan_type, row.segment): row
+                for row in ScoreSketch.objects.select_for_update().filter(
+                    loan_type__in={lt for lt, _ in keys}, segment__in={seg for _, seg in keys},
+                )
+            }
+            for key in keys:
+                row = rows[key]
+                counts = [max(0, a + b) for a, b in zip(unpack(row.counts), self.bins[key])]
+                row.counts = pack(counts)
+                row.total = sum(counts)
+                row.save(update_fields=["counts", "total", "updated_at"])
+
+
+class Percentiles:
+    """Lookup table for one key: percentile = share of applicants with a strictly lower score."""
+
+    __slots__ = ("below", "total")
+
+    def __init__(self, counts):
+        below, running = [], 0
+        for n in counts:
+            below.append(running)
+            running += n
+        self.below = below
+        self.total = running
+
+    def better_than(self, score):
+        if self.total <= 0:
+            return None
+        return round(100.0 * self.below[bin_of(score)] / self.total, 1)
+
+
+# --- per-worker state -------------------------------------------------------
+_lock = threading.Lock()
+_pending = SketchDelta()
+_pending_writes = 0
+_last_flush = time.monotonic()
+_persisted = {}  # key -> counts as read from ScoreSketch
+_persisted_at = 0.0
+_tables = {}  # key -> Percentiles(persisted + pending)
+
+
+def _conf(name):
+    return settings.SCORE_SKETCH[name]
+
+
+def _rebuild_tables():
+    keys = set(_persisted) | set(_pending.bins)
+    tables = {}
+    for key in keys:
+        counts = list(_persisted.get(key) or [0] * BINS)
+        for i, n in enumerate(_pending.bins.get(key) or ()):
+            counts[i] += n
+        tables[key] = Percentiles(counts)
+    return tables
+
+
+def _refresh():
+    global _persisted, _persisted_at, _tables
+    persisted = {(row.loan_type, row.segment): unpack(row.counts) for row in ScoreSketch.objects.all()}
+    with _lock:
+        _persisted = persisted
+        _persisted_at = time.monotonic()
+        _tables = _rebuild_tables()
+
+
+def flush():
+    """Write this worker's buffered deltas to ScoreSketch and reload the merged view."""
+    global _pending, _pending_writes, _last_flush
+    with _lock:
+        delta, _pending = _pending, SketchDelta()
+        _pending_writes = 0
+        _last_flush = time.monotonic()
+    if delta:
+        try:
+            delta.apply()
+        except Exception:
+            with _lock:  # giữ lại để lần flush sau ghi tiếp
+                delta.merge(_pending)
+                _pending = delta
+            raise
+    _refresh()
+
+
+def _buffer(application, evaluation, previous):
+    global _pending_writes, _tables
+    with _lock:
+        _pending.move(application, evaluation, previous)
+        _pending_writes += 1
+        _tables = _rebuild_tables()
+        due = (
+            _pending_writes >= _conf("flush_every")
+            or time.monotonic() - _last_flush >= _conf("flush_interval_s")
+        )
+    if due:
+        try:
+            flush()
+        except Exception as exc:
+            # chạy trong on_commit của request: hồ sơ đã commit, không được biến thành 500
+            # (retry sẽ tạo hồ sơ trùng). delta đã được giữ lại cho lần flush sau.
+            logger.warning("Score sketch flush failed, will retry: %s", exc)
+
+
+def record(application, evaluation, previous=None):
+    """Count `evaluation` (replacing `previous`) once the surrounding transaction commits."""
+    application = {"loan_type": _get(application, "loan_type"), "cic_group": _get(application, "cic_group")}
+    evaluation = {"baseline_score": _get(evaluation, "baseline_score")}
+    if previous is not None:
+        previous = {"baseline_score": _get(previous, "baseline_score")}
+    transaction.on_commit(lambda: _buffer(application, evaluation, previous))
+
+
+def percentile(loan_type, cic_group, score):
+    """{"score_percentile": vs all applicants of the loan type, "segment_percentile": vs same CIC group}."""
+    if time.monotonic() - _persisted_at >= _conf("refresh_interval_s"):
+        _refresh()
+    tables = _tables
+    overall = tables.get((loan_type, ALL))
+    segment = tables.get((loan_type, f"cic{cic_group}"))
+    return {
+        "score_percentile": overall.better_than(score) if overall else None,
+        "segment_percentile": segment.better_than(score) if segment else None,
+    }
+
+
+def rebuild(chunk_size=5000):
+    """Recompute every ScoreSketch from the latest evaluation of each application."""
+    delta = SketchDelta()
+    for chunk in iter_all(chunk_size):
+        for application, evaluation in chunk:
+            delta.add(application, evaluation)
+    with transaction.atomic():
+        ScoreSketch.objects.all().delete()
+        ScoreSketch.objects.bulk_create(
+            [
+                ScoreSketch(loan_type=lt, segment=seg, counts=pack(counts), total=sum(counts))
+                for (lt, seg), counts in sorted(delta.bins.items())
+            ]
+        )
+    _refresh()
+    return len(delta.bins)
+
+
+@atexit.register
+def _flush_at_exit():
+    if _pending_writes:
+        try:
+            flush()
+        except Exception:  # DB có thể đã đóng khi process thoát; rebuild_rollups sửa lại
+            pass
@@ -0,0 +1,205 @@
+"""
+Retention: move old rows out of the hot tables into compact archive tables.
+
+Policies are per table, in whole months (settings.RETENTION_POLICIES):
+
+    "user_profile.LoanApplication"  applications created before the cutoff, with
+                                    all their evaluations -> ArchivedApplication
+    "user_profile.LoanEvaluation"   evaluations created before the cutoff that a
+                                    newer evaluation of the same (live) application
+                                    replaced -> ArchivedEvaluation
+
+Each archive row keeps the original id and a zlib-compressed JSON payload of
+the original record(s), so archived data stays retrievable by id
+(`get_application`). CohortRollup / KnockoutRollup / ScoreSketch are not
+touched: archived applications keep counting there, and `rollups.rebuild()`
+reads ArchivedApplication too.
+
+Work is done in short keyset batches: each batch locks only its own rows
+(skip_locked, so rows a request is using are left for the next run), copies
+and deletes them in one transaction, then the command pauses before the next.
+Applications with uploaded documents are not archived (their files and
+extraction facts hang off the live row), nor are applications with a recorded
+bank decision: LoanOutcome rows are the training labels of outcome_model.py
+and would be cascade-deleted with the application.
+"""
+import json
+import time
+import zlib
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from .batching import keyset_chunks
+from .models import ArchivedApplication, ArchivedEvaluation, LoanApplication, LoanEvaluation, LoanOutcome
+
+APPLICATIONS = "user_profile.LoanApplication"
+EVALUATIONS = "user_profile.LoanEvaluation"
+
+DEFAULTS = {"batch_size": 500, "pause_ms": 100}
+
+
+def policy(name):
+    return {**DEFAULTS, **settings.RETENTION_POLICIES[name]}
+
+
+def cutoff(keep_months, today=None):
+    """Start of the month `keep_months` before the current one: whole months are archived."""
+    today = today or timezone.localdate()
+    months = today.year * 12 + today.month - 1 - keep_months
+    first = date(months // 12, months % 12 + 1, 1)
+    return timezone.make_aware(datetime(first.year, first.month, first.day))
+
+
+def pack(data):
+    return zlib.compress(json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")).encode(), 6)
+
+
+def unpack(payload):
+    return json.loads(zlib.decompress(bytes(payload)))
+
+
+def _record(instance):
+    data = model_to_dict(instance)
+    data["id"] = instance.pk
+    for field in instance._meta.concrete_fields:
+        if field.is_relation:
+            data[field.attname] = getattr(instance, field.attname)
+            data.pop(field.name, None)
+        elif not field.editable:
+            data[field.name] = getattr(instance, field.attname)
+    return data
+
+
+def _latest(evaluations):
+    return max(evaluations, key=lambda e: (e.created_at, e.pk)) if evaluations else None
+
+
+def _archivable():
+    """Filters for applications nothing else hangs off (documents, uploads, bank outcome)."""
+    from Documents.models import Document, UploadSession
+
+    return (
+        ~Exists(Document.objects.filter(application=OuterRef("pk"))),
+        ~Exists(UploadSession.objects.filter(application=OuterRef("pk"))),
+        ~Exists(LoanOutcome.objects.filter(application=OuterRef("pk"))),
+    )
+
+
+def application_candidates(before):
+    return LoanApplication.objects.filter(created_at__lt=before).filter(*_archivable())
+
+
+def evaluation_candidates(before):
+    newer = LoanEvaluation.objects.filter(application=OuterRef("application")).filter(
+        Q(created_at__gt=OuterRef("created_at")) | Q(created_at=OuterRef("created_at"), id__gt=OuterRef("id"))
+    )
+    return LoanEvaluation.objects.filter(created_at__lt=before).filter(Exists(newer))
+
+
+def archive_applications(ids):
+    """Archive the given applications (still matching the policy) and their evaluations."""
+    with transaction.atomic():
+        applications = list(
+            LoanApplication.objects.filter(pk__in=ids)
+            .filter(*_archivable())  # document / upload / outcome tạo sau lúc chọn batch
+            .select_for_update(skip_locked=True)
+        )
+        if not applications:
+            return 0
+        by_app = {}
+        for evaluation in LoanEvaluation.objects.filter(application__in=applications).order_by("id"):
+            by_app.setdefault(evaluation.application_id, []).append(evaluation)
+        rows = []
+        for app in applications:
+            evaluations = by_app.get(app.pk, [])
+            latest = _latest(evaluations)
+            rows.append(ArchivedApplication(
+                id=app.pk,
+                user_id=app.user_id,
+                loan_type=app.loan_type,
+                cic_group=app.cic_group,
+                monthly_income=app.monthly_income,
+                monthly_debt_payments=app.monthly_debt_payments,
+                created_at=app.created_at,
+                latest_score=latest.baseline_score if latest else None,
+                latest_eligible=latest.eligible if latest else None,
+                latest_knockout_reasons=latest.knockout_reasons if latest else None,
+                payload=pack({"application": _record(app), "evaluations": [_record(e) for e in evaluations]}),
+            ))
+        ArchivedApplication.objects.bulk_create(rows)
+        app_ids = [app.pk for app in applications]
+        LoanEvaluation.objects.filter(application_id__in=app_ids).delete()
+        LoanApplication.objects.filter(pk__in=app_ids).delete()
+    return len(rows)
+
+
+def archive_evaluations(ids):
+    """Archive the given superseded evaluations."""
+    with transaction.atomic():
+        evaluations = list(LoanEvaluation.objects.filter(pk__in=ids).select_for_update(skip_locked=True))
+        if not evaluations:
+            return 0
+        ArchivedEvaluation.objects.bulk_create([
+            ArchivedEvaluation(
+                id=e.pk, application_id=e.application_id, created_at=e.created_at, payload=pack(_record(e)),
+            )
+            for e in evaluations
+        ])
+        LoanEvaluation.objects.filter(pk__in=[e.pk for e in evaluations]).delete()
+    return len(evaluations)
+
+
+POLICIES = {
+    APPLICATIONS: (application_candidates, archive_applications),
+    EVALUATIONS: (evaluation_candidates, archive_evaluations),
+}
+
+
+def run(name, max_batches=None, dry_run=False, progress=None):
+    """Apply one policy in throttled batches. Returns (rows archived or matched, batches)."""
+    conf = policy(name)
+    candidates, archive = POLICIES[name]
+    queryset = candidates(cutoff(conf["keep_months"])).values("id")
+    if dry_run:
+        return queryset.count(), 0
+    done = batches = 0
+    for chunk in keyset_chunks(queryset, conf["batch_size"]):
+        done += archive([row["id"] for row in chunk])
+        batches += 1
+        if progress:
+            progress(name, done, batches)
+        if max_batches and batches >= max_batches:
+            break
+        time.sleep(conf["pause_ms"] / 1000)  # nhường IO / lock cho request thật
+    return done, batches
+
+
+def get_application(application_id):
+    """
+    {"application", "evaluations", "archived"} for a live or archived application,
+    evaluations oldest first including archived superseded ones; None if unknown.
+    """
+    app = LoanApplication.objects.filter(pk=application_id).first()
+    if app is not None:
+        # cùng dạng JSON với payload archive
+        data = json.loads(json.dumps(
+            {"application": _record(app), "evaluations": [_record(e) for e in app.evaluations.order_by("id")]},
+            cls=DjangoJSONEncoder,
+        ))
+        data["archived"] = False
+    else:
+        row = ArchivedApplication.objects.filter(pk=application_id).first()
+        if row is None:
+            return None
+        data = unpack(row.payload)
+        data["archived"] = True
+        data["archived_at"] = row.archived_at
+    superseded = [unpack(row.payload) for row in ArchivedEvaluation.objects.filter(application_id=application_id)]
+    data["evaluations"] = sorted(superseded + data["evaluations"], key=lambda e: e["id"])
+    return data
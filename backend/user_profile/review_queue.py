@@ -0,0 +1,178 @@
+"""
+Review queue for bank officers: applications with their latest evaluation.
+
+The latest evaluation's score / eligibility are denormalized onto
+LoanApplication (latest_evaluation, latest_score, latest_eligible), kept up to
+date by the apply serializer and `rescore`. So a queue page is a single
+indexed range scan on LoanApplication, never a GROUP BY over LoanEvaluation:
+
+    loan_type = ? AND latest_eligible = ? AND latest_score BETWEEN ? AND ?
+    ORDER BY latest_score DESC, id DESC LIMIT n      -> queue_type_elig_score
+
+Pages use keyset pagination: the cursor carries the last row's (sort value,
+id), so page 1000 costs the same as page 1.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import LoanApplication, LoanEvaluation, LoanType
+
+# sort param -> (field, descending)
+SORTS = {
+    "-score": ("latest_score", True),
+    "score": ("latest_score", False),
+    "-created_at": ("created_at", True),
+    "created_at": ("created_at", False),
+}
+DEFAULT_SORT = "-created_at"
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+FIELDS = (
+    "id", "user_id", "user__email", "user__full_name", "loan_type", "loan_amount", "monthly_income",
+    "cic_group", "dti", "ltv", "created_at", "latest_evaluation_id", "latest_score", "latest_eligible",
+    "latest_evaluation__knockout_reasons", "latest_evaluation__config_version",
+    "latest_evaluation__approval_probability", "intake_flags",
+)
+
+
+class QueueError(ValueError):
+    pass
+
+
+def refresh_latest(application_ids):
+    """Copy the latest evaluation of each application onto it (after bulk writes)."""
+    latest = LoanEvaluation.objects.filter(application=OuterRef("pk")).order_by("-created_at", "-id")
+    LoanApplication.objects.filter(id__in=application_ids).update(
+        latest_evaluation_id=Subquery(latest.values("id")[:1]),
+        latest_score=Subquery(latest.values("baseline_score")[:1]),
+        latest_eligible=Subquery(latest.values("eligible")[:1]),
+    )
+
+
+def encode_cursor(sort, row):
+    field, _ = SORTS[sort]
+    value = row[field]
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, last_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise QueueError("invalid cursor")
+    if cursor_sort != sort:
+        raise QueueError("cursor was issued for a different sort")
+    # cursor do client gửi lại: kiểm tra kiểu từng giá trị, không để lỗi thành 500
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise QueueError("invalid cursor")
+    if SORTS[sort][0] == "created_at":
+        try:
+            value = parse_datetime(value) if isinstance(value, str) else None
+        except ValueError:  # đúng dạng nhưng sai ngày giờ, vd. 2025-02-30
+            value = None
+        if value is None:
+            raise QueueError("invalid cursor")
+    elif not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise QueueError("invalid cursor")
+    return value, last_id
+
+
+def _bool(name, raw):
+    if raw in ("true", "1"):
+        return True
+    if raw in ("false", "0"):
+        return False
+    raise QueueError(f"{name} must be true or false")
+
+
+def _number(name, raw, cast=float):
+    try:
+        return cast(raw)
+    except (TypeError, ValueError):
+        raise QueueError(f"{name} must be a number")
+
+
+def _date(name, raw):
+    try:
+        return datetime.strptime(raw, "%Y-%m-%d").date()
+    except ValueError:
+        raise QueueError(f"{name} must be YYYY-MM-DD")
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime(day.year, day.month, day.day))
+
+
+def build_queryset(params):
+    """Filtered, ordered queryset for the query params (raises QueueError)."""
+    queryset = LoanApplication.objects.filter(latest_score__isnull=False)
+    loan_type = params.get("loan_type")
+    if loan_type:
+        if loan_type not in LoanType.values:
+            raise QueueError(f"loan_type must be one of {LoanType.values}")
+        queryset = queryset.filter(loan_type=loan_type)
+    if params.get("eligible"):
+        # __in thay vì =: SQLite render "latest_eligible = True" thành cột trần, không dùng được index
+        queryset = queryset.filter(latest_eligible__in=[_bool("eligible", params["eligible"])])
+    if params.get("flagged"):
+        queryset = queryset.filter(intake_flags__isnull=not _bool("flagged", params["flagged"]))
+    if params.get("cic_group"):
+        queryset = queryset.filter(cic_group=_number("cic_group", params["cic_group"], int))
+    if params.get("score_min"):
+        queryset = queryset.filter(latest_score__gte=_number("score_min", params["score_min"]))
+    if params.get("score_max"):
+        queryset = queryset.filter(latest_score__lte=_number("score_max", params["score_max"]))
+    # khoảng datetime thay vì created_at__date để vẫn dùng được index
+    if params.get("created_from"):
+        queryset = queryset.filter(created_at__gte=_day_start(_date("created_from", params["created_from"])))
+    if params.get("created_to"):
+        queryset = queryset.filter(created_at__lt=_day_start(_date("created_to", params["created_to"]) + timedelta(days=1)))
+    return queryset
+
+
+def ordering(sort):
+    field, descending = SORTS[sort]
+    return (f"-{field}", "-id") if descending else (field, "id")
+
+
+def page(params):
+    """{"results", "next_cursor"} for one queue page."""
+    sort = params.get("sort") or DEFAULT_SORT
+    if sort not in SORTS:
+        raise QueueError(f"sort must be one of {list(SORTS)}")
+    limit = _number("limit", params.get("limit") or DEFAULT_LIMIT, int)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise QueueError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    field, descending = SORTS[sort]
+    queryset = build_queryset(params)
+    if params.get("cursor"):
+        value, last_id = decode_cursor(params["cursor"], sort)
+        # (field, id) < (value, last_id); vế đầu là điều kiện range để index bắt đầu quét từ cursor
+        op = "lt" if descending else "gt"
+        queryset = queryset.filter(
+            Q(**{f"{field}__{op}e": value}),
+            Q(**{f"{field}__{op}": value}) | Q(**{f"id__{op}": last_id}),
+        )
+    rows = list(queryset.order_by(*ordering(sort)).values(*FIELDS)[: limit + 1])
+
+    next_cursor = encode_cursor(sort, rows[limit - 1]) if len(rows) > limit else None
+    results = []
+    for row in rows[:limit]:
+        row["user_email"] = row.pop("user__email")
+        row["user_full_name"] = row.pop("user__full_name")
+        row["knockout_reasons"] = row.pop("latest_evaluation__knockout_reasons") or []
+        row["config_version"] = row.pop("latest_evaluation__config_version")
+        row["approval_probability"] = row.pop("latest_evaluation__approval_probability")
+        results.append(row)
+    return {"results": results, "next_cursor": next_cursor}
@@ -0,0 +1,246 @@
+"""
+Incremental cohort rollups for approval analytics.
+
+Every application counts once, under its latest LoanEvaluation, in the cohort
+(month, loan_type, cic_group, dti_band). A new evaluation moves the
+application's contribution from its previous evaluation to the new one, so
+CohortRollup / KnockoutRollup always equal a GROUP BY over the latest
+evaluations, and reads never touch LoanEvaluation.
+
+`rebuild()` recomputes both tables from scratch (after deleting applications,
+changing the bands, or on first deploy), from live applications and those
+moved to ArchivedApplication by user_profile/retention.py.
+"""
+from collections import defaultdict
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .base_line_scoring import compute_dti
+from .batching import keyset_chunks
+from .models import ArchivedApplication, CohortRollup, KnockoutRollup, LoanApplication, LoanEvaluation
+
+# upper bound (DTI as a ratio) -> label; everything above the last bound is ">50"
+DTI_BANDS = ((0.20, "<20"), (0.36, "20-36"), (0.43, "36-43"), (0.50, "43-50"))
+DTI_UNKNOWN = "unknown"
+DIMENSIONS = ("month", "loan_type", "cic_group", "dti_band")
+
+# LoanApplication columns needed to place an application in its cohort
+APPLICATION_FIELDS = ("id", "created_at", "loan_type", "cic_group", "monthly_income", "monthly_debt_payments")
+EVALUATION_FIELDS = ("id", "application_id", "eligible", "baseline_score", "knockout_reasons")
+
+
+def dti_band(dti):
+    if dti is None:
+        return DTI_UNKNOWN
+    for bound, label in DTI_BANDS:
+        if dti < bound:
+            return label
+    return ">50"
+
+
+def month_of(value):
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date().replace(day=1)
+
+
+def _get(obj, name):
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def cohort_key(application):
+    """(month, loan_type, cic_group, dti_band) for a LoanApplication or a values() row."""
+    dti = compute_dti(_get(application, "monthly_debt_payments"), _get(application, "monthly_income"))
+    return (
+        month_of(_get(application, "created_at")),
+        _get(application, "loan_type"),
+        _get(application, "cic_group"),
+        dti_band(dti),
+    )
+
+
+class RollupDelta:
+    """Accumulates +/- contributions in memory and writes them with F() updates."""
+
+    def __init__(self):
+        self.cohorts = defaultdict(lambda: [0, 0, 0.0])  # key -> [applications, eligible, score_sum]
+        self.knockouts = defaultdict(int)  # key + (reason,) -> count
+
+    def add(self, key, evaluation, sign=1):
+        row = self.cohorts[key]
+        row[0] += sign
+        row[1] += sign if _get(evaluation, "eligible") else 0
+        row[2] += sign * float(_get(evaluation, "baseline_score") or 0)
+        for reason in set(_get(evaluation, "knockout_reasons") or ()):
+            self.knockouts[key + (str(reason)[:255],)] += sign
+
+    def move(self, application, evaluation, previous=None):
+        key = cohort_key(application)
+        if previous is not None:
+            self.add(key, previous, sign=-1)
+        self.add(key, evaluation)
+
+    def apply(self):
+        cohorts = {k: v for k, v in self.cohorts.items() if v[0] or v[1] or v[2]}
+        knockouts = {k: v for k, v in self.knockouts.items() if v}
+        if not cohorts and not knockouts:
+            return
+        with transaction.atomic():
+            # tạo dòng còn thiếu rồi cộng bằng F(), thứ tự key cố định để tránh deadlock
+            CohortRollup.objects.bulk_create(
+                [CohortRollup(**dict(zip(DIMENSIONS, key))) for key in sorted(cohorts)],
+                ignore_conflicts=True,
+            )
+            for key in sorted(cohorts):
+                applications, eligible, score_sum = cohorts[key]
+                CohortRollup.objects.filter(**dict(zip(DIMENSIONS, key))).update(
+                    applications=F("applications") + applications,
+                    eligible=F("eligible") + eligible,
+                    score_sum=F("score_sum") + score_sum,
+                )
+            KnockoutRollup.objects.bulk_create(
+                [KnockoutRollup(**dict(zip(DIMENSIONS + ("reason",), key))) for key in sorted(knockouts)],
+                ignore_conflicts=True,
+            )
+            for key in sorted(knockouts):
+                KnockoutRollup.objects.filter(**dict(zip(DIMENSIONS + ("reason",), key))).update(
+                    count=F("count") + knockouts[key],
+                )
+
+
+def record(application, evaluation, previous=None):
+    """Account for `evaluation` replacing `previous` (None for a new application)."""
+    delta = RollupDelta()
+    delta.move(application, evaluation, previous)
+    delta.apply()
+
+
+def latest_evaluations(application_ids):
+    """{application_id: values() row of its latest LoanEvaluation} for the given ids."""
+    latest = {}
+    rows = (
+        LoanEvaluation.objects.filter(application_id__in=application_ids)
+        .order_by("application_id", "-created_at", "-id")
+        .values(*EVALUATION_FIELDS)
+    )
+    for row in rows:
+        latest.setdefault(row["application_id"], row)
+    return latest
+
+
+def iter_latest(chunk_size=5000):
+    """Yield chunks of (application row, latest evaluation row) for every scored application."""
+    # latest_evaluation được giữ cập nhật bởi apply / rescore (review_queue.refresh_latest)
+    rows = (
+        LoanApplication.objects.filter(latest_evaluation__isnull=False)
+        .values(*APPLICATION_FIELDS, "latest_evaluation_id")
+    )
+    for chunk in keyset_chunks(rows, chunk_size):
+        evaluations = {
+            evaluation["id"]: evaluation
+            for evaluation in LoanEvaluation.objects.filter(
+                id__in=[row["latest_evaluation_id"] for row in chunk]
+            ).values(*EVALUATION_FIELDS)
+        }
+        yield [(row, evaluations[row["latest_evaluation_id"]]) for row in chunk]
+
+
+def iter_archived(chunk_size=5000):
+    """Same shape as iter_latest for scored applications in ArchivedApplication."""
+    rows = ArchivedApplication.objects.filter(latest_score__isnull=False).values(
+        *APPLICATION_FIELDS, "latest_score", "latest_eligible", "latest_knockout_reasons",
+    )
+    for chunk in keyset_chunks(rows, chunk_size):
+        yield [
+            (
+                row,
+                {
+                    "application_id": row["id"],
+                    "baseline_score": row["latest_score"],
+                    "eligible": row["latest_eligible"],
+                    "knockout_reasons": row["latest_knockout_reasons"],
+                },
+            )
+            for row in chunk
+        ]
+
+
+def iter_all(chunk_size=5000):
+    """iter_latest + iter_archived: every application that ever counted in the rollups."""
+    return chain(iter_latest(chunk_size), iter_archived(chunk_size))
+
+
+def rebuild(chunk_size=5000):
+    """Recompute both rollup tables from the latest evaluation of every application."""
+    delta = RollupDelta()
+    applications = 0
+    for chunk in iter_all(chunk_size):
+        for application, evaluation in chunk:
+            delta.add(cohort_key(application), evaluation)
+        applications += len(chunk)
+
+    with transaction.atomic():
+        CohortRollup.objects.all().delete()
+        KnockoutRollup.objects.all().delete()
+        CohortRollup.objects.bulk_create(
+            [
+                CohortRollup(**dict(zip(DIMENSIONS, key)), applications=n, eligible=ok, score_sum=total)
+                for key, (n, ok, total) in sorted(delta.cohorts.items())
+            ],
+            batch_size=1000,
+        )
+        KnockoutRollup.objects.bulk_create(
+            [
+                KnockoutRollup(**dict(zip(DIMENSIONS + ("reason",), key)), count=count)
+                for key, count in sorted(delta.knockouts.items())
+            ],
+            batch_size=1000,
+        )
+    return {"applications": applications, "cohorts": len(delta.cohorts), "knockouts": len(delta.knockouts)}
+
+
+def cohort_stats(group_by=(), **filters):
+    """
+    Approval rate, average baseline_score and knockout-reason frequencies per
+    group, read only from the rollup tables. `filters` are CohortRollup lookups
+    (month__gte, loan_type, cic_group, dti_band, ...). An empty group_by gives
+    one overall row.
+    """
+    group_by = tuple(group_by)
+    totals = {"n": Sum("applications"), "ok": Sum("eligible"), "total": Sum("score_sum")}
+    cohorts = CohortRollup.objects.filter(**filters)
+    if group_by:
+        groups = cohorts.values(*group_by).annotate(**totals).order_by(*group_by)
+    else:
+        # .values() không có field sẽ group theo mọi cột => aggregate() cho một dòng tổng
+        groups = [cohorts.aggregate(**totals)]
+    reasons = defaultdict(list)
+    for row in (
+        KnockoutRollup.objects.filter(**filters)
+        .values(*group_by, "reason")
+        .annotate(n=Sum("count"))
+        .filter(n__gt=0)
+    ):
+        reasons[tuple(row[d] for d in group_by)].append((row["reason"], row["n"]))
+
+    results = []
+    for row in groups:
+        if not row["n"]:
+            continue
+        key = tuple(row[d] for d in group_by)
+        out = {d: (row[d].strftime("%Y-%m") if d == "month" else row[d]) for d in group_by}
+        out.update(
+            applications=row["n"],
+            eligible=row["ok"],
+            approval_rate=round(row["ok"] / row["n"], 4),
+            avg_baseline_score=round(row["total"] / row["n"], 2),
+            knockout_reasons=[
+                {"reason": reason, "count": n, "rate": round(n / row["n"], 4)}
+                for reason, n in sorted(reasons[key], key=lambda item: -item[1])
+            ],
+        )
+        results.append(out)
+    return results
@@ -1,12 +1,16 @@
 from rest_framework import serializers
-from .models import LoanApplication, LoanEvaluation
-from . import base_line_scoring
+from backend import tracing
+from backend.fast_serializers import ValuesReader
+from Banks.models import Bank
+from .models import LoanApplication, LoanEvaluation, LoanOutcome
+from . import base_line_scoring, outcome_model, percentiles, rollups
 from django.db import transaction
 
 class LoanApplicationSerializer(serializers.ModelSerializer):
     class Meta:
         model = LoanApplication
-        exclude = ('dti', 'ltv', 'created_at')  # dti/ltv computed server-side
+        # dti/ltv computed server-side; intake_flags chỉ cho staff (review queue), view truyền qua save()
+        exclude = ('dti', 'ltv', 'created_at', 'intake_flags')
         read_only_fields = ("user",)
 
     def validate(self, data):
@@ -24,30 +28,44 @@ class LoanApplicationSerializer(serializers.ModelSerializer):
             validated_data["user"] = request.user   
               
         with transaction.atomic():
-            app = LoanApplication.objects.create(**validated_data)
+            with tracing.span("apply.insert_application"):
+                app = LoanApplication.objects.create(**validated_data)
 
             # compute dti and ltv and save
-            dti_val = base_line_scoring.compute_dti(app.monthly_debt_payments, app.monthly_income)
-            app.dti = dti_val
-            if app.loan_type == 'car' and app.vehicle_value:
-                app.ltv = base_line_scoring.compute_ltv(app.loan_amount, app.vehicle_value)
-            elif app.loan_type == 'real_estate' and app.property_value:
-                app.ltv = base_line_scoring.compute_ltv(app.loan_amount, app.property_value)
-            app.save() # bước quan trọng để lưu dti/ltv vào DB
+            with tracing.span("apply.compute_ratios"):
+                dti_val = base_line_scoring.compute_dti(app.monthly_debt_payments, app.monthly_income)
+                app.dti = dti_val
+                if app.loan_type == 'car' and app.vehicle_value:
+                    app.ltv = base_line_scoring.compute_ltv(app.loan_amount, app.vehicle_value)
+                elif app.loan_type == 'real_estate' and app.property_value:
+                    app.ltv = base_line_scoring.compute_ltv(app.loan_amount, app.property_value)
+            with tracing.span("apply.update_application"):
+                app.save() # bước quan trọng để lưu dti/ltv vào DB
 
             # evaluate baseline
-            if app.loan_type == 'car':
-                result = base_line_scoring.evaluate_car(app)
-            else:
-                result = base_line_scoring.evaluate_real_estate(app)
-
-            evaluation = LoanEvaluation.objects.create(
-                application=app,
-                baseline_score=result['baseline_score'],
-                eligible=result['eligible'],
-                knockout_reasons=result.get('knockout_reasons', []),
-                score_breakdown=result.get('breakdown', {})
-            )
+            with tracing.span("apply.score", loan_type=app.loan_type):
+                result = base_line_scoring.evaluate(app)
+            # chạy song song với baseline: xác suất duyệt theo model học từ LoanOutcome
+            with tracing.span("apply.outcome_model"):
+                prediction = outcome_model.predict(app)
+
+            with tracing.span("apply.insert_evaluation"):
+                evaluation = LoanEvaluation.objects.create(
+                    application=app,
+                    baseline_score=result['baseline_score'],
+                    eligible=result['eligible'],
+                    knockout_reasons=result.get('knockout_reasons', []),
+                    score_breakdown=result.get('breakdown', {}),
+                    config_version=base_line_scoring.CONFIG_VERSION,
+                    **prediction,
+                )
+            with tracing.span("apply.denormalize"):
+                app.latest_evaluation = evaluation  # cho review queue, xem review_queue.py
+                app.latest_score = evaluation.baseline_score
+                app.latest_eligible = evaluation.eligible
+                app.save(update_fields=["latest_evaluation", "latest_score", "latest_eligible"])
+                rollups.record(app, evaluation)  # cập nhật bảng cohort trong cùng transaction
+                percentiles.record(app, evaluation)  # sketch percentile, sau khi commit
 
             # prepare response payload in serializer/ Để dùng sau
             self._last_evaluation = evaluation
@@ -58,3 +76,15 @@ class LoanEvaluationSerializer(serializers.ModelSerializer):
         model = LoanEvaluation
         fields = "__all__" # Bao gồm tất cả các trường khai báo
         # class này không có logic validate hay create đặc biệt nào => chỉ dùng để serialize dữ liệu từ DB ra JSON cho frontend thôi
+
+class LoanOutcomeSerializer(serializers.ModelSerializer):
+    # ngân hàng ra quyết định, theo Bank.code
+    bank = serializers.SlugRelatedField(slug_field="code", queryset=Bank.objects.all(), required=False, allow_null=True)
+
+    class Meta:
+        model = LoanOutcome
+        fields = ("application", "approved", "bank", "decided_at", "recorded_by", "created_at")
+        read_only_fields = ("application", "recorded_by", "created_at")
+
+# đường đọc nhanh cho GET, output giống hệt LoanEvaluationSerializer
+loan_evaluation_reader = ValuesReader(LoanEvaluationSerializer)
@@ -0,0 +1,183 @@
+"""
+Synthetic applicants for load tests, benchmarks and index builds.
+
+Every applicant gets a latent credit quality z ~ N(0, 1) and all features are
+drawn conditionally on it, so they correlate the way real files do: higher z
+means higher income, a better CIC group, a lower debt ratio, a longer credit
+history and a bigger down payment. Collateral is a multiple of income (cars
+~25x monthly income, real estate ~110x), the loan is collateral minus down
+payment. Knockouts (CIC >= 3/4, DTI, down payment) therefore appear at
+realistic rates instead of uniformly.
+
+Rows are generated in blocks of BLOCK rows, block b of a table from
+numpy.random.default_rng([seed, stream, b]): the same seed gives the same
+data whatever the batch size, and adding users does not change applications.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from . import base_line_scoring
+
+BLOCK = 10_000
+APPLICATIONS, USERS, CATALOG = 0, 1, 2  # stream id của từng bảng
+
+CAR_SHARE = 0.65
+INCOME_MEDIAN = 18_000_000
+CIC_CUTS = (1.0, 1.6, 2.1, 2.5)  # ~84% / 10% / 4% / 1% / 0.6% cho nhóm 1..5
+EMPLOYMENT_TYPES = ("permanent", "contract", "part-time", "self-employed")
+EMPLOYMENT_WEIGHTS = (0.72, 0.16, 0.05, 0.07)
+
+_SURNAMES = ("Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ")
+_MIDDLE = ("Văn", "Thị", "Minh", "Thu", "Đức", "Ngọc", "Hoài", "Quốc", "Thanh", "Gia")
+_GIVEN = ("An", "Bình", "Châu", "Dũng", "Giang", "Hà", "Hải", "Hùng", "Khoa", "Lan", "Linh", "Long",
+          "Mai", "Nam", "Phúc", "Quân", "Sơn", "Tâm", "Thảo", "Trang", "Tuấn", "Việt", "Vy", "Yến")
+
+
+def block_rng(seed, stream, block=0):
+    return np.random.default_rng([seed, stream, block])
+
+
+def _correlated(rng, z, rho):
+    return rho * z + np.sqrt(1 - rho * rho) * rng.standard_normal(len(z))
+
+
+def _round_to(values, unit):
+    return (np.round(values / unit) * unit).astype(np.int64)
+
+
+def sample_applications(rng, n):
+    """Dict of NumPy columns named like LoanApplication fields (amounts in whole VND)."""
+    z = rng.standard_normal(n)
+    car = rng.random(n) < CAR_SHARE
+
+    income = _round_to(np.clip(INCOME_MEDIAN * np.exp(0.55 * _correlated(rng, z, 0.45)), 5e6, 1e9), 100_000)
+    cic_group = 1 + np.searchsorted(CIC_CUTS, -_correlated(rng, z, 0.7))
+    debt_ratio = np.clip(rng.beta(2, 6, n) * np.exp(-0.3 * z), 0, 0.95)
+    debt = _round_to(income * debt_ratio, 100_000)
+
+    collateral = np.where(
+        car,
+        np.clip(_round_to(income * 25 * np.exp(0.45 * rng.standard_normal(n) + 0.1 * z), 1_000_000), 150e6, 6e9),
+        np.clip(_round_to(income * 110 * np.exp(0.5 * rng.standard_normal(n) + 0.1 * z), 10_000_000), 500e6, 50e9),
+    ).astype(np.int64)
+    down_pct = np.clip(rng.beta(4, 8, n) + 0.05 * z, 0.0, 0.9)
+    down = _round_to(collateral * down_pct, 1_000_000)
+    loan = collateral - down
+
+    employment = rng.choice(len(EMPLOYMENT_TYPES), n, p=EMPLOYMENT_WEIGHTS)
+    return {
+        "z": z,
+        "car": car,
+        "monthly_income": income,
+        "monthly_debt_payments": debt,
+        "cic_group": cic_group,
+        "credit_history_months": np.clip(np.round(rng.gamma(2, 20, n) * np.exp(0.2 * z)), 0, 480).astype(np.int64),
+        "credit_utilization_pct": np.round(np.clip(rng.beta(2, 4, n) * 100 * np.exp(-0.3 * z), 0, 100), 1),
+        "num_late_payments_24m": np.minimum(rng.poisson(0.15 * cic_group ** 2), 24),
+        "num_new_inquiries_6m": rng.poisson(0.8 * np.exp(-0.3 * z)),
+        "credit_mix_types": 1 + rng.binomial(4, 1 / (1 + np.exp(0.5 - 0.5 * z))),
+        "loan_amount": loan,
+        "down_payment": down,
+        "collateral": collateral,
+        "employment_type": employment,
+        "employment_duration_months": np.clip(np.round(rng.gamma(1.6, 22, n) * np.exp(0.15 * z)), 0, 480).astype(np.int64),
+        "bank_transfer": rng.random(n) < 0.75 + 0.1 * np.tanh(z),
+        "dti": np.round(debt / income, 4),
+        "ltv": np.round(loan / collateral, 4),
+    }
+
+
+def application_rows(columns):
+    """Plain dicts with base_line_scoring.SCORING_FIELDS (minus id) + dti / ltv, Python types."""
+    car = columns["car"].tolist()
+    collateral = columns["collateral"].tolist()
+    employment = [EMPLOYMENT_TYPES[i] for i in columns["employment_type"].tolist()]
+    salary = ["bank_transfer" if flag else "cash" for flag in columns["bank_transfer"].tolist()]
+    plain = {
+        name: columns[name].tolist()
+        for name in (
+            "monthly_income", "monthly_debt_payments", "cic_group", "credit_history_months",
+            "credit_utilization_pct", "num_late_payments_24m", "num_new_inquiries_6m", "credit_mix_types",
+            "loan_amount", "down_payment", "employment_duration_months", "dti", "ltv",
+        )
+    }
+    rows = []
+    for i, is_car in enumerate(car):
+        row = {name: values[i] for name, values in plain.items()}
+        row["loan_type"] = "car" if is_car else "real_estate"
+        row["vehicle_value"] = collateral[i] if is_car else None
+        row["property_value"] = None if is_car else collateral[i]
+        row["employment_type"] = employment[i]
+        row["salary_payment_method"] = salary[i]
+        row["additional_info"] = None
+        rows.append(row)
+    return rows
+
+
+def spread(rng, start, span_us, offset, n, total):
+    """created_at increasing with the row number, row i in the i-th slice of the span."""
+    micros = ((offset + rng.random(n) + np.arange(n)) / total * span_us).astype(np.int64).tolist()
+    return [start + timedelta(microseconds=m) for m in micros]
+
+
+def application_block(seed, block, plan):
+    """
+    (application rows, evaluation rows) of one block as tuples in the field order
+    of generate_fixtures. plan: n_apps, n_users, user_start, app_start,
+    eval_start, start, span_us. No Django access, so blocks can be built in
+    worker processes.
+    """
+    offset = block * BLOCK
+    n = min(BLOCK, plan["n_apps"] - offset)
+    rng = block_rng(seed, APPLICATIONS, block)
+    rows = application_rows(sample_applications(rng, n))
+    owners = (rng.integers(0, plan["n_users"], n) + plan["user_start"]).tolist()
+    created = spread(rng, plan["start"], plan["span_us"], offset, n, plan["n_apps"])
+    for i, row in enumerate(rows):
+        row["id"] = plan["app_start"] + offset + i
+
+    version = base_line_scoring.CONFIG_VERSION
+    app_rows, eval_rows = [], []
+    for i, (row, (app_id, result)) in enumerate(zip(rows, base_line_scoring.evaluate_rows(rows))):
+        eval_id = plan["eval_start"] + offset + i
+        app_rows.append((
+            app_id, owners[i], row["loan_type"], row["monthly_income"], row["monthly_debt_payments"],
+            row["cic_group"], row["credit_history_months"], row["credit_utilization_pct"],
+            row["num_late_payments_24m"], row["num_new_inquiries_6m"], row["credit_mix_types"],
+            row["loan_amount"], row["down_payment"], row["vehicle_value"], row["property_value"],
+            row["employment_type"], row["employment_duration_months"], row["salary_payment_method"],
+            None, created[i], row["dti"], row["ltv"], result["baseline_score"], result["eligible"], eval_id,
+        ))
+        eval_rows.append((
+            eval_id, app_id, result["baseline_score"], result["eligible"],
+            result.get("knockout_reasons", []), result.get("breakdown", {}), version, created[i],
+        ))
+    return app_rows, eval_rows
+
+
+def full_names(rng, n):
+    parts = [rng.integers(0, len(pool), n).tolist() for pool in (_SURNAMES, _MIDDLE, _GIVEN)]
+    return [f"{_SURNAMES[a]} {_MIDDLE[b]} {_GIVEN[c]}" for a, b, c in zip(*parts)]
+
+
+def loan_options(rng, banks, per_bank):
+    """Rows for LoanOption with rate / term text affordability.parse_* understands."""
+    options = []
+    for bank in range(banks):
+        for k in range(per_bank):
+            loan_type = "car" if k % 2 == 0 else "real_estate"
+            low = round(float(rng.uniform(5.5, 9.5)), 1)
+            high = round(low + float(rng.uniform(1.5, 5.0)), 1)
+            years = int(rng.integers(5, 9)) if loan_type == "car" else int(rng.integers(15, 36))
+            min_income = int(rng.integers(8, 31))
+            options.append({
+                "bank": bank,
+                "loan_type": loan_type,
+                "title": f"{'Car' if loan_type == 'car' else 'Real Estate'} Loan - Plan {k // 2 + 1}",
+                "exclusive_interest_rate": f"From {low}% to {high}%/year",
+                "estimated_term": f"Up to {years} years",
+                "key_requirement": f"Min. Income: {min_income}M VND",
+                "average_processing_time": f"Avg. {int(rng.integers(3, 8))}-{int(rng.integers(8, 15))} working days",
+            })
+    return options
@@ -1,3 +1,130 @@
+import base64
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from Banks.models import Bank
+from LoanPackages.models import LoanOption
+from .models import LoanApplication, LoanEvaluation
+
+APPLY_URL = "/api/loan_application/apply/"
+QUEUE_URL = "/api/loan_application/review-queue/"
+
+APPLICATION = {
+    "loan_type": "car",
+    "monthly_income": "30000000",
+    "monthly_debt_payments": "5000000",
+    "cic_group": 1,
+    "credit_history_months": 36,
+    "loan_amount": "500000000",
+    "down_payment": "200000000",
+    "vehicle_value": "700000000",
+    "employment_duration_months": 24,
+}
+
+
+def make_user(email, **extra):
+    return get_user_model().objects.create_user(email, "pw", full_name=email.split("@")[0], **extra)
+
+
+class IdempotentApplyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(make_user("applicant@example.com"))
+
+    def apply(self, data, key):
+        return self.client.post(APPLY_URL, data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response(self):
+        first = self.apply(APPLICATION, "k-1")
+        second = self.apply(APPLICATION, "k-1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertFalse(first.has_header("Idempotent-Replayed"))
+        self.assertEqual(LoanApplication.objects.count(), 1)
+
+    def test_same_key_with_other_body_is_rejected(self):
+        self.apply(APPLICATION, "k-2")
+        response = self.apply({**APPLICATION, "loan_amount": "400000000"}, "k-2")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(LoanApplication.objects.count(), 1)
+
+    def test_new_key_creates_new_application(self):
+        self.apply(APPLICATION, "k-3")
+        self.apply(APPLICATION, "k-4")
+        self.assertEqual(LoanApplication.objects.count(), 2)
+
+    def test_replays_do_not_count_toward_velocity(self):
+        # INTAKE_GUARD chặn user ở 5 request / 60s; retry đã có kết quả không bị đếm
+        for _ in range(8):
+            self.assertEqual(self.apply(APPLICATION, "k-5").status_code, 201)
+        self.assertEqual(LoanApplication.objects.count(), 1)
+
+    def test_apply_response_has_no_intake_flags(self):
+        response = self.apply(APPLICATION, "k-6")
+        self.assertNotIn("intake_flags", response.json())
+
+
+class ReviewQueueCursorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        applicant = APIClient()
+        applicant.force_authenticate(make_user("applicant@example.com"))
+        for i in range(3):
+            applicant.post(APPLY_URL, {**APPLICATION, "cic_group": i + 1}, format="json")
+        self.client = APIClient()
+        self.client.force_authenticate(make_user("officer@example.com", is_staff=True))
+
+    def cursor(self, *values):
+        raw = json.dumps(list(values)).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def test_pages_follow_the_cursor(self):
+        first = self.client.get(QUEUE_URL, {"limit": 2}).json()
+        second = self.client.get(QUEUE_URL, {"limit": 2, "cursor": first["next_cursor"]}).json()
+
+        ids = [row["id"] for row in first["results"] + second["results"]]
+        self.assertEqual(sorted(ids), sorted(LoanApplication.objects.values_list("id", flat=True)))
+        self.assertIsNone(second["next_cursor"])
+
+    def test_tampered_cursors_are_rejected(self):
+        cursors = [
+            "not-a-cursor!",
+            base64.urlsafe_b64encode(b"{}").decode(),
+            self.cursor("-created_at", "2025-02-30T00:00:00", 1),
+            self.cursor("-created_at", 12, 1),
+            self.cursor("-created_at", "2025-01-01T00:00:00", "1"),
+            self.cursor("-created_at", "2025-01-01T00:00:00", True),
+            self.cursor("-score", "60", 1),
+            self.cursor("-score", 60, 1),  # cursor của sort khác
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(QUEUE_URL, {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+
+    def test_applicants_cannot_read_the_queue(self):
+        client = APIClient()
+        client.force_authenticate(LoanApplication.objects.first().user)
+        self.assertEqual(client.get(QUEUE_URL).status_code, 403)
+
+
+class GenerateFixturesTests(TestCase):
+    def test_generates_every_table(self):
+        call_command("generate_fixtures", applications=200, banks=2, options_per_bank=3, workers=1, stdout=StringIO())
 
-# Create your tests here.
+        self.assertEqual(Bank.objects.count(), 2)
+        self.assertEqual(LoanOption.objects.count(), 6)
+        self.assertFalse(LoanOption.objects.filter(updated_at__isnull=True).exists())
+        self.assertEqual(LoanApplication.objects.count(), 200)
+        self.assertEqual(LoanEvaluation.objects.count(), 200)
@@ -1,7 +1,14 @@
 from django.urls import path
-from .views import LoanApplyView, LoanEvaluationViewSet
+from .views import (
+    ApplicationDetailView, ApplicationOutcomeView, CohortAnalyticsView, LoanApplyView, LoanEvaluationViewSet, LoanExportView, ReviewQueueView,
+)
 
 urlpatterns = [
     path('apply/', LoanApplyView.as_view(), name='loan-apply'),
-    path('evaluations/', LoanEvaluationViewSet.as_view(), name='loan-evaluations')
+    path('evaluations/', LoanEvaluationViewSet.as_view(), name='loan-evaluations'),
+    path('applications/<int:application_id>/', ApplicationDetailView.as_view(), name='loan-application-detail'),
+    path('applications/<int:application_id>/outcome/', ApplicationOutcomeView.as_view(), name='loan-application-outcome'),
+    path('export/', LoanExportView.as_view(), name='loan-export'),
+    path('cohorts/', CohortAnalyticsView.as_view(), name='loan-cohorts'),
+    path('review-queue/', ReviewQueueView.as_view(), name='loan-review-queue'),
 ]
@@ -1,20 +1,38 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, viewsets
-from rest_framework.permissions import IsAuthenticated
-from .serializer import LoanApplicationSerializer, LoanEvaluationSerializer
-from .models import LoanEvaluation
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from datetime import datetime
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from rest_framework.renderers import BrowsableAPIRenderer
+from backend import tracing
+from backend.fast_serializers import FastJSONRenderer
+from backend.db_router import replica_reads
+from backend.idempotency import idempotent
+from backend.intake_guard import intake_guard
+from .serializer import LoanApplicationSerializer, LoanEvaluationSerializer, LoanOutcomeSerializer, loan_evaluation_reader
+from .models import LoanApplication, LoanEvaluation, LoanOutcome, LoanType
+from . import export, percentiles, retention, review_queue, rollups
 
 class LoanApplyView(APIView): # Đây là một class-based view, chỉ xử lý các request HTTP được định nghĩa (ở đây là post).
     # permission_classes = [IsAuthenticated] # Yêu cầu người dùng phải đăng nhập (authenticated) để truy cập view này.
 
+    # chặn / gắn cờ nộp dồn dập và dò ngưỡng trước khi chấm điểm (backend/intake_guard.py)
+    @intake_guard("loan-apply")
+    # retry / double-click với cùng Idempotency-Key nhận lại response cũ, không tạo hồ sơ trùng
+    @idempotent("loan-apply")
     def post(self, request):
         serializer = LoanApplicationSerializer(data=request.data, context={"request": request}) # Tạo instance của LoanApplicationSerializer với dữ liệu từ request (request.data là JSON từ frontend).
-        serializer.is_valid(raise_exception=True) # Kiểm tra dữ liệu hợp lệ (dựa trên validate trong serializer)
-        app = serializer.save() # Gọi phương thức create của LoanApplicationSerializer
+        with tracing.span("apply.validate"):
+            serializer.is_valid(raise_exception=True) # Kiểm tra dữ liệu hợp lệ (dựa trên validate trong serializer)
+        app = serializer.save(intake_flags=request.intake_flags or None) # Gọi phương thức create của LoanApplicationSerializer
         # fetch last evaluation
-        eval_obj = app.evaluations.latest('created_at') # Đối tượng loanevaluation mới nhất liên quan đến application này
-        eval_ser = LoanEvaluationSerializer(eval_obj)
+        with tracing.span("apply.read_back"):
+            eval_obj = app.evaluations.latest('created_at') # Đối tượng loanevaluation mới nhất liên quan đến application này
+            eval_ser = LoanEvaluationSerializer(eval_obj)
+            # "điểm của bạn cao hơn X% hồ sơ cùng loại vay / cùng nhóm CIC"
+            ranking = percentiles.percentile(app.loan_type, app.cic_group, eval_obj.baseline_score)
         # respond with application + evaluation summary
         return Response({
             "application_id": app.id,
@@ -22,14 +40,159 @@ class LoanApplyView(APIView): # Đây là một class-based view, chỉ xử lý
             "eligible": eval_obj.eligible,
             "knockout_reasons": eval_obj.knockout_reasons,
             "score_breakdown": eval_obj.score_breakdown,
+            "approval_probability": eval_obj.approval_probability,
+            **ranking,
         }, status=status.HTTP_201_CREATED)
 
 class LoanEvaluationViewSet(APIView):
     # permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
+    @replica_reads
     def get(self, request):
-        latest_eval = LoanEvaluation.objects.filter(application__user=request.user).order_by('created_at').last()
+        # .values() + loan_evaluation_reader, cùng output với LoanEvaluationSerializer
+        latest_eval = loan_evaluation_reader.first(
+            LoanEvaluation.objects.filter(application__user=request.user).order_by('-created_at')
+        )
         if not latest_eval:
             return Response({"detail": "No evaluations found"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = LoanEvaluationSerializer(latest_eval)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        app = LoanApplication.objects.values("loan_type", "cic_group").get(pk=latest_eval["application"])
+        latest_eval.update(percentiles.percentile(app["loan_type"], app["cic_group"], latest_eval["baseline_score"]))
+        return Response(latest_eval, status=status.HTTP_200_OK)
+
+class LoanExportView(APIView):
+    """
+    Stream LoanApplication + latest LoanEvaluation for analysts.
+    GET ?file_format=csv|parquet|arrow&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD&loan_type=car
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # "format" is reserved by DRF for content negotiation, so use "file_format"
+        fmt = request.query_params.get("file_format", "csv")
+        if fmt not in export.FORMATS:
+            return Response({"error": f"file_format must be one of {sorted(export.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {}
+        for name in ("date_from", "date_to"):
+            raw = request.query_params.get(name)
+            if raw:
+                try:
+                    filters[name] = parse_date(raw)
+                except ValueError:  # đúng dạng nhưng không có ngày đó, vd. 2024-02-30
+                    filters[name] = None
+                if filters[name] is None:
+                    return Response({"error": f"{name} must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        loan_type = request.query_params.get("loan_type")
+        if loan_type:
+            if loan_type not in LoanType.values:
+                return Response({"error": f"loan_type must be one of {LoanType.values}"}, status=status.HTTP_400_BAD_REQUEST)
+            filters["loan_type"] = loan_type
+
+        try:
+            body = export.stream_export(fmt, export.filtered_applications(**filters))
+        except RuntimeError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        content_type, extension = export.FORMATS[fmt]
+        response = StreamingHttpResponse(body, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="loan_applications.{extension}"'
+        return response
+
+class ApplicationDetailView(APIView):
+    """
+    GET applications/<id>/ => hồ sơ + toàn bộ evaluation, kể cả khi đã được
+    lưu trữ (user_profile/retention.py, "archived": true). Chủ hồ sơ hoặc staff;
+    intake_flags (backend/intake_guard.py) chỉ trả cho staff.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, application_id):
+        data = retention.get_application(application_id)
+        if data is None or (data["application"]["user_id"] != request.user.pk and not request.user.is_staff):
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not request.user.is_staff:
+            # không cho người dò ngưỡng biết lúc nào bị phát hiện
+            data["application"].pop("intake_flags", None)
+        return Response(data, status=status.HTTP_200_OK)
+
+class ApplicationOutcomeView(APIView):
+    """
+    Quyết định thật của ngân hàng cho hồ sơ, dữ liệu train OutcomeModel (user_profile/outcome_model.py).
+    GET => outcome đã ghi. PUT {"approved": true, "bank": "<Bank.code>", "decided_at": "..."} => ghi / sửa.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, application_id):
+        outcome = LoanOutcome.objects.filter(application_id=application_id).first()
+        if outcome is None:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(LoanOutcomeSerializer(outcome).data, status=status.HTTP_200_OK)
+
+    def put(self, request, application_id):
+        if not LoanApplication.objects.filter(pk=application_id).exists():
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        outcome = LoanOutcome.objects.filter(application_id=application_id).first()
+        serializer = LoanOutcomeSerializer(outcome, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(application_id=application_id, recorded_by=request.user)
+        return Response(serializer.data, status=status.HTTP_200_OK if outcome else status.HTTP_201_CREATED)
+
+class ReviewQueueView(APIView):
+    """
+    Hàng đợi xét duyệt cho cán bộ ngân hàng (user_profile/review_queue.py).
+    GET ?loan_type=car&eligible=true&score_min=60&score_max=90&cic_group=1
+        &created_from=2025-01-01&created_to=2025-06-30&flagged=true&sort=-score|score|-created_at|created_at
+        &limit=50&cursor=<next_cursor của trang trước>
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    @replica_reads
+    def get(self, request):
+        try:
+            data = review_queue.page(request.query_params)
+        except review_queue.QueueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_200_OK)
+
+class CohortAnalyticsView(APIView):
+    """
+    Approval rate, avg baseline_score and knockout reasons per cohort, read from
+    CohortRollup / KnockoutRollup (không quét LoanEvaluation).
+    GET ?group_by=loan_type,cic_group,dti_band,month&loan_type=car&cic_group=2
+        &dti_band=20-36&month_from=2025-01&month_to=2025-06
+    ?group_by= (rỗng) trả một dòng tổng cho cả bộ lọc.
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request):
+        params = request.query_params
+        group_by = [g for g in params.get("group_by", "loan_type").split(",") if g]
+        unknown = set(group_by) - set(rollups.DIMENSIONS)
+        if unknown:
+            return Response({"error": f"group_by must be a subset of {list(rollups.DIMENSIONS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {}
+        for name, lookup in (("month_from", "month__gte"), ("month_to", "month__lte")):
+            raw = params.get(name)
+            if raw:
+                try:
+                    filters[lookup] = datetime.strptime(raw, "%Y-%m").date()
+                except ValueError:
+                    return Response({"error": f"{name} must be YYYY-MM"}, status=status.HTTP_400_BAD_REQUEST)
+        loan_type = params.get("loan_type")
+        if loan_type:
+            if loan_type not in LoanType.values:
+                return Response({"error": f"loan_type must be one of {LoanType.values}"}, status=status.HTTP_400_BAD_REQUEST)
+            filters["loan_type"] = loan_type
+        if params.get("cic_group"):
+            if not params["cic_group"].isdigit():
+                return Response({"error": "cic_group must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            filters["cic_group"] = int(params["cic_group"])
+        if params.get("dti_band"):
+            filters["dti_band"] = params["dti_band"]
+
+        return Response(rollups.cohort_stats(group_by, **filters), status=status.HTTP_200_OK)